@@ -0,0 +1,340 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Allow `python news_project/benchmark.py` to import the scraper package.
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scraper.mock_llm import MockLLMConfig, load_responses, start_mock_server
+
+
+REGRESSION_FLOOR_SECONDS = 0.005
+
+
+def synthesize_fixture(url: str, article_count: int) -> str:
+    """Deterministic stand-in page shaped like the real source (listing or arXiv feed)."""
+    slug = "".join(ch for ch in url if ch.isalnum())[-24:]
+    if "arxiv.org/list/" in url:
+        category = url.rstrip("/").split("/")[-2]
+        parts = [f"<html><body><h1>Arxiv {category} Recent Papers</h1>"]
+        for i in range(article_count):
+            parts.append("<article>")
+            parts.append(f"<h2>Benchmark paper {i} on agents and spatial computing ({slug})</h2>")
+            parts.append("<p>Date: 2025-12-10T00:00:00Z</p>")
+            parts.append("<p>Venue: </p>")
+            parts.append(f"<p>Link: http://arxiv.org/abs/2512.{i:05d}v1</p>")
+            parts.append(f"<div>{'We study multi-agent interaction in mixed reality. ' * 12}</div>")
+            parts.append("</article><hr/>")
+        parts.append("</body></html>")
+        return "".join(parts)
+
+    parts = [
+        "<html><head><title>Newsroom</title><script>var tracking = {};</script><style>body{}</style></head><body>",
+        "<header class='header'><a href='/'>Home</a><a href='/about'>About us</a></header>",
+        "<nav><ul>" + "".join(f"<li><a href='/topic/{i}'>Topic number {i}</a></li>" for i in range(20)) + "</ul></nav>",
+        "<main><section><h1>Latest news</h1>",
+    ]
+    for i in range(article_count):
+        parts.append(
+            "<article class='card'><div class='card__body'>"
+            f"<h2><a href='/news/{slug}-story-{i}'>Benchmark story {i}: new AI glasses and agents ({slug})</a></h2>"
+            f"<time>December {1 + i % 28}, 2025</time>"
+            f"<p>{'Company announces a new spatial computing product with on-device models. ' * 4}</p>"
+            "<svg><path d='M0 0'/></svg>"
+            "</div></article>"
+        )
+    parts.append("</section></main>")
+    parts.append("<footer>" + "".join(f"<a href='/legal/{i}'>Legal link {i}</a>" for i in range(15)) + "</footer>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def ensure_fixtures(fixture_dir: str, urls: List[str], article_count: int) -> int:
+    from scraper.core import fixture_name
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    created = 0
+    for url in urls:
+        path = os.path.join(fixture_dir, fixture_name(url))
+        if os.path.exists(path):
+            continue
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthesize_fixture(url, article_count))
+        created += 1
+    return created
+
+
+async def record_fixtures(fixture_dir: str, urls: List[str]) -> Dict[str, int]:
+    from scraper.core import fetch_webpage, fixture_name
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    sizes = {}
+    for url in urls:
+        html = await fetch_webpage(url)
+        if not html:
+            print(f"record_failed url={url}")
+            continue
+        with open(os.path.join(fixture_dir, fixture_name(url)), "w", encoding="utf-8") as f:
+            f.write(html)
+        sizes[url] = len(html)
+        print(f"recorded url={url} bytes={len(html)}")
+    return sizes
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize_stages(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        stage: {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else 0.0,
+        }
+        for stage, values in sorted(timings.items())
+    }
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def count_latest_articles(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return int(conn.execute("SELECT COUNT(*) FROM articles WHERE inbox_status = 'latest'").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Lower is better for every checked metric; tiny absolute deltas are ignored as noise."""
+    checks = [("wall_seconds.mean", report["wall_seconds"]["mean"], baseline.get("wall_seconds", {}).get("mean"))]
+    for stage, stats in report["stages"].items():
+        checks.append((f"stages.{stage}.p90", stats["p90"], baseline.get("stages", {}).get(stage, {}).get("p90")))
+    if report.get("peak_rss_mb") and baseline.get("peak_rss_mb"):
+        checks.append(("peak_rss_mb", report["peak_rss_mb"], baseline["peak_rss_mb"]))
+
+    failures = []
+    for name, current, previous in checks:
+        if previous is None:
+            continue
+        floor = 0 if name == "peak_rss_mb" else REGRESSION_FLOOR_SECONDS
+        if current > previous * (1 + max_regression) and current - previous > floor:
+            failures.append(f"{name}: {current:.4f} vs baseline {previous:.4f} (+{(current / previous - 1) * 100 if previous else 0:.0f}%)")
+    return failures
+
+
+def configure_environment(base_url: str, fixture_dir: str, db_path: str) -> None:
+    # The scraper reads these at import time, so this must run before importing it.
+    os.environ["SCRAPER_FIXTURE_DIR"] = fixture_dir
+    os.environ["NEWS_DB_PATH"] = db_path
+    for name in ("GEMINI_BASE_URL", "GEMINI_EXTRACT_BASE_URL", "GEMINI_RESCORE_BASE_URL"):
+        os.environ[name] = base_url
+    os.environ["GEMINI_API_KEY"] = "mock"
+    os.environ.setdefault("SCRAPER_PER_HOST_DELAY_SECONDS", "0")
+    os.environ.setdefault("SCRAPER_BACKOFF_SECONDS", "0.05")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def source_urls() -> List[str]:
+    """Sources monitor_news runs on a fresh database: every enabled source of the registry."""
+    from scraper.sources import SourceRegistry, declared_sources
+
+    return SourceRegistry(declared_sources()).urls
+
+
+def run_benchmark(args: argparse.Namespace, db_path: str) -> Dict[str, Any]:
+    import main
+    from scraper.observability import reset_stage_timings, stage_timings
+
+    if args.tracemalloc:
+        import tracemalloc
+
+        tracemalloc.start()
+
+    urls = source_urls()
+    walls = []
+    articles = []
+    all_timings: Dict[str, List[float]] = {}
+    for run in range(args.runs):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        reset_stage_timings()
+        started = time.perf_counter()
+        asyncio.run(main.monitor_news(interactive=False))
+        walls.append(time.perf_counter() - started)
+        articles.append(count_latest_articles(db_path))
+        for stage, values in stage_timings().items():
+            all_timings.setdefault(stage, []).extend(values)
+        print(f"run={run + 1} wall={walls[-1]:.3f}s articles={articles[-1]}")
+
+    report: Dict[str, Any] = {
+        "sources": len(urls),
+        "runs": args.runs,
+        "wall_seconds": {"mean": sum(walls) / len(walls), "min": min(walls), "max": max(walls)},
+        "sources_per_second": len(urls) * len(walls) / sum(walls),
+        "articles_per_run": articles[-1] if articles else 0,
+        "articles_per_second": sum(articles) / sum(walls),
+        "stages": summarize_stages(all_timings),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if args.tracemalloc:
+        import tracemalloc
+
+        report["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    return report
+
+
+def run_upsert_benchmark(row_count: int, db_path: str) -> Dict[str, float]:
+    """Time sqlite_store.upsert_articles: an insert pass, then a merge pass over the same links."""
+    from pathlib import Path
+
+    from scraper import sqlite_store as db
+
+    articles = [
+        {
+            "title": f"Benchmark article {i}",
+            "link": f"https://example.com/news/{i}" if i % 4 else f"http://arxiv.org/abs/2512.{i:05d}v1",
+            "summary": "Company announces a new spatial computing product with on-device models. " * 3,
+            "date": "2025-12-10",
+            "ai_score": i % 100,
+            "score": i % 100,
+            "tags": ["AI", f"topic-{i % 20}"],
+        }
+        for i in range(row_count)
+    ]
+    conn = db.connect(Path(db_path))
+    try:
+        rates = {}
+        for name, status in (("insert", "history"), ("merge", "latest")):
+            started = time.perf_counter()
+            with conn:
+                db.upsert_articles(conn, articles, inbox_status=status, origin_file="bench.json")
+            rates[f"{name}_rows_per_second"] = row_count / (time.perf_counter() - started)
+        return rates
+    finally:
+        conn.close()
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\nsources={report['sources']} runs={report['runs']}")
+    wall = report["wall_seconds"]
+    print(f"wall mean={wall['mean']:.3f}s min={wall['min']:.3f}s max={wall['max']:.3f}s")
+    print(f"throughput sources/s={report['sources_per_second']:.2f} articles/s={report['articles_per_second']:.2f}")
+    print(f"memory peak_rss={report['peak_rss_mb']}MB" + (f" tracemalloc_peak={report['tracemalloc_peak_mb']}MB" if "tracemalloc_peak_mb" in report else ""))
+    print(f"{'stage':<16}{'count':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<16}{stats['count']:>7}{stats['p50']:>10.4f}{stats['p90']:>10.4f}{stats['p99']:>10.4f}{stats['max']:>10.4f}")
+    if "llm_requests" in report:
+        print(f"llm requests={report['llm_requests']} injected_errors={report['llm_errors']}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of monitor_news against a mock LLM.")
+    parser.add_argument("--fixtures", help="Directory of recorded pages. Missing pages are synthesized. Defaults to a temp dir.")
+    parser.add_argument("--record", action="store_true", help="Fetch every registry source live into --fixtures and exit.")
+    parser.add_argument("--articles-per-page", type=int, default=30, help="Articles per synthesized fixture.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock LLM latency in seconds.")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--responses", help="JSON file with canned mock responses.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the Python allocation peak (slower).")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown vs baseline, e.g. 0.25 = 25%%.")
+    parser.add_argument("--upsert-rows", type=int, default=0, help="Only benchmark the bulk article upsert with this many rows and exit.")
+    parser.add_argument("--min-upsert-rate", type=float, default=10000, help="Fail --upsert-rows below this many rows per second.")
+    return parser.parse_args()
+
+
+def main_cli() -> int:
+    args = parse_args()
+
+    if args.record:
+        if not args.fixtures:
+            print("--record needs --fixtures")
+            return 2
+        asyncio.run(record_fixtures(args.fixtures, source_urls()))
+        return 0
+
+    if args.upsert_rows:
+        with tempfile.TemporaryDirectory(prefix="news-bench-") as workdir:
+            rates = run_upsert_benchmark(args.upsert_rows, os.path.join(workdir, "upsert.db"))
+        for name, rate in rates.items():
+            print(f"upsert rows={args.upsert_rows} {name}={rate:.0f}")
+        slow = [name for name, rate in rates.items() if rate < args.min_upsert_rate]
+        if slow:
+            print(f"Below {args.min_upsert_rate:.0f} rows/s: {', '.join(slow)}")
+            return 1
+        return 0
+
+    config = MockLLMConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        responses=load_responses(args.responses) if args.responses else None,
+    )
+    server, base_url = start_mock_server(config)
+    with tempfile.TemporaryDirectory(prefix="news-bench-") as workdir:
+        fixture_dir = os.path.abspath(args.fixtures or os.path.join(workdir, "fixtures"))
+        db_path = os.path.join(workdir, "bench.db")
+        configure_environment(base_url, fixture_dir, db_path)
+        try:
+            created = ensure_fixtures(fixture_dir, source_urls(), args.articles_per_page)
+            if created:
+                print(f"synthesized {created} fixture(s) in {fixture_dir}")
+            report = run_benchmark(args, db_path)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    report["llm_requests"] = config.request_count
+    report["llm_errors"] = config.error_count
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare_to_baseline(report, baseline, args.max_regression)
+        if failures:
+            print("\nRegressions over threshold:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print("\nNo regressions over threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
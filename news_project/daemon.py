@@ -0,0 +1,225 @@
+"""Long-running scraper: one process, warm state, per-source schedules.
+
+Keeps the SQLite connection, HTTP session, OpenAI clients and parse workers
+alive between cycles, so a cycle costs only the work it does. Each source has
+its own next-due time (its registry cadence, or the daemon interval, +/- jitter). A small HTTP endpoint on
+127.0.0.1 reports status and accepts "run now":
+
+    curl http://127.0.0.1:8766/status
+    curl -X POST http://127.0.0.1:8766/run
+    curl -X POST "http://127.0.0.1:8766/run?url=https://arxiv.org/list/cs.HC/recent"
+
+SIGTERM/SIGINT stop scheduling, let the running cycle wind down through its run
+budget and save state before exiting.
+"""
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from scraper.config import (
+    DAEMON_INTERVAL_SECONDS,
+    DAEMON_JITTER,
+    DAEMON_PORT,
+    DB_WRITER,
+    RUN_BUDGET_SECONDS,
+    RUN_DEADLINE_MARGIN_SECONDS,
+)
+from scraper.core import close_shared_session, open_shared_session
+from scraper.observability import get_logger
+from scraper.scheduling import RunBudget
+from scraper.storage import Storage
+from scraper.workers import shutdown as shutdown_workers
+
+
+logger = get_logger("daemon")
+
+# Sources skipped at a run deadline come back after this delay instead of a full interval.
+SKIPPED_RETRY_SECONDS = 300
+# Sources due within this window of each other share one cycle.
+COALESCE_SECONDS = 60
+
+
+class ScraperDaemon:
+    def __init__(
+        self,
+        urls: Optional[List[str]] = None,
+        interval: float = DAEMON_INTERVAL_SECONDS,
+        jitter: float = DAEMON_JITTER,
+        port: int = DAEMON_PORT,
+    ):
+        # None: every enabled source of the registry, resolved once storage is open.
+        self.urls = list(urls) if urls else None
+        self.interval = interval
+        self.jitter = jitter
+        self.port = port
+        now = time.time()
+        self.next_due: Dict[str, float] = {url: now for url in self.urls or []}
+        self.cadence: Dict[str, float] = {}
+        self.cycles = 0
+        self.running_urls: List[str] = []
+        self.last_cycle: Dict[str, Any] = {}
+        self.started_at = now
+        self._budget: Optional[RunBudget] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def _next_interval(self, url: str) -> float:
+        interval = self.cadence.get(url) or self.interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def due_sources(self, now: float) -> List[str]:
+        return [url for url in self.urls if self.next_due[url] <= now]
+
+    def request_run(self, urls: Optional[List[str]] = None) -> List[str]:
+        selected = [url for url in (urls or self.urls) if url in self.next_due]
+        now = time.time()
+        for url in selected:
+            self.next_due[url] = now
+        if self._wakeup:
+            self._wakeup.set()
+        logger.info("daemon_run_requested count=%s", len(selected))
+        return selected
+
+    def stop(self) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info("daemon_stopping running=%s", len(self.running_urls))
+        if self._budget:
+            self._budget.expire()
+        if self._wakeup:
+            self._wakeup.set()
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "uptime_s": round(now - self.started_at, 1),
+            "cycles": self.cycles,
+            "stopping": self._stopping,
+            "running": self.running_urls,
+            "last_cycle": self.last_cycle,
+            "next_due_in_s": {url: round(max(0.0, due - now), 1) for url, due in sorted(self.next_due.items(), key=lambda item: item[1])},
+        }
+
+    async def run_cycle(self, storage: Storage, urls: List[str]) -> None:
+        started = time.time()
+        self.running_urls = urls
+        self._budget = RunBudget(RUN_BUDGET_SECONDS, RUN_DEADLINE_MARGIN_SECONDS)
+        if self._stopping:
+            self._budget.expire()
+        try:
+            result = await main.monitor_news(interactive=False, urls=urls, storage=storage, budget=self._budget)
+        except Exception as e:
+            logger.exception("daemon_cycle_failed")
+            result = f"Error: {e}"
+
+        skipped = {url for stage_urls in self._budget.skipped.values() for url in stage_urls}
+        finished = time.time()
+        for url in urls:
+            self.next_due[url] = finished + (SKIPPED_RETRY_SECONDS if url in skipped else self._next_interval(url))
+        self.cycles += 1
+        self.running_urls = []
+        self._budget = None
+        self.last_cycle = {
+            "started_at": started,
+            "duration_s": round(finished - started, 2),
+            "sources": len(urls),
+            "skipped": len(skipped),
+            "result": result,
+        }
+        logger.info("daemon_cycle_done sources=%s duration_s=%.1f result=%s", len(urls), finished - started, result)
+
+    async def _handle_control(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        status, body = 404, {"error": "not found"}
+        try:
+            request_line = (await asyncio.wait_for(reader.readline(), timeout=5)).decode("latin-1").strip()
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            method, target = (request_line.split(" ") + ["", ""])[:2]
+            parsed = urlparse(target)
+            if parsed.path == "/status" and method == "GET":
+                status, body = 200, self.status()
+            elif parsed.path == "/run" and method == "POST":
+                urls = parse_qs(parsed.query).get("url")
+                status, body = 202, {"queued": self.request_run(urls)}
+        except Exception as e:
+            status, body = 400, {"error": str(e)}
+        payload = json.dumps(body, ensure_ascii=False, indent=2).encode("utf-8")
+        reason = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def _install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Windows: no loop signal handlers; SIGINT still raises KeyboardInterrupt.
+                pass
+
+    async def serve(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._install_signal_handlers()
+        server = None
+        if self.port:
+            server = await asyncio.start_server(self._handle_control, "127.0.0.1", self.port)
+            logger.info("daemon_control_listening url=http://127.0.0.1:%s", self.port)
+
+        storage = Storage(writer=DB_WRITER)
+        await open_shared_session()
+        registry = storage.registry
+        if self.urls is None:
+            self.urls = registry.urls
+            self.next_due = {url: time.time() for url in self.urls}
+        # Sources with their own cadence use it instead of the daemon interval.
+        self.cadence = {url: registry.get(url).cadence_seconds for url in self.urls}
+        logger.info("daemon_start sources=%s interval_s=%s jitter=%s", len(self.urls), self.interval, self.jitter)
+        try:
+            while not self._stopping:
+                due = self.due_sources(time.time() + COALESCE_SECONDS)
+                if due:
+                    await self.run_cycle(storage, due)
+                    continue
+                self._wakeup.clear()
+                delay = max(0.0, min(self.next_due.values(), default=time.time() + self.interval) - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            storage.save()
+            storage.close()
+            await close_shared_session()
+            shutdown_workers()
+            logger.info("daemon_stopped cycles=%s", self.cycles)
+
+
+def run_daemon(urls: Optional[List[str]] = None) -> None:
+    daemon = ScraperDaemon(urls)
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        logger.info("daemon_interrupted")
+
+
+if __name__ == "__main__":
+    run_daemon()
@@ -4,7 +4,7 @@ from typing import Any, Dict, List
 import pandas as pd
 import streamlit as st
 
-from news_project.dashboard_data import archive_links, delete_by_links, update_comments
+from news_project.dashboard_data import archive_links, delete_by_links, search_links, update_comments
 
 
 NUMERIC_COLUMNS = ["score", "personal_score", "impact_score", "ai_score"]
@@ -57,7 +57,7 @@ def _filter_dataframe(df: pd.DataFrame, key_prefix: str) -> pd.DataFrame:
     with st.expander("Filter", expanded=False):
         c1, c2, c3 = st.columns([2, 1, 2])
         with c1:
-            query = st.text_input("Search title, summary, reason", key=f"search_{key_prefix}")
+            query = st.text_input("Search title, summary, reason, comment, tags", key=f"search_{key_prefix}")
         with c2:
             min_score = st.number_input("Minimum score", min_value=0, value=0, step=10, key=f"min_score_{key_prefix}")
         with c3:
@@ -65,15 +65,12 @@ def _filter_dataframe(df: pd.DataFrame, key_prefix: str) -> pd.DataFrame:
 
     filtered = df.copy()
     if query:
-        query_lower = query.lower()
-        search_text = (
-            filtered["title"].fillna("").astype(str)
-            + " "
-            + filtered["summary"].fillna("").astype(str)
-            + " "
-            + filtered["score_reason"].fillna("").astype(str)
-        ).str.lower()
-        filtered = filtered[search_text.str.contains(query_lower, regex=False)]
+        # Full-text index lookup in SQLite instead of scanning every row here.
+        matches = search_links(query)
+        filtered = filtered[filtered["link"].isin(matches)]
+        # isin() keeps the frame's order; put the rows back in bm25 order.
+        rank = filtered["link"].map({link: position for position, link in enumerate(matches)})
+        filtered = filtered.iloc[rank.to_numpy().argsort(kind="stable")].assign(snippet=lambda frame: frame["link"].map(matches))
 
     if min_score:
         filtered = filtered[filtered["score"] >= min_score]
@@ -110,6 +107,8 @@ def _render_cards(df: pd.DataFrame, key_prefix: str, storage, file_path: str = N
                     f"{row['date']} | {row['venue']} | Total: {row['score']} "
                     f"(Personal: {row['personal_score']}, AI: {row['ai_score']}, Impact: {row['impact_score']})"
                 )
+                if row.get("snippet"):
+                    st.caption(f"Match: {row['snippet']}")
                 tags = " ".join(f"`{tag}`" for tag in _tags_as_list(row["tags"])[:6])
                 if tags:
                     st.markdown(tags)
@@ -153,6 +152,9 @@ def render_article_browser(
 
     c1, c2, c3, c4 = st.columns([1, 1, 1, 1])
     sortable_columns = ["score", "personal_score", "impact_score", "ai_score", "date"]
+    if "snippet" in filtered:
+        # Searching: best match first unless another column is picked.
+        sortable_columns.insert(0, "relevance")
     with c1:
         sort_by = st.selectbox("Sort by", sortable_columns, index=0, key=f"sort_{key_prefix}")
     with c2:
@@ -163,7 +165,8 @@ def render_article_browser(
         total_pages = max(1, math.ceil(len(filtered) / page_size))
         page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, key=f"page_{key_prefix}")
 
-    filtered = filtered.sort_values(by=sort_by, ascending=False)
+    if sort_by != "relevance":
+        filtered = filtered.sort_values(by=sort_by, ascending=False)
     start = (page - 1) * page_size
     end = start + page_size
     page_df = filtered.iloc[start:end].copy()
@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from news_project.scraper.config import DATA_DIR
 from news_project.scraper import sqlite_store as db
@@ -31,7 +31,7 @@ def _arxiv_for_file(file_name: str):
 
 def load_data(file_path: str) -> List[Dict[str, Any]]:
     file_name = _file_name(file_path)
-    conn = db.connect()
+    conn = db.connect(profile="reader")
     try:
         if file_name == "favorites.json":
             return db.load_articles(conn, favorites=True)
@@ -49,19 +49,33 @@ def save_data(file_path: str, data: List[Dict[str, Any]]) -> None:
     conn = db.connect()
     try:
         with conn:
-            for item in data:
-                if file_name == "favorites.json":
-                    db.upsert_article(conn, item, inbox_status=item.get("inbox_status", "library"), is_favorite=True, origin_file=file_name)
-                else:
-                    db.upsert_article(
-                        conn,
-                        item,
-                        inbox_status=_status_for_file(file_name),
-                        fallback_type="paper" if _arxiv_for_file(file_name) else "news",
-                        origin_file=file_name,
-                    )
+            if file_name == "favorites.json":
+                # Favorites keep their own inbox status; one batch per status.
+                by_status: Dict[str, List[Dict[str, Any]]] = {}
+                for item in data:
+                    by_status.setdefault(item.get("inbox_status", "library"), []).append(item)
+                for status, items in by_status.items():
+                    db.upsert_articles(conn, items, inbox_status=status, is_favorite=True, origin_file=file_name)
+            else:
+                db.upsert_articles(
+                    conn,
+                    data,
+                    inbox_status=_status_for_file(file_name),
+                    fallback_type="paper" if _arxiv_for_file(file_name) else "news",
+                    origin_file=file_name,
+                )
+    finally:
+        conn.close()
+
+
+def search_links(query: str, limit: Optional[int] = None) -> Dict[str, str]:
+    """Links of the articles matching query, best match first, each with a highlighted snippet."""
+    conn = db.connect(profile="reader")
+    try:
+        articles = db.search_articles(conn, query, limit=limit, highlight=("**", "**"))
     finally:
         conn.close()
+    return {article["link"]: article["snippet"] or "" for article in articles}
 
 
 def archive_links(source_path: str, history_path: str, links: Iterable[str] = None) -> int:
@@ -104,8 +118,8 @@ def update_comments(file_path: str, comments_by_link: Dict[str, str]) -> int:
 
 
 def split_favorites(favorites: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    papers = [item for item in favorites if "arxiv.org" in item.get("link", "").lower()]
-    news = [item for item in favorites if "arxiv.org" not in item.get("link", "").lower()]
+    papers = [item for item in favorites if item.get("is_arxiv")]
+    news = [item for item in favorites if not item.get("is_arxiv")]
     return news, papers
 
 
@@ -5,7 +5,6 @@ import pandas as pd
 import streamlit as st
 
 from news_project.dashboard_data import source_health_rows
-from news_project.scraper.config import TARGET_URLS
 
 
 def _check_url(url: str) -> Dict[str, str]:
@@ -55,15 +54,17 @@ def render_status_page(storage) -> None:
     st.caption("This checks connectivity now; it does not call the AI extractor.")
 
     if st.button("Run live check", type="primary"):
-        st.write(f"Testing {len(TARGET_URLS)} sources...")
+        # The registry, not TARGET_URLS: the sources the scraper actually runs.
+        urls = storage.registry.urls
+        st.write(f"Testing {len(urls)} sources...")
         progress_bar = st.progress(0)
         results = []
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_url = {executor.submit(_check_url, url): url for url in TARGET_URLS}
+            future_to_url = {executor.submit(_check_url, url): url for url in urls}
             for i, future in enumerate(concurrent.futures.as_completed(future_to_url)):
                 results.append(future.result())
-                progress_bar.progress((i + 1) / len(TARGET_URLS))
+                progress_bar.progress((i + 1) / len(urls))
 
         results_df = pd.DataFrame(results).sort_values(by="status", ascending=False)
         st.dataframe(results_df, use_container_width=True, hide_index=True)
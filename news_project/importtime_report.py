@@ -0,0 +1,87 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Modules that must stay lazy: they are only needed once a run actually fetches,
+# parses or calls the LLM, never to import the entry point.
+DEFAULT_FORBIDDEN = ["openai", "curl_cffi", "bs4", "lxml", "multiprocessing", "concurrent.futures.process"]
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """Run `python -X importtime -c "import <module>"` and return (name, depth, self_us, cumulative_us)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return subtree(rows, module)
+
+
+def subtree(rows: List[Tuple[str, int, int, int]], module: str) -> List[Tuple[str, int, int, int]]:
+    """Rows imported by module itself; interpreter startup (site, .pth hooks) is dropped.
+
+    importtime prints children before their parent, so the subtree is the run of
+    deeper rows right before the module's own top-level row.
+    """
+    for end in range(len(rows) - 1, -1, -1):
+        if rows[end][0] == module and rows[end][1] == 0:
+            break
+    else:
+        return []
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def report(rows: List[Tuple[str, int, int, int]], module: str, top: int) -> int:
+    cumulative: Dict[str, int] = {name: total for name, _, _, total in rows}
+    total_us = cumulative.get(module, 0)
+    print(f"⏱️  import {module}: {total_us / 1000:.1f} ms cumulative, {len(rows)} modules")
+    print(f"\n{'cumulative':>12} {'self':>9}  module")
+    for name, depth, self_us, total in sorted(rows, key=lambda row: row[3], reverse=True)[:top]:
+        print(f"{total / 1000:9.1f} ms {self_us / 1000:6.1f} ms  {'  ' * depth}{name}")
+    return total_us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report and check the cold-start import cost of the scraper.")
+    parser.add_argument("--module", default="main", help="Module to import (relative to news_project/).")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to list.")
+    parser.add_argument("--max-ms", type=float, default=0, help="Fail when the cumulative import time exceeds this (0 = no limit).")
+    parser.add_argument("--forbid", action="append", help="Module that must not be imported eagerly (repeatable).")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_us = report(rows, args.module, args.top)
+
+    failures = 0
+    loaded = {name for name, _, _, _ in rows}
+    for name in args.forbid or DEFAULT_FORBIDDEN:
+        if name in loaded:
+            print(f"❌ {name} is imported eagerly by {args.module}")
+            failures += 1
+    if args.max_ms and total_us / 1000 > args.max_ms:
+        print(f"❌ import {args.module} took {total_us / 1000:.1f} ms (limit {args.max_ms:.0f} ms)")
+        failures += 1
+
+    print(f"\n{'❌' if failures else '✅'} {failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
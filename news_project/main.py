@@ -1,36 +1,51 @@
+import argparse
 import asyncio
-import hashlib
 import os
+import socket
+import subprocess
 import sys
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional
 
 # Allow `python news_project/main.py` to import the scraper package.
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from scraper.observability import get_logger, setup_logging
+from scraper.observability import get_logger, setup_logging, timed
 
 
 setup_logging()
 
-from scraper.config import DATA_DIR, TARGET_URLS
-from scraper.core import ScraperError, extract_news_with_ai, fetch_webpage
+from scraper.config import (
+    BOILERPLATE_MIN_HITS,
+    BOILERPLATE_TTL_DAYS,
+    DATA_DIR,
+    DB_WRITER,
+    LEASE_BATCH_SIZE,
+    LEASE_TTL_SECONDS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_WORKERS,
+    PRE_LLM_LINK_FILTER,
+    RUN_BUDGET_SECONDS,
+    RUN_DEADLINE_MARGIN_SECONDS,
+    RUN_ID,
+    SIMHASH_MAX_DISTANCE,
+)
+from scraper.core import ScraperError, close_shared_session, extract_news_with_ai, fetch_webpage, open_shared_session
+from scraper.page import load_page
 from scraper.personalization import extract_user_interests
+from scraper.pipeline import Stage, run_pipeline
+from scraper.routing import rescore_borderline, route_enabled
+from scraper.scheduling import RunBudget, parse_shard, prioritize_sources, shard_sources
+from scraper.similarity import format_simhash, hamming_distance, parse_simhash
+from scraper.sources import SourceSpec
 from scraper.storage import Storage
-from scraper.utils import clean_html_for_ai
+from scraper.workers import shutdown as shutdown_workers
 
 
 logger = get_logger(__name__)
 
 
-def infer_mode(url: str) -> str:
-    mode = "news"
-    if any(key in url for key in ["arxiv.org", ".edu", "publication", "research", "deepmind"]):
-        mode = "paper"
-    if "openai.com/index" in url:
-        mode = "news"
-    return mode
-
-
 def calculate_final_score(article: Dict[str, Any]) -> int:
     try:
         semantic = int(article.get("ai_score", 0))
@@ -115,105 +130,409 @@ def prompt_for_bookmarks(storage: Storage, news_list: List[Dict[str, Any]], pape
             return
 
 
-async def process_source(url: str, storage: Storage, user_interests: List[str]) -> List[Dict[str, Any]]:
-    logger.info("source_start url=%s", url)
-
+class SourceJob:
+    """State of one source as it moves through the pipeline stages."""
+
+    def __init__(self, index: int, url: str, spec: Optional[SourceSpec] = None):
+        self.index = index
+        self.url = url
+        self.spec = spec or SourceSpec(url)
+        self.mode = self.spec.mode
+        self.html = ""
+        self.page = None
+        self.boilerplate: Dict[str, str] = {}
+        self.content_hash = ""
+        # The page changed; its diff-stage writes wait for the source's outcome (record_change).
+        self.changed = False
+        self.articles: List[Dict[str, Any]] = []
+        # Entries dropped before extraction because their links are already known.
+        self.known_items = 0
+        self.new_articles: List[Dict[str, Any]] = []
+
+
+async def fetch_stage(job: SourceJob, storage: Storage, budget: RunBudget) -> Optional[SourceJob]:
+    if budget.skip("fetch", job.url):
+        return None
+    logger.info("source_start url=%s", job.url)
     try:
-        html = await fetch_webpage(url, raise_on_error=True)
+        with timed("fetch"):
+            job.html = await fetch_webpage(
+                job.url, raise_on_error=True, adapter=job.spec.adapter, delay_seconds=job.spec.delay_seconds
+            )
     except ScraperError as e:
-        storage.record_source_failure(url, e.stage, e.error_type, str(e), e.retryable, e.attempts)
-        return []
-
-    if not html:
-        storage.record_source_failure(url, "fetch", "empty_response", "fetch returned empty content", True, 1)
-        return []
-
-    cleaned_text = clean_html_for_ai(html, url)
+        storage.record_source_failure(job.url, e.stage, e.error_type, str(e), e.retryable, e.attempts)
+        return None
+
+    if not job.html:
+        storage.record_source_failure(job.url, "fetch", "empty_response", "fetch returned empty content", True, 1)
+        return None
+    return job
+
+
+async def clean_stage(job: SourceJob, storage: Storage) -> Optional[SourceJob]:
+    url = job.url
+    with timed("clean"):
+        known_boilerplate = storage.load_boilerplate(url, BOILERPLATE_MIN_HITS) if BOILERPLATE_MIN_HITS > 0 else set()
+        page = await load_page(url, job.html, known_boilerplate, signatures=SIMHASH_MAX_DISTANCE >= 0)
+        cleaned_text = page.cleaned_text
+        # Fingerprints cover the full text so known chrome keeps being counted.
+        job.boilerplate = page.block_fingerprints() if cleaned_text and BOILERPLATE_MIN_HITS > 0 else {}
+    job.page = page
+    job.html = ""
     if not cleaned_text:
         storage.record_source_failure(url, "clean", "empty_content", "cleaned content was empty", False, 1)
-        return []
+        return None
+    return job
+
 
-    content_hash = hashlib.md5(cleaned_text.encode("utf-8")).hexdigest()
-    stored_hash = storage.get_page_hash(url)
+async def diff_stage(job: SourceJob, storage: Storage) -> Optional[SourceJob]:
+    url = job.url
+    with timed("diff"):
+        content_hash = job.page.content_hash
+        stored_hash = storage.get_page_hash(url)
     if content_hash == stored_hash:
         storage.record_content_unchanged(url, content_hash)
         logger.info("source_unchanged url=%s hash=%s", url, content_hash[:8])
-        return []
-
-    storage.record_content_changed(url, content_hash)
-    mode = infer_mode(url)
-    logger.info("source_changed url=%s mode=%s hash=%s", url, mode, content_hash[:8])
+        return None
 
+    distance = near_duplicate_distance(job.page, storage.get_page_signature(url))
+    if distance is not None:
+        # Keep the stored signature of the last extracted version so small edits cannot drift past it.
+        storage.record_content_unchanged(url, content_hash)
+        logger.info("source_near_duplicate url=%s hash=%s distance=%s", url, content_hash[:8], distance)
+        return None
+
+    job.content_hash = content_hash
+    job.changed = True
+    logger.info(
+        "source_changed url=%s mode=%s hash=%s boilerplate_lines=%s",
+        url,
+        job.mode,
+        content_hash[:8],
+        job.page.boilerplate_removed,
+    )
+    return job
+
+
+def record_change(job: SourceJob, storage: Storage) -> None:
+    """Diff-stage writes of a changed page, made in the same unit of work as the source's outcome."""
+    if job.changed:
+        storage.record_content_changed(job.url, job.content_hash)
+        # Only distinct page versions count towards boilerplate hits.
+        storage.record_boilerplate(job.url, job.boilerplate)
+
+
+def near_duplicate_distance(page, signature: Dict[str, Any]) -> Optional[int]:
+    """SimHash distance to the last extracted version if the page only changed cosmetically, else None."""
+    if SIMHASH_MAX_DISTANCE < 0:
+        return None
+    stored = parse_simhash(signature.get("simhash"))
+    if stored is None or signature.get("link_signature") != page.link_signature:
+        return None
+    distance = hamming_distance(stored, page.simhash)
+    return distance if distance <= SIMHASH_MAX_DISTANCE else None
+
+
+async def extract_stage(job: SourceJob, storage: Storage, user_interests: List[str], budget: RunBudget) -> Optional[SourceJob]:
+    # The page hash is only saved after extraction, so a skipped source is retried next run.
+    if budget.skip("extract", job.url):
+        with storage.transaction():
+            record_change(job, storage)
+        return None
+    if PRE_LLM_LINK_FILTER in ("arxiv", "all"):
+        job.known_items = job.page.drop_seen_items(storage.filter_new_links, lines=PRE_LLM_LINK_FILTER == "all")
+        if job.known_items:
+            logger.info("source_known_items_dropped url=%s count=%s", job.url, job.known_items)
     try:
-        articles = await extract_news_with_ai(html, url, mode=mode, user_interests=user_interests, raise_on_error=True)
+        with timed("extract"):
+            articles = await extract_news_with_ai(
+                job.page,
+                job.url,
+                mode=job.mode,
+                user_interests=user_interests,
+                raise_on_error=True,
+                max_chars=job.spec.max_chars,
+                concurrency=job.spec.concurrency,
+            )
     except ScraperError as e:
-        storage.record_source_failure(url, e.stage, e.error_type, str(e), e.retryable, e.attempts)
-        return []
+        with storage.transaction():
+            record_change(job, storage)
+            storage.record_source_failure(job.url, e.stage, e.error_type, str(e), e.retryable, e.attempts)
+        return None
+    job.articles = articles or []
+    return job
 
-    storage.save_page_hash(url, content_hash)
-    articles = articles or []
-    new_articles = storage.filter_new_articles(articles)
 
-    for article in new_articles:
-        article["type"] = mode
-        storage.add_seen(article["link"])
+async def persist_stage(job: SourceJob, storage: Storage, user_interests: List[str]) -> SourceJob:
+    url = job.url
+    articles = job.articles
+    new_articles = storage.filter_new_articles(articles)
+    # Only new articles go to the stronger model; known ones are not stored again.
+    if new_articles and route_enabled("rescore"):
+        with timed("rescore"):
+            try:
+                await rescore_borderline(new_articles, url, mode=job.mode, user_interests=user_interests)
+            except Exception as e:
+                # Failures keep the first-pass scores.
+                logger.warning("ai_rescore_skipped url=%s error=%s", url, e)
+
+    with timed("persist"):
+        for article in new_articles:
+            article["type"] = job.mode
+            article["score"] = calculate_final_score(article)
+            article.setdefault("score_reason", "AI scoring unavailable")
 
-    storage.record_extraction_result(url, len(articles), len(new_articles))
-    storage.record_source_success(url, stage="extract")
+        signature = None
+        if SIMHASH_MAX_DISTANCE >= 0:
+            signature = {"simhash": format_simhash(job.page.simhash), "link_signature": job.page.link_signature}
+        # Articles, seen marks, page hash and stats commit together, so nothing is lost mid-run.
+        # Known entries dropped before extraction still count as found on the page.
+        async with storage.unit():
+            record_change(job, storage)
+            storage.save_source_result(url, job.content_hash, len(articles) + job.known_items, new_articles, signature)
+        job.changed = False
     logger.info("source_done url=%s extracted=%s new=%s", url, len(articles), len(new_articles))
-    return new_articles
+    job.new_articles = new_articles
+    job.page = None
+    return job
+
+
+def build_stages(storage: Storage, user_interests: List[str], budget: RunBudget) -> List[Stage]:
+    return [
+        Stage("fetch", partial(fetch_stage, storage=storage, budget=budget), PIPELINE_WORKERS["fetch"]),
+        Stage("clean", partial(clean_stage, storage=storage), PIPELINE_WORKERS["clean"]),
+        Stage("diff", partial(diff_stage, storage=storage), PIPELINE_WORKERS["diff"]),
+        Stage(
+            "extract",
+            partial(extract_stage, storage=storage, user_interests=user_interests, budget=budget),
+            PIPELINE_WORKERS["extract"],
+        ),
+        Stage(
+            "persist",
+            partial(persist_stage, storage=storage, user_interests=user_interests),
+            PIPELINE_WORKERS["persist"],
+        ),
+    ]
 
 
-async def monitor_news() -> str:
-    logger.info("monitor_start target_count=%s", len(TARGET_URLS))
+async def process_source(url: str, storage: Storage, user_interests: List[str]) -> List[Dict[str, Any]]:
+    """Run a single source through every stage in order (no pipelining)."""
+    job: Optional[SourceJob] = SourceJob(0, url, storage.registry.get(url))
+    for stage in build_stages(storage, user_interests, RunBudget()):
+        job = await stage.handler(job)
+        if job is None:
+            return []
+    return job.new_articles
+
+
+async def monitor_news(
+    interactive: bool = True,
+    budget_seconds: Optional[float] = None,
+    urls: Optional[List[str]] = None,
+    storage: Optional[Storage] = None,
+    budget: Optional[RunBudget] = None,
+) -> str:
+    """Run every due source of the registry (or just ``urls``) once.
+
+    budget_seconds (default SCRAPER_RUN_BUDGET_SECONDS, 0 = unlimited) is a
+    wall-clock budget: sources start in order of expected yield and no new work
+    starts once the deadline is near. A caller that keeps running between
+    cycles (the daemon) passes its own storage and budget; the storage, HTTP
+    session and parse workers then stay open after the run.
+    """
+    if budget is None:
+        budget = RunBudget(RUN_BUDGET_SECONDS if budget_seconds is None else budget_seconds, RUN_DEADLINE_MARGIN_SECONDS)
+
+    owns_resources = storage is None
+    if owns_resources:
+        storage = Storage(writer=DB_WRITER)
+        await open_shared_session()
+    registry = storage.registry
+    urls = registry.due() if urls is None else list(urls)
+    logger.info("monitor_start target_count=%s budget_s=%s", len(urls), budget.seconds or "none")
 
     user_interests = extract_user_interests(os.path.join(DATA_DIR, "favorites.json"))
     if user_interests:
         logger.info("personalization_active top_interests=%s", user_interests[:5])
-
-    storage = Storage()
+    if BOILERPLATE_MIN_HITS > 0:
+        storage.prune_boilerplate(BOILERPLATE_TTL_DAYS)
     all_new_articles: List[Dict[str, Any]] = []
 
+    def record_unexpected(job: SourceJob, stage: str, error: Exception) -> None:
+        with storage.transaction():
+            record_change(job, storage)
+            storage.record_source_failure(job.url, stage, "unexpected_error", str(error), True, 1)
+
+    flusher = None
+    if storage.group_commit_sources > 1:
+        flusher = asyncio.create_task(flush_grouped_units(storage))
     try:
-        for url in TARGET_URLS:
-            all_new_articles.extend(await process_source(url, storage, user_interests))
+        order = {url: index for index, url in enumerate(urls)}
+        prioritized = prioritize_sources(urls, storage.source_health)
+        logger.info("monitor_source_order first=%s", prioritized[:5])
+        jobs = (SourceJob(order[url], url, registry.get(url)) for url in prioritized)
+        finished = await run_pipeline(
+            jobs,
+            build_stages(storage, user_interests, budget),
+            queue_size=PIPELINE_QUEUE_SIZE,
+            on_error=record_unexpected,
+        )
+        skipped_urls = {url for stage_urls in budget.skipped.values() for url in stage_urls}
+        for url in urls:
+            if url not in skipped_urls:
+                registry.mark_checked(url)
 
-        for article in all_new_articles:
-            article["score"] = calculate_final_score(article)
-            article.setdefault("score_reason", "AI scoring unavailable")
+        # Sources finish out of order; keep the configured order for equal scores.
+        for job in sorted(finished, key=lambda item: item.index):
+            all_new_articles.extend(job.new_articles)
 
+        # Every source already saved its articles; this pass only orders the preview.
         all_new_articles.sort(key=lambda item: item.get("score", 0), reverse=True)
 
         news_list = [a for a in all_new_articles if a.get("type") == "news"]
         paper_list = [a for a in all_new_articles if a.get("type") == "paper"]
 
-        if all_new_articles:
-            storage.save_latest_articles(all_new_articles)
-
         log_preview(news_list, paper_list)
-        prompt_for_bookmarks(storage, news_list, paper_list)
+        if interactive:
+            prompt_for_bookmarks(storage, news_list, paper_list)
         result_message = f"Found {len(all_new_articles)} new articles." if all_new_articles else "No new articles found."
+        skipped = sum(len(urls) for urls in budget.skipped.values())
+        if skipped:
+            logger.warning("monitor_deadline_reached skipped=%s by_stage=%s", skipped, {k: len(v) for k, v in budget.skipped.items()})
+            result_message += f" Skipped {skipped} source(s) at the run deadline."
         logger.info("monitor_done result=%s", result_message)
         return result_message
     finally:
+        if flusher is not None:
+            flusher.cancel()
         storage.save()
+        if owns_resources:
+            storage.close()
+            await close_shared_session()
+            shutdown_workers()
         logger.info("state_saved")
 
 
-def run_scraper(request):
+async def flush_grouped_units(storage: Storage) -> None:
+    """Commit grouped units that waited too long while no further source finished."""
+    while True:
+        await asyncio.sleep(storage.group_commit_seconds)
+        if storage.commit_due():
+            storage.flush()
+
+
+async def heartbeat_leases(storage: Storage, run_id: str, owner: str) -> None:
+    while True:
+        await asyncio.sleep(LEASE_TTL_SECONDS / 3)
+        storage.heartbeat_leases(run_id, owner, LEASE_TTL_SECONDS)
+
+
+async def run_worker(run_id: str, owner: Optional[str] = None, budget_seconds: Optional[float] = None) -> str:
+    """Claim sources from the shared lease table and process them until none are left.
+
+    Any number of processes can run this against the same database with the
+    same run_id; each source is processed by exactly one of them per run. A
+    worker that dies stops renewing its leases, and once they lapse another
+    worker takes those sources over.
+    """
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    budget = RunBudget(RUN_BUDGET_SECONDS if budget_seconds is None else budget_seconds, RUN_DEADLINE_MARGIN_SECONDS)
+    logger.info("worker_start run_id=%s owner=%s batch=%s", run_id, owner, LEASE_BATCH_SIZE)
+
+    storage = Storage(writer=DB_WRITER)
+    await open_shared_session()
+    heartbeat = asyncio.create_task(heartbeat_leases(storage, run_id, owner))
+    processed = 0
+    try:
+        while not budget.exhausted():
+            candidates = prioritize_sources(storage.registry.due(), storage.source_health)
+            urls = storage.claim_sources(candidates, run_id, owner, LEASE_TTL_SECONDS, LEASE_BATCH_SIZE)
+            if not urls:
+                break
+            await monitor_news(interactive=False, urls=urls, storage=storage, budget=budget)
+            skipped = {url for stage_urls in budget.skipped.values() for url in stage_urls}
+            done = [url for url in urls if url not in skipped]
+            storage.finish_leases(run_id, owner, done)
+            processed += len(done)
+    finally:
+        heartbeat.cancel()
+        # Sources skipped at the deadline (or left by an error) go back to the pool.
+        storage.release_leases(run_id, owner)
+        storage.close()
+        await close_shared_session()
+        shutdown_workers()
+    logger.info("worker_done run_id=%s owner=%s processed=%s", run_id, owner, processed)
+    return f"Worker {owner} processed {processed} source(s)."
+
+
+def run_workers(count: int, run_id: str) -> int:
+    """Start count worker processes on this database and wait for all of them."""
+    env = dict(os.environ)
+    # Each worker has its own parse pool; split the cores between them.
+    env.setdefault("SCRAPER_PARSE_WORKERS", str(max(1, (os.cpu_count() or 1) // count)))
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--run-id", run_id]
+    logger.info("workers_start run_id=%s count=%s", run_id, count)
+    processes = [subprocess.Popen(command, env=env) for _ in range(count)]
+    codes = [process.wait() for process in processes]
+    logger.info("workers_done run_id=%s exit_codes=%s", run_id, codes)
+    return next((code for code in codes if code), 0)
+
+
+def run_async(coro):
+    if sys.platform == "win32":
+        loop = asyncio.ProactorEventLoop()
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    return asyncio.run(coro)
+
+
+async def run_shard(index: int, count: int) -> str:
+    """Run this shard's part of the due sources (see merge_shards.py)."""
+    storage = Storage(writer=DB_WRITER)
+    try:
+        urls = shard_sources(storage.registry.due(), index, count)
+    finally:
+        storage.close()
+    logger.info("shard_start shard=%s/%s sources=%s", index, count, len(urls))
+    return await monitor_news(urls=urls)
+
+
+def run_scraper(request, shard: Optional[tuple] = None):
     logger.info("cloud_function_triggered")
     try:
-        if sys.platform == "win32":
-            loop = asyncio.ProactorEventLoop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(monitor_news())
-        else:
-            result = asyncio.run(monitor_news())
+        result = run_async(run_shard(*shard) if shard else monitor_news())
         return f"Success: {result}"
     except Exception as e:
         logger.exception("scraper_run_failed")
         return f"Error: {e}"
 
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape the configured sources once.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--shard", help="Only run shard i/n of the sources, e.g. one CI matrix job per shard (merge with merge_shards.py).")
+    mode.add_argument("--worker", action="store_true", help="Claim sources from the shared lease table until none are left.")
+    mode.add_argument("--workers", type=int, default=0, help="Start N --worker processes on this database and wait for them.")
+    parser.add_argument("--run-id", default=RUN_ID, help="Run shared by all workers (default SCRAPER_RUN_ID or GITHUB_RUN_ID).")
+    args = parser.parse_args(argv)
+    if args.worker and not args.run_id:
+        parser.error("--worker needs --run-id (or SCRAPER_RUN_ID) shared by every worker of the run")
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
 if __name__ == "__main__":
-    print(run_scraper(None))
+    args = parse_args()
+    if args.workers > 0:
+        sys.exit(run_workers(args.workers, args.run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")))
+    elif args.worker:
+        print(run_async(run_worker(args.run_id)))
+    elif args.shard:
+        index, count = args.shard
+        print(run_scraper(None, shard=(index, count)))
+    else:
+        print(run_scraper(None))
@@ -0,0 +1,141 @@
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# Allow `python news_project/merge_shards.py` to import the scraper package.
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scraper.sqlite_store import DB_PATH, connect, index_articles, max_article_id
+
+
+# Each shard database starts as a copy of the same base database and only
+# touches its own sources, so for every row the most recently updated copy wins.
+# Counters that every shard carries over from the base (origin occurrences,
+# boilerplate hits) take the maximum rather than the sum.
+
+
+def table_columns(conn: sqlite3.Connection, table: str, schema: str = "main") -> List[str]:
+    return [row["name"] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def shared_columns(conn: sqlite3.Connection, table: str, exclude: tuple = ("id",)) -> List[str]:
+    shard_columns = set(table_columns(conn, table, "shard"))
+    return [name for name in table_columns(conn, table) if name in shard_columns and name not in exclude]
+
+
+def upsert_newer(conn: sqlite3.Connection, table: str, key: str, newer_than: str) -> int:
+    """Copy shard rows into table, replacing existing ones only when newer_than is later in the shard."""
+    columns = shared_columns(conn, table)
+    names = ", ".join(columns)
+    updates = ", ".join(f"{name} = excluded.{name}" for name in columns if name != key)
+    conn.execute(
+        f"""
+        INSERT INTO {table} ({names})
+        SELECT {names} FROM shard.{table} WHERE true
+        ON CONFLICT({key}) DO UPDATE SET {updates}
+        WHERE COALESCE(excluded.{newer_than}, '') > COALESCE({table}.{newer_than}, '')
+        """
+    )
+    return int(conn.execute("SELECT changes()").fetchone()[0])
+
+
+def merge_shard(conn: sqlite3.Connection, shard_path: Path) -> Dict[str, int]:
+    conn.execute("ATTACH DATABASE ? AS shard", (str(shard_path),))
+    try:
+        with conn:
+            last_id = max_article_id(conn)
+            counts = {
+                "articles": upsert_newer(conn, "articles", "link", "updated_at"),
+                "sources": upsert_newer(conn, "sources", "url", "last_checked_at"),
+            }
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO article_tags(article_id, tag)
+                SELECT a.id, t.tag
+                FROM shard.article_tags t
+                JOIN shard.articles s ON s.id = t.article_id
+                JOIN main.articles a ON a.link = s.link
+                """
+            )
+            counts["article_tags"] = int(conn.execute("SELECT changes()").fetchone()[0])
+            index_articles(conn, last_id, (row[0] for row in conn.execute("SELECT link FROM shard.articles")))
+            conn.execute(
+                """
+                INSERT INTO article_origins(article_id, file_name, dataset_status, occurrence_count)
+                SELECT a.id, o.file_name, o.dataset_status, o.occurrence_count
+                FROM shard.article_origins o
+                JOIN shard.articles s ON s.id = o.article_id
+                JOIN main.articles a ON a.link = s.link
+                WHERE true
+                ON CONFLICT(article_id, file_name) DO UPDATE SET
+                    dataset_status = CASE
+                        WHEN excluded.occurrence_count > article_origins.occurrence_count THEN excluded.dataset_status
+                        ELSE article_origins.dataset_status
+                    END,
+                    occurrence_count = MAX(article_origins.occurrence_count, excluded.occurrence_count)
+                """
+            )
+            counts["article_origins"] = int(conn.execute("SELECT changes()").fetchone()[0])
+            conn.execute("INSERT OR IGNORE INTO seen_links(link) SELECT link FROM shard.seen_links")
+            counts["seen_links"] = int(conn.execute("SELECT changes()").fetchone()[0])
+            conn.execute(
+                """
+                INSERT INTO source_failures(source_id, time, stage, error_type, message, retryable, attempts)
+                SELECT m.id, f.time, f.stage, f.error_type, f.message, f.retryable, f.attempts
+                FROM shard.source_failures f
+                JOIN shard.sources s ON s.id = f.source_id
+                JOIN main.sources m ON m.url = s.url
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM main.source_failures e
+                    WHERE e.source_id = m.id AND e.time IS f.time AND e.stage IS f.stage AND e.message IS f.message
+                )
+                ORDER BY f.id
+                """
+            )
+            counts["source_failures"] = int(conn.execute("SELECT changes()").fetchone()[0])
+            conn.execute(
+                """
+                INSERT INTO boilerplate_blocks(domain, fingerprint, hits, sample, first_seen_at, last_seen_at)
+                SELECT domain, fingerprint, hits, sample, first_seen_at, last_seen_at FROM shard.boilerplate_blocks WHERE true
+                ON CONFLICT(domain, fingerprint) DO UPDATE SET
+                    hits = MAX(boilerplate_blocks.hits, excluded.hits),
+                    first_seen_at = MIN(boilerplate_blocks.first_seen_at, excluded.first_seen_at),
+                    last_seen_at = MAX(boilerplate_blocks.last_seen_at, excluded.last_seen_at)
+                """
+            )
+            counts["boilerplate_blocks"] = int(conn.execute("SELECT changes()").fetchone()[0])
+        return counts
+    finally:
+        conn.execute("DETACH DATABASE shard")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Merge the databases written by `main.py --shard i/n` jobs into one.")
+    parser.add_argument("shards", nargs="+", help="Shard database files.")
+    parser.add_argument("--db", default=str(DB_PATH), help="Database to merge into (usually the base the shards were copied from).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    db_path = Path(args.db).resolve()
+    conn = connect(db_path, profile="bulk")
+    try:
+        for shard in args.shards:
+            shard_path = Path(shard).resolve()
+            if shard_path == db_path:
+                continue
+            # Bring the shard's schema up to date before reading it.
+            connect(shard_path).close()
+            counts = merge_shard(conn, shard_path)
+            print(f"merged {shard_path.name}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+    finally:
+        conn.close()
+    print(f"SQLite database ready: {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import re
 from datetime import datetime
 from typing import Any, Dict, List
 
@@ -6,6 +7,18 @@ from news_project.scraper.config import LLM_API_KEY, LLM_BASE_URL, LLM_MODEL
 
 
 MAX_CONTEXT_ITEMS = 200
+# Question words that match nearly every article; dropped from the search terms.
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "as", "at", "be", "by", "can", "did", "do", "does", "for",
+    "from", "have", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "there", "this",
+    "that", "to", "was", "were", "what", "when", "which", "who", "why", "with", "you",
+}
+
+
+def query_terms(query: str) -> List[str]:
+    """Lowercase search terms of a question: punctuation stripped, stopwords dropped."""
+    terms = (term.strip(".-") for term in re.findall(r"\w[\w+#.\-]*", query.lower()))
+    return [term for term in dict.fromkeys(terms) if term and term not in STOPWORDS]
 
 
 class LibraryChat:
@@ -15,7 +28,7 @@ class LibraryChat:
 
     def load_library(self):
         """Loads the favorite library from SQLite into memory."""
-        conn = db.connect()
+        conn = db.connect(profile="reader")
         try:
             self.articles = db.load_articles(conn, favorites=True)
         finally:
@@ -28,40 +41,34 @@ class LibraryChat:
         return str(article.get(key) or "")
 
     def retrieve_relevant(self, query: str) -> List[Dict]:
+        """Favorites matching any query term: most terms matched first, then personal_score, then bm25."""
+        terms = query_terms(query)
+        docs = []
+        if terms:
+            conn = db.connect(profile="reader")
+            try:
+                # bm25 order; the library is small enough to rerank all matches.
+                docs = db.search_articles(conn, " ".join(terms), any_term=True, favorites=True, limit=None)
+            finally:
+                conn.close()
+        if docs:
+            scored = []
+            for article in docs:
+                text = " ".join(
+                    [self.article_text(article, "title"), self.article_text(article, "summary")]
+                    + list(article.get("tags", []))
+                    + [self.article_text(article, "comment")]
+                ).lower()
+                match_count = sum(1 for term in terms if term in text)
+                scored.append((match_count * 10 + int(article.get("personal_score") or 0) * 0.1, article))
+            # Stable: equal scores keep the bm25 order.
+            scored.sort(key=lambda item: item[0], reverse=True)
+            return [article for _, article in scored[:MAX_CONTEXT_ITEMS]]
+
         if not self.articles:
             self.load_library()
-
-        query_terms = query.lower().split()
-
-        scored_docs = []
-        for article in self.articles:
-            score = 0
-            text = (
-                self.article_text(article, "title")
-                + " "
-                + self.article_text(article, "summary")
-                + " "
-                + " ".join(article.get("tags", []))
-                + " "
-                + self.article_text(article, "comment")
-            ).lower()
-
-            match_count = sum(1 for term in query_terms if term in text)
-            if match_count > 0:
-                score += match_count * 10
-
-            score += int(article.get("personal_score", 0)) * 0.1
-
-            if score > 0:
-                scored_docs.append((score, article))
-
-        scored_docs.sort(key=lambda x: x[0], reverse=True)
-
-        if not scored_docs:
-            favorites = [a for a in self.articles if a.get("personal_score", 0) > 50]
-            return favorites[:MAX_CONTEXT_ITEMS]
-
-        return [item[1] for item in scored_docs[:MAX_CONTEXT_ITEMS]]
+        favorites = [a for a in self.articles if a.get("personal_score", 0) > 50]
+        return favorites[:MAX_CONTEXT_ITEMS]
 
     async def ask_llm(self, query: str, context_docs: List[Dict[str, Any]]):
         from openai import OpenAI
@@ -0,0 +1,34 @@
+"""Per-domain fingerprints of cleaned lines that repeat across page versions.
+
+Headers, cookie banners, mega-menus and "related stories" rails survive the
+fixed noise selectors but come back unchanged every time a listing page
+changes. Counting how many distinct page versions of a domain contained each
+line lets the scraper drop them before hashing and extraction without
+per-site rules.
+"""
+import hashlib
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def block_fingerprint(line: str) -> str:
+    normalized = " ".join(line.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint_blocks(lines: Iterable[str]) -> Dict[str, str]:
+    """fingerprint -> first line that produced it."""
+    blocks: Dict[str, str] = {}
+    for line in lines:
+        if line:
+            blocks.setdefault(block_fingerprint(line), line)
+    return blocks
+
+
+def strip_blocks(lines: List[str], boilerplate: Set[str]) -> Tuple[List[str], int]:
+    """Drop known boilerplate lines; keep the page untouched if nothing would remain."""
+    if not boilerplate:
+        return lines, 0
+    kept = [line for line in lines if block_fingerprint(line) not in boilerplate]
+    if not kept:
+        return lines, 0
+    return kept, len(lines) - len(kept)
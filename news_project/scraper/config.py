@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 from .observability import get_logger
 
@@ -10,6 +11,8 @@ logger = get_logger(__name__)
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 # 目标网站列表
+# Built-in sources. They seed the source registry (scraper/sources.py) when no
+# sources file exists; per-source settings live in the file or the sources table.
 TARGET_URLS = [
     "https://about.fb.com/news/",
     "https://ai.meta.com/blog/",
@@ -39,33 +42,163 @@ TARGET_URLS = [
 
 # LLM API configuration.
 # Prefer Gemini environment variables; local development can use gemini_api_key.txt.
-LLM_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GEMINI_API") or os.getenv("GOOGLE_API_KEY") or ""
 LLM_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
 LLM_MODEL = os.getenv("GEMINI_MODEL", "gemini-3.5-flash")
+DEEPSEEK_BASE_URL = LLM_BASE_URL
 
-# If running locally, load the API key from the local file.
 local_key_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "gemini_api_key.txt"))
-if os.path.exists(local_key_path):
+
+
+@lru_cache(maxsize=None)
+def get_llm_api_key() -> str:
+    """API key from the environment or, when running locally, gemini_api_key.txt.
+
+    Resolved on first use instead of at import time so tools that never call the
+    model don't touch the key file.
+    """
+    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GEMINI_API") or os.getenv("GOOGLE_API_KEY") or ""
+    # If running locally, load the API key from the local file.
+    if os.path.exists(local_key_path):
+        try:
+            with open(local_key_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("GEMINI_API_KEY="):
+                        api_key = line.split("=", 1)[1].strip()
+                        break
+                    if line and "=" not in line:
+                        api_key = line
+                        break
+        except Exception as e:
+            logger.warning("local_api_key_read_failed error=%s", e)
+
+    if api_key:
+        logger.debug("llm_api_key_configured model=%s", LLM_MODEL)
+    else:
+        logger.warning("llm_api_key_missing")
+    return api_key
+
+
+def __getattr__(name: str):
+    # Keep `from scraper.config import LLM_API_KEY` working without an import-time read.
+    if name in ("LLM_API_KEY", "DEEPSEEK_API_KEY"):
+        return get_llm_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _env_band(name: str, default: str) -> tuple:
     try:
-        with open(local_key_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("GEMINI_API_KEY="):
-                    LLM_API_KEY = line.split("=", 1)[1].strip()
-                    break
-                if line and "=" not in line:
-                    LLM_API_KEY = line
-                    break
-    except Exception as e:
-        logger.warning("local_api_key_read_failed error=%s", e)
-
-DEEPSEEK_API_KEY = LLM_API_KEY
-DEEPSEEK_BASE_URL = LLM_BASE_URL
+        low, high = (int(part) for part in os.getenv(name, default).split(",", 1))
+    except Exception:
+        low, high = (int(part) for part in default.split(","))
+    return min(low, high), max(low, high)
+
+
+# Per-stage model routing.
+# "extract" turns a listing page into articles and runs on a fast, cheap model.
+# "rescore" only sees articles whose ai_score falls in RESCORE_BAND; leave
+# GEMINI_RESCORE_MODEL empty to disable the second pass.
+MODEL_ROUTES = {
+    "extract": {
+        "model": os.getenv("GEMINI_EXTRACT_MODEL", LLM_MODEL),
+        "base_url": os.getenv("GEMINI_EXTRACT_BASE_URL", LLM_BASE_URL),
+        "concurrency": int(os.getenv("GEMINI_EXTRACT_CONCURRENCY", "4")),
+    },
+    "rescore": {
+        "model": os.getenv("GEMINI_RESCORE_MODEL", ""),
+        "base_url": os.getenv("GEMINI_RESCORE_BASE_URL", LLM_BASE_URL),
+        "concurrency": int(os.getenv("GEMINI_RESCORE_CONCURRENCY", "2")),
+    },
+}
+RESCORE_BAND = _env_band("SCRAPER_RESCORE_BAND", "40,75")
+
+# Cross-run boilerplate stripping.
+# A cleaned line is boilerplate for a domain once it has appeared unchanged in
+# BOILERPLATE_MIN_HITS distinct page versions of that domain; fingerprints not
+# seen for BOILERPLATE_TTL_DAYS are forgotten. Set BOILERPLATE_MIN_HITS=0 to disable.
+BOILERPLATE_MIN_HITS = int(os.getenv("SCRAPER_BOILERPLATE_MIN_HITS", "4"))
+BOILERPLATE_TTL_DAYS = int(os.getenv("SCRAPER_BOILERPLATE_TTL_DAYS", "30"))
+
+# Near-duplicate check: a changed page whose SimHash is within this many bits of
+# the last extracted version, and whose set of links is identical, is treated as
+# unchanged. -1 keeps the exact hash comparison only.
+SIMHASH_MAX_DISTANCE = int(os.getenv("SCRAPER_SIMHASH_MAX_DISTANCE", "6"))
+
+# CPU-bound work (HTML parse/clean/hash, arXiv XML, large JSON replies) runs in
+# an executor so fetches keep flowing: "process" (default), "thread" or "inline".
+# At most PARSE_QUEUE_SIZE jobs are in flight, which keeps memory bounded.
+PARSE_EXECUTOR = os.getenv("SCRAPER_PARSE_EXECUTOR", "process").lower()
+PARSE_WORKERS = max(1, int(os.getenv("SCRAPER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))))
+PARSE_QUEUE_SIZE = max(1, int(os.getenv("SCRAPER_PARSE_QUEUE_SIZE", str(PARSE_WORKERS * 2))))
+
+# Workers per pipeline stage: fetch is network-bound, clean is CPU-bound (runs in
+# the parse executor), extract is LLM-bound, diff/persist touch SQLite.
+PIPELINE_WORKERS = {
+    "fetch": int(os.getenv("SCRAPER_FETCH_WORKERS", "6")),
+    "clean": int(os.getenv("SCRAPER_CLEAN_WORKERS", str(PARSE_WORKERS))),
+    "diff": 1,
+    "extract": int(os.getenv("SCRAPER_EXTRACT_WORKERS", str(MODEL_ROUTES["extract"]["concurrency"]))),
+    "persist": 1,
+}
+PIPELINE_QUEUE_SIZE = max(1, int(os.getenv("SCRAPER_PIPELINE_QUEUE_SIZE", "4")))
+
+# Pre-LLM link filter: "arxiv" (default) drops arXiv entries whose link is already
+# known before extraction; "all" also drops link items of other pages whose links
+# are all known; "off" sends every page whole.
+PRE_LLM_LINK_FILTER = os.getenv("SCRAPER_PRE_LLM_LINK_FILTER", "arxiv").lower()
+
+# Group commit: every source's writes form one unit of work (one transaction).
+# With GROUP_COMMIT_SOURCES > 1, finished units are committed together once that
+# many are pending or the oldest waited GROUP_COMMIT_SECONDS; a crash loses at
+# most that many whole sources, which the next run processes again.
+# An open group holds the database write lock, so keep 1 for worker mode.
+GROUP_COMMIT_SOURCES = max(1, int(os.getenv("SCRAPER_GROUP_COMMIT_SOURCES", "1")))
+GROUP_COMMIT_SECONDS = max(0.0, float(os.getenv("SCRAPER_GROUP_COMMIT_SECONDS", "2")))
+
+# Background database writer for scraper runs (SCRAPER_DB_WRITER=0 writes on the
+# event loop instead). Writes queued behind each other commit together; a batch
+# closes at DB_WRITER_BATCH_SIZE units or after DB_WRITER_FLUSH_SECONDS. With
+# the writer, the GROUP_COMMIT_* settings do not apply.
+DB_WRITER = os.getenv("SCRAPER_DB_WRITER", "1") != "0"
+DB_WRITER_BATCH_SIZE = max(1, int(os.getenv("SCRAPER_DB_WRITER_BATCH_SIZE", "64")))
+DB_WRITER_FLUSH_SECONDS = max(0.0, float(os.getenv("SCRAPER_DB_WRITER_FLUSH_SECONDS", "0.5")))
+
+# Seen-link Bloom filter for large histories: instead of loading every known link
+# into memory, a memory-mapped filter file answers "never seen" and SQLite only
+# confirms its positives. "1" puts the file next to the database, any other
+# value is its path; empty (default) keeps the in-memory set. The filter is sized
+# for SEEN_FILTER_CAPACITY links at SEEN_FILTER_ERROR_RATE false positives and
+# doubles when it fills up.
+SEEN_FILTER = os.getenv("SCRAPER_SEEN_FILTER", "")
+SEEN_FILTER_CAPACITY = max(1000, int(os.getenv("SCRAPER_SEEN_FILTER_CAPACITY", "1000000")))
+SEEN_FILTER_ERROR_RATE = min(0.5, max(1e-9, float(os.getenv("SCRAPER_SEEN_FILTER_ERROR_RATE", "0.001"))))
+
+# Wall-clock budget for one run (0 = unlimited). New fetches and extractions stop
+# RUN_DEADLINE_MARGIN_SECONDS before the deadline; finished sources are kept.
+RUN_BUDGET_SECONDS = float(os.getenv("SCRAPER_RUN_BUDGET_SECONDS", "0"))
+RUN_DEADLINE_MARGIN_SECONDS = float(os.getenv("SCRAPER_DEADLINE_MARGIN_SECONDS", "60"))
+
+# Daemon mode (run_loop.py / news_project/daemon.py): each source is re-run every
+# DAEMON_INTERVAL_SECONDS, spread by +/- DAEMON_JITTER, and a control endpoint
+# listens on 127.0.0.1:DAEMON_PORT (0 disables it).
+DAEMON_INTERVAL_SECONDS = float(os.getenv("SCRAPER_DAEMON_INTERVAL_SECONDS", str(6 * 3600)))
+DAEMON_JITTER = min(0.5, max(0.0, float(os.getenv("SCRAPER_DAEMON_JITTER", "0.1"))))
+DAEMON_PORT = int(os.getenv("SCRAPER_DAEMON_PORT", "8766"))
+
+# Source registry: a JSON list of urls or {"url": ..., "mode": ..., ...} objects
+# that replaces TARGET_URLS when present. SOURCE_CADENCE_SECONDS is the default
+# minimum time between two checks of a source (0 = every run).
+SOURCES_FILE = os.getenv("SCRAPER_SOURCES_FILE", os.path.join(DATA_DIR, "sources.json"))
+SOURCE_CADENCE_SECONDS = max(0.0, float(os.getenv("SCRAPER_SOURCE_CADENCE_SECONDS", "0")))
 
-if LLM_API_KEY:
-    logger.debug("llm_api_key_configured model=%s", LLM_MODEL)
-else:
-    logger.warning("llm_api_key_missing")
+# Worker mode (main.py --worker / --workers N): processes sharing the database
+# claim sources LEASE_BATCH_SIZE at a time from the source_leases table. Leases
+# are renewed every LEASE_TTL_SECONDS / 3; one that lapses (crashed worker) is
+# claimed again. Workers of one run share RUN_ID (default: GITHUB_RUN_ID; the
+# --workers launcher generates one).
+LEASE_TTL_SECONDS = max(30.0, float(os.getenv("SCRAPER_LEASE_TTL_SECONDS", "300")))
+LEASE_BATCH_SIZE = max(1, int(os.getenv("SCRAPER_LEASE_BATCH_SIZE", "4")))
+RUN_ID = os.getenv("SCRAPER_RUN_ID") or os.getenv("GITHUB_RUN_ID") or ""
 
 # 🍪 Cookie 配置中心
 SITE_COOKIES = {
@@ -1,20 +1,24 @@
-import json
 import re
 import asyncio
 import os
 import random
 import time
-from openai import OpenAI
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple, Union
 import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
 
-from .utils import clean_html_for_ai
-from .config import LLM_API_KEY, LLM_BASE_URL, LLM_MODEL, SITE_COOKIES
+from .page import PageDocument, as_page
+from .config import SITE_COOKIES
 from .rankings import get_ranking, CCF_RANKINGS, get_venue_score # Updated Import
 from .observability import get_logger
+from .routing import complete, parse_json_response
+from .sources import infer_adapter
+from .utils import MAX_CLEAN_CHARS
+from .workers import run_cpu
 
-from curl_cffi.requests import AsyncSession
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
 
 logger = get_logger(__name__)
 
@@ -22,9 +26,10 @@ FETCH_MAX_RETRIES = int(os.getenv("SCRAPER_FETCH_RETRIES", "3"))
 AI_MAX_RETRIES = int(os.getenv("SCRAPER_AI_RETRIES", "3"))
 BACKOFF_BASE_SECONDS = float(os.getenv("SCRAPER_BACKOFF_SECONDS", "1.5"))
 PER_HOST_DELAY_SECONDS = float(os.getenv("SCRAPER_PER_HOST_DELAY_SECONDS", "1.0"))
+# Serve pages from recorded fixtures instead of the network (benchmarks, offline runs).
+FIXTURE_DIR = os.getenv("SCRAPER_FIXTURE_DIR", "")
 
 _last_request_at: Dict[str, float] = {}
-_rate_limit_lock = asyncio.Lock()
 
 
 class ScraperError(Exception):
@@ -70,24 +75,64 @@ def _classify_exception(error: Exception, status_code: int = None) -> tuple[str,
     return "unknown_error", True
 
 
-async def _rate_limit(url: str) -> None:
-    if PER_HOST_DELAY_SECONDS <= 0:
+async def _rate_limit(url: str, delay_seconds: Optional[float] = None) -> None:
+    delay_seconds = PER_HOST_DELAY_SECONDS if delay_seconds is None else delay_seconds
+    if delay_seconds <= 0:
         return
 
     host = urlparse(url).netloc or url
-    async with _rate_limit_lock:
-        now = time.monotonic()
-        last_seen = _last_request_at.get(host, 0)
-        wait_for = PER_HOST_DELAY_SECONDS - (now - last_seen)
-        if wait_for > 0:
-            await asyncio.sleep(wait_for)
-        _last_request_at[host] = time.monotonic()
+    # Reserve this request's slot before sleeping: the next caller for the host
+    # queues behind it, and callers for other hosts never wait. No await between
+    # the read and the write, so no lock is needed on the event loop.
+    now = time.monotonic()
+    slot = max(now, _last_request_at.get(host, float("-inf")) + delay_seconds)
+    _last_request_at[host] = slot
+    if slot > now:
+        await asyncio.sleep(slot - now)
 
 
-async def _get_with_retries(session: AsyncSession, request_url: str, *, source_url: str, headers=None, timeout=30):
+# Optional long-lived HTTP session (connection pool) shared by every fetch of a
+# run or of a daemon's lifetime; without one each fetch opens its own session.
+_shared_session: Optional[Tuple[asyncio.AbstractEventLoop, "AsyncSession"]] = None
+
+
+def _new_session() -> "AsyncSession":
+    # curl_cffi is imported on first fetch; it is the slowest import of the scraper.
+    from curl_cffi.requests import AsyncSession
+
+    return AsyncSession(impersonate="chrome120")
+
+
+async def open_shared_session() -> None:
+    global _shared_session
+    await close_shared_session()
+    _shared_session = (asyncio.get_running_loop(), _new_session())
+
+
+async def close_shared_session() -> None:
+    global _shared_session
+    shared, _shared_session = _shared_session, None
+    if shared is not None:
+        try:
+            await shared[1].close()
+        except Exception as e:
+            logger.warning("http_session_close_failed error=%s", e)
+
+
+@asynccontextmanager
+async def _http_session():
+    shared = _shared_session
+    if shared is not None and shared[0] is asyncio.get_running_loop():
+        yield shared[1]
+        return
+    async with _new_session() as session:
+        yield session
+
+
+async def _get_with_retries(session: "AsyncSession", request_url: str, *, source_url: str, headers=None, timeout=30, delay_seconds=None):
     last_error = None
     for attempt in range(1, FETCH_MAX_RETRIES + 1):
-        await _rate_limit(source_url)
+        await _rate_limit(source_url, delay_seconds)
         try:
             response = await session.get(request_url, timeout=timeout, headers=headers)
             if response.status_code >= 400:
@@ -132,7 +177,68 @@ async def _get_with_retries(session: AsyncSession, request_url: str, *, source_u
     )
 
 
-async def _fetch_arxiv_listing(source_url: str) -> str:
+def parse_arxiv_batch(content: bytes, cutoff_date) -> Dict[str, Any]:
+    """Parse one arXiv API page into article HTML; runs in the parse executor.
+
+    Returns {"entries": total entries in the feed, "html": [article snippets],
+    "reached_cutoff": True once an entry older than cutoff_date was seen}.
+    """
+    from datetime import datetime, timezone
+
+    root = ET.fromstring(content)
+    ns = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+    entries = root.findall("atom:entry", ns)
+    html_parts = []
+    reached_cutoff = False
+
+    for entry in entries:
+        published = entry.find("atom:published", ns)
+        title_node = entry.find("atom:title", ns)
+        summary_node = entry.find("atom:summary", ns)
+        link_node = entry.find("atom:id", ns)
+        if published is None or title_node is None or summary_node is None or link_node is None:
+            continue
+
+        published_str = published.text.strip()
+        try:
+            pub_date = datetime.strptime(published_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        except Exception:
+            pub_date = datetime.now(timezone.utc)
+
+        if pub_date < cutoff_date:
+            reached_cutoff = True
+            break
+
+        title = title_node.text.strip().replace("\n", " ")
+        summary = summary_node.text.strip().replace("\n", " ")
+        link = link_node.text.strip()
+
+        venue_info = []
+        journal_ref = entry.find("arxiv:journal_ref", ns)
+        comment = entry.find("arxiv:comment", ns)
+        if journal_ref is not None and journal_ref.text:
+            venue_info.append(f"Journal: {journal_ref.text}")
+        if comment is not None and comment.text:
+            venue_info.append(f"Comment: {comment.text}")
+
+        venue_str = " | ".join(venue_info)
+        if venue_str:
+            venue_str = get_ranking(venue_str)
+
+        html_parts.append(
+            "<article>"
+            f"<h2>{title}</h2>"
+            f"<p>Date: {published_str}</p>"
+            f"<p>Venue: {venue_str}</p>"
+            f"<p>Link: {link}</p>"
+            f"<div>{summary}</div>"
+            "</article><hr/>"
+        )
+
+    return {"entries": len(entries), "html": html_parts, "reached_cutoff": reached_cutoff}
+
+
+async def _fetch_arxiv_listing(source_url: str, delay_seconds: Optional[float] = None) -> str:
     match = re.search(r"list/([^/]+)", source_url)
     if not match:
         raise ScraperError(
@@ -155,16 +261,16 @@ async def _fetch_arxiv_listing(source_url: str) -> str:
 
     logger.info("arxiv_fetch_start url=%s category=%s cutoff=%s", source_url, category, cutoff_date.date())
 
-    async with AsyncSession(impersonate="chrome120") as session:
+    async with _http_session() as session:
         while not stop_fetching and fetched_count < 100:
             api_url = (
                 "http://export.arxiv.org/api/query?"
                 f"search_query=cat:{category}&sortBy=submittedDate&sortOrder=descending"
                 f"&start={offset}&max_results={max_results}"
             )
-            response = await _get_with_retries(session, api_url, source_url=source_url)
+            response = await _get_with_retries(session, api_url, source_url=source_url, delay_seconds=delay_seconds)
             try:
-                root = ET.fromstring(response.content)
+                batch = await run_cpu(parse_arxiv_batch, response.content, cutoff_date)
             except Exception as e:
                 raise ScraperError(
                     str(e),
@@ -174,59 +280,15 @@ async def _fetch_arxiv_listing(source_url: str) -> str:
                     url=source_url,
                 ) from e
 
-            ns = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
-            entries = root.findall("atom:entry", ns)
-            if not entries:
+            if not batch["entries"]:
                 break
 
-            batch_valid_count = 0
-            for entry in entries:
-                published = entry.find("atom:published", ns)
-                title_node = entry.find("atom:title", ns)
-                summary_node = entry.find("atom:summary", ns)
-                link_node = entry.find("atom:id", ns)
-                if published is None or title_node is None or summary_node is None or link_node is None:
-                    continue
-
-                published_str = published.text.strip()
-                try:
-                    pub_date = datetime.strptime(published_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
-                except Exception:
-                    pub_date = datetime.now(timezone.utc)
-
-                if pub_date < cutoff_date:
-                    stop_fetching = True
-                    break
-
-                batch_valid_count += 1
-                fetched_count += 1
-
-                title = title_node.text.strip().replace("\n", " ")
-                summary = summary_node.text.strip().replace("\n", " ")
-                link = link_node.text.strip()
-
-                venue_info = []
-                journal_ref = entry.find("arxiv:journal_ref", ns)
-                comment = entry.find("arxiv:comment", ns)
-                if journal_ref is not None and journal_ref.text:
-                    venue_info.append(f"Journal: {journal_ref.text}")
-                if comment is not None and comment.text:
-                    venue_info.append(f"Comment: {comment.text}")
-
-                venue_str = " | ".join(venue_info)
-                if venue_str:
-                    venue_str = get_ranking(venue_str)
-
-                html_parts.append("<article>")
-                html_parts.append(f"<h2>{title}</h2>")
-                html_parts.append(f"<p>Date: {published_str}</p>")
-                html_parts.append(f"<p>Venue: {venue_str}</p>")
-                html_parts.append(f"<p>Link: {link}</p>")
-                html_parts.append(f"<div>{summary}</div>")
-                html_parts.append("</article><hr/>")
+            batch_valid_count = len(batch["html"])
+            fetched_count += batch_valid_count
+            html_parts.extend(batch["html"])
 
             logger.info("arxiv_fetch_batch url=%s offset=%s count=%s total=%s", source_url, offset, batch_valid_count, fetched_count)
-            if batch_valid_count < len(entries):
+            if batch["reached_cutoff"] or batch_valid_count < batch["entries"]:
                 stop_fetching = True
             offset += max_results
 
@@ -234,15 +296,43 @@ async def _fetch_arxiv_listing(source_url: str) -> str:
     return "".join(html_parts)
 
 
-async def fetch_webpage(url: str, raise_on_error: bool = False) -> str:
+def fixture_name(url: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", url.split("://", 1)[-1]).strip("_") + ".html"
+
+
+def _read_fixture(source_url: str) -> str:
+    path = os.path.join(FIXTURE_DIR, fixture_name(source_url))
+    if not os.path.exists(path):
+        raise ScraperError(
+            f"no fixture recorded at {path}",
+            stage="fetch",
+            error_type="fixture_missing",
+            retryable=False,
+            url=source_url,
+        )
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def fetch_webpage(
+    url: str,
+    raise_on_error: bool = False,
+    adapter: Optional[str] = None,
+    delay_seconds: Optional[float] = None,
+) -> str:
+    """Download a source page. adapter and delay_seconds come from the source registry."""
     source_url = url
+    adapter = adapter or infer_adapter(source_url)
     try:
-        if "newsroom.tiktok.com" in url and "_data" not in url:
+        if FIXTURE_DIR:
+            return _read_fixture(source_url)
+
+        if adapter == "tiktok" and "_data" not in url:
             url = f"{url.split('?')[0]}?_data=routes%2F_app._index&lang=en"
             logger.info("fetch_tiktok_data_endpoint source_url=%s request_url=%s", source_url, url)
 
-        if "arxiv.org/list/" in source_url:
-            return await _fetch_arxiv_listing(source_url)
+        if adapter == "arxiv":
+            return await _fetch_arxiv_listing(source_url, delay_seconds)
 
         headers = {
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -257,8 +347,10 @@ async def fetch_webpage(url: str, raise_on_error: bool = False) -> str:
                 break
 
         logger.info("fetch_start url=%s", source_url)
-        async with AsyncSession(impersonate="chrome120") as session:
-            response = await _get_with_retries(session, url, source_url=source_url, headers=headers, timeout=30)
+        async with _http_session() as session:
+            response = await _get_with_retries(
+                session, url, source_url=source_url, headers=headers, timeout=30, delay_seconds=delay_seconds
+            )
 
         if "application/json" in response.headers.get("content-type", ""):
             try:
@@ -297,14 +389,22 @@ async def fetch_webpage(url: str, raise_on_error: bool = False) -> str:
         return ""
 
 
-async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", user_interests: List[str] = None) -> List[Dict[str, Any]]:
+async def _extract_news_with_ai_once(
+    page: PageDocument,
+    url: str,
+    mode: str = "news",
+    user_interests: List[str] = None,
+    max_chars: int = MAX_CLEAN_CHARS,
+    concurrency: int = 1,
+) -> List[Dict[str, Any]]:
     """
     使用 AI 智能提取信息
+    page: 已解析/清洗过的页面 (PageDocument)，各阶段共享同一份清洗结果
     mode: "news" (默认新闻) 或 "paper" (科研论文)
     user_interests: 用户收藏夹关键词列表 (用于 Personal Score)
+    max_chars: 每次请求发送给模型的最大字符数 (来源的 token 预算)
+    concurrency: arXiv 分批时同时进行的请求数
     """
-    client = OpenAI(api_key=LLM_API_KEY, base_url=LLM_BASE_URL)
-    
     # 获取今天日期
     from datetime import date
     today_str = date.today().strftime("%Y-%m-%d")
@@ -318,7 +418,7 @@ async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", us
         personal_context = "\n   - `personal_score` (0-100): 默认为 0 (无用户偏好数据)。"
 
     # Helper function to query AI
-    def _query_ai(text_content: str) -> List[Dict[str, Any]]:
+    async def _query_ai(text_content: str) -> List[Dict[str, Any]]:
         # 构造 CCF 上下文简表
         ccf_context = "Rankings Reference:\n"
         class_a = [k for k, v in CCF_RANKINGS.items() if v == "CCF A"]
@@ -351,7 +451,7 @@ async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", us
 {ccf_context}
 
 网页内容：
-{text_content[:60000]}
+{text_content[:max_chars]}
 
 返回 JSON 格式：
 [
@@ -391,7 +491,7 @@ async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", us
 3. 过滤非新闻内容。只返回 JSON 数组。
 
 网页内容：
-{text_content[:60000]}
+{text_content[:max_chars]}
 
 返回 JSON 格式：
 [
@@ -411,23 +511,17 @@ async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", us
 ]
 """
         try:
-            response = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
+            result_text = await complete(
+                "extract",
+                [
                     {"role": "system", "content": "你是一个新闻提取专家。只返回纯净的 JSON 数组。summary 必须是中文。"},
                     {"role": "user", "content": prompt}
                 ],
-                stream=False,
-                temperature=0.1
             )
             
-            result_text = response.choices[0].message.content.strip()
-            if result_text.startswith("```"):
-                result_text = re.sub(r"^```(json)?|```$", "", result_text, flags=re.MULTILINE).strip()
-            
             logger.debug("ai_result_sample url=%s sample=%s", url, result_text[:500])
                 
-            data = json.loads(result_text)
+            data = await run_cpu(parse_json_response, result_text)
             return data if isinstance(data, list) else []
             
         except Exception as e:
@@ -444,34 +538,45 @@ async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", us
     final_articles = []
     
     # Check for Arxiv Batching Strategy
-    if mode == "paper" and "arxiv.org" in url and "<h1>Arxiv" in html:
-        # Split raw HTML by article tag
-        raw_articles = re.findall(r"<article>.*?</article>", html, re.DOTALL)
+    if mode == "paper" and page.is_arxiv_listing:
+        # One cleaned block per <article>, split from the already-parsed page
+        raw_articles = page.blocks
         logger.info("ai_batch_start url=%s raw_articles=%s", url, len(raw_articles))
         
         # Batch size of 8 keeps responses within typical hosted model output limits.
         batch_size = 8
         
-        for i in range(0, len(raw_articles), batch_size):
-            batch = raw_articles[i : i+batch_size]
-            logger.info("ai_batch_process url=%s batch=%s size=%s", url, i // batch_size + 1, len(batch))
-            
-            # Clean just this batch
-            batch_text = "<html><body>" + "\n".join(batch) + "</body></html>"
-            cleaned_batch = clean_html_for_ai(batch_text, url)
-            
-            if cleaned_batch:
-                batch_results = _query_ai(cleaned_batch)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        failed = False
+
+        async def _run_batch(number: int, batch: List[str]) -> List[Dict[str, Any]]:
+            nonlocal failed
+            cleaned_batch = "\n".join(batch)
+            if not cleaned_batch:
+                return []
+            async with semaphore:
+                if failed:
+                    return None
+                logger.info("ai_batch_process url=%s batch=%s size=%s", url, number, len(batch))
+                batch_results = await _query_ai(cleaned_batch)
                 if batch_results is None:
-                    return None # Propagate API error
-                final_articles.extend(batch_results)
+                    failed = True
+                return batch_results
+
+        # Up to `concurrency` batches in flight; results keep the listing order.
+        batches = [raw_articles[i : i + batch_size] for i in range(0, len(raw_articles), batch_size)]
+        results = await asyncio.gather(*(_run_batch(number, batch) for number, batch in enumerate(batches, 1)))
+        if failed:
+            return None # Propagate API error
+        for batch_results in results:
+            final_articles.extend(batch_results)
                 
     else:
         # Standard Single-Pass Logic
-        cleaned_text = clean_html_for_ai(html, url)
+        cleaned_text = page.cleaned_text
         if cleaned_text:
             logger.info("ai_extract_start url=%s mode=%s content_len=%s", url, mode, len(cleaned_text))
-            batch_results = _query_ai(cleaned_text)
+            batch_results = await _query_ai(cleaned_text)
             if batch_results is None:
                 return None # Propagate API error
             final_articles = batch_results
@@ -523,16 +628,21 @@ async def _extract_news_with_ai_once(html: str, url: str, mode: str = "news", us
 
 
 async def extract_news_with_ai(
-    html: str,
+    html: Union[str, PageDocument],
     url: str,
     mode: str = "news",
     user_interests: List[str] = None,
     raise_on_error: bool = False,
+    max_chars: int = MAX_CLEAN_CHARS,
+    concurrency: int = 1,
 ) -> List[Dict[str, Any]]:
+    page = as_page(html, url)
     last_error = None
     for attempt in range(1, AI_MAX_RETRIES + 1):
         try:
-            result = await _extract_news_with_ai_once(html, url, mode=mode, user_interests=user_interests)
+            result = await _extract_news_with_ai_once(
+                page, url, mode=mode, user_interests=user_interests, max_chars=max_chars, concurrency=concurrency
+            )
             if result is not None:
                 return result
             last_error = ScraperError(
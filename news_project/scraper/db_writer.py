@@ -0,0 +1,192 @@
+"""Background SQLite writer.
+
+A commit (and its fsync) blocks the calling thread; when that is the event
+loop, every in-flight fetch and LLM stream stalls with it. DBWriter owns the
+write connection on its own thread and executes submitted commands in order.
+Each command runs in a savepoint, so it is applied completely or not at all.
+Commands queued behind each other are committed together: a batch closes once
+it holds DB_WRITER_BATCH_SIZE commands, has been open DB_WRITER_FLUSH_SECONDS,
+or the queue runs empty. A command's future resolves after its batch committed.
+When the batch itself fails (the write lock is not granted within the busy
+timeout, a commit fails), it is rolled back and every command in it and every
+command queued behind it fails with that error; the thread keeps serving.
+"""
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from . import sqlite_store as db
+from .config import DB_WRITER_BATCH_SIZE, DB_WRITER_FLUSH_SECONDS
+from .observability import get_logger
+
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class DBWriter:
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        batch_size: int = DB_WRITER_BATCH_SIZE,
+        flush_seconds: float = DB_WRITER_FLUSH_SECONDS,
+    ):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._ready = Future()
+        self._closed = False
+        # Set if the thread died on an unexpected error.
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+        # Surface connection errors (bad path, schema) to the caller right away.
+        self._ready.result()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """Queue func(conn, *args); the future resolves with its result once committed."""
+        self._check_alive()
+        future: Future = Future()
+        self._queue.put((func, args, future))
+        return future
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def flush(self) -> None:
+        """Block until every command queued so far is committed."""
+        if not self._closed:
+            self.submit(_noop).result()
+
+    def close(self) -> None:
+        """Drain the queue, commit and stop the thread."""
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _check_alive(self) -> None:
+        if self._closed:
+            raise RuntimeError("database writer is closed")
+        if not self._thread.is_alive():
+            raise RuntimeError(f"database writer stopped: {self._error!r}")
+
+    # -- writer thread -----------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            conn = db.connect(self.db_path or db.DB_PATH)
+        except BaseException as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+        logger.info("db_writer_started batch=%s flush_s=%s", self.batch_size, self.flush_seconds)
+        commits = commands = 0
+        stopping = False
+        batch: List[Tuple[Future, Any]] = []
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = []
+                opened_at = time.monotonic()
+                try:
+                    while True:
+                        self._execute(conn, item, batch)
+                        if len(batch) >= self.batch_size or time.monotonic() - opened_at >= self.flush_seconds:
+                            break
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _STOP:
+                            stopping = True
+                            break
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logger.error("db_writer_batch_failed commands=%s error=%s", len(batch), e)
+                    self._rollback(conn)
+                    _fail(batch, e)
+                    stopping = self._fail_queued(e) or stopping
+                    continue
+                for future, result in batch:
+                    future.set_result(result)
+                commits += 1
+                commands += len(batch)
+        except BaseException as e:
+            # Not a database error: stop, but never leave a caller waiting.
+            self._error = e
+            logger.error("db_writer_crashed error=%r", e)
+            self._rollback(conn)
+            _fail(batch, e)
+            self._fail_queued(e)
+            raise
+        finally:
+            conn.close()
+            logger.info("db_writer_stopped commits=%s commands=%s", commits, commands)
+
+    def _execute(self, conn: sqlite3.Connection, item: Tuple, batch: List[Tuple[Future, Any]]) -> None:
+        """Run one command in a savepoint of the batch transaction.
+
+        A failing command is rolled back alone and fails its own future. A
+        failing BEGIN/SAVEPOINT/RELEASE raises, with the command added to the
+        batch, so the caller fails the whole batch.
+        """
+        func, args, future = item
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            conn.execute("SAVEPOINT command")
+        except BaseException:
+            batch.append((future, None))
+            raise
+        try:
+            result = func(conn, *args)
+        except BaseException as e:
+            logger.warning("db_writer_command_failed func=%s error=%s", getattr(func, "__name__", func), e)
+            future.set_exception(e)
+            conn.execute("ROLLBACK TO command")
+            conn.execute("RELEASE command")
+            return
+        batch.append((future, result))
+        conn.execute("RELEASE command")
+
+    def _rollback(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error("db_writer_rollback_failed error=%s", e)
+
+    def _fail_queued(self, error: BaseException) -> bool:
+        """Fail every command queued so far; True if a close() request was among them."""
+        stop = False
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return stop
+            if item is _STOP:
+                stop = True
+            elif item[2].set_running_or_notify_cancel():
+                item[2].set_exception(error)
+
+
+def _fail(batch: List[Tuple[Future, Any]], error: BaseException) -> None:
+    for future, _ in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+def _noop(conn: sqlite3.Connection) -> None:
+    return None
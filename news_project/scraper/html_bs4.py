@@ -0,0 +1,78 @@
+"""BeautifulSoup (html.parser) backend for clean_html_for_ai; the reference implementation."""
+from typing import List
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from urllib.parse import urljoin
+
+from .utils import AMAZON_NOISE_SELECTORS, BLOCK_TAGS, MAX_CLEAN_CHARS, NOISE_SELECTORS, NOISE_TAGS, TextBuffer
+
+NAME = "bs4"
+
+
+def parse_html(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, 'html.parser')
+
+
+def strip_noise(soup: BeautifulSoup, url: str) -> None:
+    """移除导航、脚本等噪音节点 (原地修改 soup)"""
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+
+    # 尝试定位主要内容区域（可选，如果太严格可能会漏掉新闻列表）
+    for selector in NOISE_SELECTORS:
+        for tag in soup.select(selector):
+            tag.decompose()
+
+    # 针对 Amazon News 的特殊清洗
+    if "aboutamazon.com" in url:
+        # 移除明显的导航和页脚部分
+        for selector in AMAZON_NOISE_SELECTORS:
+            for tag in soup.select(selector):
+                tag.decompose()
+
+        # 移除 "More news" 这种区块
+        for tag in soup.find_all(['div', 'section']):
+            text = tag.get_text().strip().lower()
+            if text.startswith("more news") or text == "see all news":
+                tag.decompose()
+
+
+def element_to_text(element: Tag, url: str) -> str:
+    """把一个节点转换为文本，链接保留为 [text](url)，块级元素换行"""
+    # 显式栈遍历，写入同一个缓冲区；达到长度上限后提前停止
+    buffer = TextBuffer(MAX_CLEAN_CHARS)
+    buffer.enter(False)
+    stack = [iter(element.children)]
+    while stack and not buffer.full:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            buffer.exit()
+        elif isinstance(child, NavigableString):
+            buffer.text(str(child))
+        elif isinstance(child, Tag):
+            if child.name == 'a' and child.has_attr('href'):
+                # 处理链接
+                link_text = child.get_text(separator=' ', strip=True)
+                # 转换为绝对路径
+                full_url = urljoin(url, child['href']) # Use actual URL for base
+                if link_text and len(link_text) > 2: # 忽略太短的链接文本
+                    buffer.atom(f"[{link_text}]({full_url})")
+            else:
+                # 块级元素换行，其他内联元素或容器直接拼接
+                buffer.enter(child.name in BLOCK_TAGS)
+                stack.append(iter(child.children))
+    return buffer.getvalue()
+
+
+def clean_parsed(soup: BeautifulSoup, url: str) -> str:
+    """清理已解析 (且已 strip_noise) 的 soup，从 body 开始处理"""
+    body = soup.find('body')
+    if not body:
+        return ""
+    return element_to_text(body, url)
+
+
+def article_texts(soup: BeautifulSoup, url: str) -> List[str]:
+    """每个 <article> 单独清洗 (arXiv 分批提取用)"""
+    return [text for text in (element_to_text(tag, url) for tag in soup.find_all('article')) if text]
@@ -0,0 +1,165 @@
+"""lxml backend for clean_html_for_ai.
+
+Produces the same text as the BeautifulSoup reference (html_bs4), but parses with
+libxml2. Noise nodes are marked as removed instead of detached so the text that
+follows them stays a separate string, exactly like BeautifulSoup's decompose().
+"""
+import re
+from typing import List, Set
+from urllib.parse import urljoin
+
+from lxml import etree
+
+from .utils import AMAZON_NOISE_SELECTORS, BLOCK_TAGS, MAX_CLEAN_CHARS, NOISE_SELECTORS, NOISE_TAGS, DocumentTooDeep, TextBuffer
+
+NAME = "lxml"
+
+_BODY_TAG_RE = re.compile(r"<body[\s/>]", re.IGNORECASE)
+_BLOCK_TAGS = frozenset(BLOCK_TAGS)
+
+
+class LxmlDocument:
+    def __init__(self, root, has_body: bool):
+        self.root = root
+        # html.parser only creates <body> when the markup has one; libxml2 always does.
+        self.has_body = has_body
+        self.removed: Set[etree._Element] = set()
+
+
+def parse_html(html: str) -> LxmlDocument:
+    parser = etree.HTMLParser(encoding="utf-8", remove_comments=False, remove_pis=False, huge_tree=True)
+    root = etree.fromstring(html.encode("utf-8", "replace"), parser) if html.strip() else None
+    # libxml2 silently drops everything below its depth limit (2048 even with huge_tree).
+    if any(error.type_name == "ERR_RESOURCE_LIMIT" for error in parser.error_log):
+        raise DocumentTooDeep("lxml depth limit exceeded")
+    return LxmlDocument(root, bool(_BODY_TAG_RE.search(html)))
+
+
+def _is_tag(node) -> bool:
+    return isinstance(node.tag, str)
+
+
+def _node_string(node) -> str:
+    """Text BeautifulSoup keeps for comments and processing instructions."""
+    if isinstance(node, etree._ProcessingInstruction):
+        return f"{node.target} {node.text}" if node.text else node.target
+    text = node.text or ""
+    # libxml2 reads "<?php ... ?>" as a comment "?php ... ?"; html.parser keeps "php ... ?".
+    return text[1:] if text.startswith("?") else text
+
+
+def _iter_live(document: LxmlDocument, element):
+    """Yield element and its descendants in document order, skipping removed subtrees."""
+    stack = [element]
+    while stack:
+        node = stack.pop()
+        if node in document.removed:
+            continue
+        yield node
+        stack.extend(reversed([child for child in node if _is_tag(child)]))
+
+
+def _split_selectors(selectors: List[str]):
+    tags = [selector for selector in selectors if not selector.startswith(".")]
+    classes = {selector[1:] for selector in selectors if selector.startswith(".")}
+    return tags, classes
+
+
+def _mark_matches(document: LxmlDocument, selectors: List[str]) -> None:
+    tags, classes = _split_selectors(selectors)
+    if tags:
+        document.removed.update(document.root.iter(*tags))
+    if classes:
+        for element in document.root.iter(etree.Element):
+            class_attr = element.get("class")
+            if class_attr and not classes.isdisjoint(class_attr.split()):
+                document.removed.add(element)
+
+
+def _strings(document: LxmlDocument, element) -> List[str]:
+    """Text nodes under element in order, without comments or removed subtrees (get_text)."""
+    strings = []
+    stack = [("node", element)]
+    while stack:
+        kind, item = stack.pop()
+        if kind == "text":
+            strings.append(item)
+            continue
+        if item.text and _is_tag(item):
+            strings.append(item.text)
+        pending = []
+        for child in item:
+            if _is_tag(child) and child not in document.removed:
+                pending.append(("node", child))
+            if child.tail:
+                pending.append(("text", child.tail))
+        stack.extend(reversed(pending))
+    return strings
+
+
+def get_text(document: LxmlDocument, element, separator: str = "", strip: bool = False) -> str:
+    strings = _strings(document, element)
+    if strip:
+        strings = [text.strip() for text in strings if text.strip()]
+    return separator.join(strings)
+
+
+def strip_noise(document: LxmlDocument, url: str) -> None:
+    if document.root is None:
+        return
+    # Marks inside an already removed subtree are harmless: the walkers never descend into it.
+    _mark_matches(document, NOISE_TAGS + NOISE_SELECTORS)
+
+    if "aboutamazon.com" in url:
+        _mark_matches(document, AMAZON_NOISE_SELECTORS)
+        for element in [node for node in _iter_live(document, document.root) if node.tag in ("div", "section")]:
+            text = get_text(document, element).strip().lower()
+            if text.startswith("more news") or text == "see all news":
+                document.removed.add(element)
+
+
+def element_to_text(document: LxmlDocument, element, url: str) -> str:
+    buffer = TextBuffer(MAX_CLEAN_CHARS)
+    buffer.enter(False)
+    buffer.text(element.text)
+    stack = [(element, iter(element))]
+    while stack and not buffer.full:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            buffer.exit()
+            if stack:
+                # A finished element's tail is text of its parent.
+                buffer.text(node.tail)
+        elif not _is_tag(child):
+            buffer.text(_node_string(child))
+            buffer.text(child.tail)
+        elif child in document.removed:
+            buffer.text(child.tail)
+        elif child.tag == "a" and "href" in child.attrib:
+            link_text = get_text(document, child, separator=" ", strip=True)
+            if link_text and len(link_text) > 2:
+                buffer.atom(f"[{link_text}]({urljoin(url, child.get('href'))})")
+            buffer.text(child.tail)
+        else:
+            buffer.enter(child.tag in _BLOCK_TAGS)
+            buffer.text(child.text)
+            stack.append((child, iter(child)))
+    return buffer.getvalue()
+
+
+def clean_parsed(document: LxmlDocument, url: str) -> str:
+    if document.root is None or not document.has_body:
+        return ""
+    body = document.root.find("body")
+    if body is None or body in document.removed:
+        return ""
+    return element_to_text(document, body, url)
+
+
+def article_texts(document: LxmlDocument, url: str) -> List[str]:
+    if document.root is None:
+        return []
+    articles = [element for element in _iter_live(document, document.root) if element.tag == "article"]
+    return [text for text in (element_to_text(document, element, url) for element in articles) if text]
@@ -0,0 +1,266 @@
+"""Local OpenAI-compatible stand-in for the extraction and rescore models.
+
+Run it standalone and point GEMINI_BASE_URL at it:
+
+    python news_project/scraper/mock_llm.py --port 8765 --latency 0.4 --tokens-per-second 80
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1/ GEMINI_API_KEY=mock python news_project/main.py
+
+Without canned responses the server answers extraction prompts with one article
+per markdown link (or arXiv ``Link:`` line) it finds in the page text, so the
+whole pipeline runs end to end without network access or an API key.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MARKDOWN_LINK_RE = re.compile(r"\[([^\]]{3,200})\]\((https?://[^)\s]+)\)")
+MAX_GENERATED_ITEMS = 40
+
+
+class MockLLMConfig:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        responses: Optional[List[Dict[str, str]]] = None,
+        seed: int = 7,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = responses or []
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+
+    def roll(self) -> Tuple[float, bool]:
+        with self.lock:
+            self.request_count += 1
+            jitter = self.random.uniform(-self.latency_jitter, self.latency_jitter) if self.latency_jitter else 0.0
+            failed = self.error_rate > 0 and self.random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        return max(0.0, self.latency + jitter), failed
+
+
+def load_responses(path: str) -> List[Dict[str, str]]:
+    """Canned responses: a JSON list of {"match": substring, "content": reply}."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [item for item in data if isinstance(item, dict) and "content" in item]
+
+
+def _stable_int(text: str, low: int, high: int) -> int:
+    digest = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+    return low + digest % (high - low + 1)
+
+
+def _page_text(prompt: str) -> str:
+    # Both extraction prompts put the cleaned page between these two markers.
+    start = prompt.find("网页内容：")
+    end = prompt.rfind("返回 JSON 格式")
+    if start == -1:
+        return prompt
+    return prompt[start:end if end > start else len(prompt)]
+
+
+def _candidate_items(page_text: str) -> List[Tuple[str, str]]:
+    items: List[Tuple[str, str]] = []
+    seen = set()
+    for title, link in MARKDOWN_LINK_RE.findall(page_text):
+        if link not in seen:
+            seen.add(link)
+            items.append((title.strip(), link))
+
+    pending_title = ""
+    for line in page_text.splitlines():
+        line = line.strip()
+        if line.startswith("Link: "):
+            link = line[len("Link: "):].strip()
+            if link and link not in seen:
+                seen.add(link)
+                items.append((pending_title or link, link))
+        elif line and not line.startswith(("Date:", "Venue:")):
+            pending_title = line
+    return items[:MAX_GENERATED_ITEMS]
+
+
+def generate_extraction(prompt: str) -> List[Dict[str, Any]]:
+    articles = []
+    for title, link in _candidate_items(_page_text(prompt)):
+        articles.append(
+            {
+                "title": title,
+                "link": link,
+                "summary": f"模拟摘要：{title}",
+                "date": time.strftime("%Y-%m-%d"),
+                "venue": "Mock",
+                "ai_score": _stable_int(link, 10, 95),
+                "impact_score": _stable_int(link + "#impact", 0, 50),
+                "personal_score": _stable_int(link + "#personal", 0, 100),
+                "is_tech_release": False,
+                "code_url": None,
+                "score_reason": "mock extraction",
+                "tags": ["Mock"],
+            }
+        )
+    return articles
+
+
+def generate_rescore(prompt: str) -> Dict[str, Any]:
+    return {
+        "ai_score": _stable_int(prompt, 0, 100),
+        "personal_score": _stable_int(prompt + "#personal", 0, 100),
+        "score_reason": "mock rescore",
+    }
+
+
+def build_reply(config: MockLLMConfig, messages: List[Dict[str, Any]]) -> str:
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    for canned in config.responses:
+        if canned.get("match", "") in prompt:
+            return canned["content"]
+    if "JSON 对象" in prompt:
+        return json.dumps(generate_rescore(prompt), ensure_ascii=False)
+    return json.dumps(generate_extraction(prompt), ensure_ascii=False)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def make_handler(config: MockLLMConfig):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                return
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": {"message": "invalid json", "type": "invalid_request_error"}})
+                return
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                return
+
+            latency, failed = config.roll()
+            if latency:
+                time.sleep(latency)
+            if failed:
+                self._send_json(
+                    config.error_status,
+                    {"error": {"message": "mock injected error", "type": "server_error", "code": config.error_status}},
+                )
+                return
+
+            messages = request.get("messages") or []
+            content = build_reply(config, messages)
+            completion_tokens = estimate_tokens(content)
+            if config.tokens_per_second > 0:
+                time.sleep(completion_tokens / config.tokens_per_second)
+
+            prompt_tokens = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+            self._send_json(
+                200,
+                {
+                    "id": f"mock-{config.request_count}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                },
+            )
+
+    return MockLLMHandler
+
+
+def start_mock_server(config: MockLLMConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the server on a daemon thread and return it with its OpenAI base URL."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1/"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token.")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Uniform +/- jitter on latency.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated generation speed; 0 is instant.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status for injected failures.")
+    parser.add_argument("--responses", help="JSON file with canned responses.")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = MockLLMConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        responses=load_responses(args.responses) if args.responses else None,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 import logging
 import os
 import sys
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List
 
 
 LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+STAGE_TIMING_WINDOW = 10000
+
+_stage_timings: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=STAGE_TIMING_WINDOW))
 
 
 def configure_stdout_encoding() -> None:
@@ -27,3 +34,21 @@ def setup_logging(default_level: str = "INFO") -> None:
 
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the wall-clock duration of a pipeline stage for benchmarks and status."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_timings[stage].append(time.perf_counter() - start)
+
+
+def stage_timings() -> Dict[str, List[float]]:
+    return {stage: list(values) for stage, values in _stage_timings.items()}
+
+
+def reset_stage_timings() -> None:
+    _stage_timings.clear()
@@ -0,0 +1,205 @@
+import hashlib
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from .boilerplate import fingerprint_blocks, strip_blocks
+from .similarity import link_signature, simhash
+from .utils import DocumentTooDeep, get_html_backend
+
+_ARXIV_LINK_RE = re.compile(r"^Link: (\S+)", re.MULTILINE)
+_MARKDOWN_LINK_RE = re.compile(r"\]\((https?://[^)\s]+)\)")
+
+
+class PageDocument:
+    """One fetched page and everything derived from it.
+
+    The HTML is parsed and cleaned at most once; fetch, hash and extraction all
+    read the same cleaned text and block split instead of re-parsing the page.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        html: str,
+        cleaned_text: Optional[str] = None,
+        blocks: Optional[List[str]] = None,
+        backend: Optional[str] = None,
+    ):
+        self.url = url
+        self.html = html or ""
+        self.backend = get_html_backend(backend)
+        self._parsed = None
+        self._cleaned_text = cleaned_text
+        self._blocks = blocks
+        self._content_hash: Optional[str] = None
+        self._simhash: Optional[int] = None
+        self._link_signature: Optional[str] = None
+        self._fingerprints: Optional[Dict[str, str]] = None
+        self.boilerplate_removed = 0
+
+    # Derived values a parse worker computes and ships back to the event loop.
+    _SHARED_STATE = ("_cleaned_text", "_content_hash", "_simhash", "_link_signature", "_fingerprints", "boilerplate_removed")
+
+    def export_state(self) -> Dict[str, Any]:
+        """Plain-data snapshot of the derived values (arXiv block split included)."""
+        state = {name: getattr(self, name) for name in self._SHARED_STATE}
+        # Line splits are cheap to redo; only arXiv article blocks need the parse tree.
+        state["_blocks"] = self.blocks if self.is_arxiv_listing else None
+        return state
+
+    @classmethod
+    def from_state(cls, url: str, html: str, state: Dict[str, Any]) -> "PageDocument":
+        page = cls(url, html)
+        for name, value in state.items():
+            setattr(page, name, value)
+        return page
+
+    @property
+    def is_arxiv_listing(self) -> bool:
+        return "arxiv.org" in self.url and "<h1>Arxiv" in self.html
+
+    @property
+    def parsed(self):
+        """Backend document (BeautifulSoup or lxml) with noise nodes already stripped."""
+        if self._parsed is None:
+            try:
+                self._parsed = self.backend.parse_html(self.html)
+            except DocumentTooDeep:
+                self.backend = get_html_backend("bs4")
+                self._parsed = self.backend.parse_html(self.html)
+            self.backend.strip_noise(self._parsed, self.url)
+        return self._parsed
+
+    @property
+    def cleaned_text(self) -> str:
+        if self._cleaned_text is None:
+            if self.html:
+                # parsed first: it may switch backend when lxml cannot hold the page.
+                parsed = self.parsed
+                self._cleaned_text = self.backend.clean_parsed(parsed, self.url)
+            else:
+                self._cleaned_text = ""
+        return self._cleaned_text
+
+    @property
+    def blocks(self) -> List[str]:
+        """Cleaned text split into extraction units.
+
+        arXiv listings split per <article> so they can be batched; other pages
+        split per line of cleaned text.
+        """
+        if self._blocks is None:
+            if self.is_arxiv_listing:
+                parsed = self.parsed
+                self._blocks = self.backend.article_texts(parsed, self.url)
+            else:
+                self._blocks = self.cleaned_text.split("\n") if self.cleaned_text else []
+        return self._blocks
+
+    def block_fingerprints(self) -> Dict[str, str]:
+        """Fingerprints of the cleaned lines before any boilerplate was stripped.
+
+        arXiv listings are skipped: every entry is unique and the shared chrome is
+        already outside the <article> blocks.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = {} if self.is_arxiv_listing else fingerprint_blocks(self.cleaned_text.split("\n"))
+        return self._fingerprints
+
+    def strip_boilerplate(self, boilerplate: Set[str]) -> int:
+        """Remove known boilerplate lines from cleaned_text before hashing and extraction."""
+        if self.is_arxiv_listing or not boilerplate or not self.cleaned_text:
+            return 0
+        self.block_fingerprints()
+        kept, removed = strip_blocks(self.cleaned_text.split("\n"), boilerplate)
+        if removed:
+            self._cleaned_text = "\n".join(kept)
+            self._blocks = None
+            self._content_hash = None
+            self._simhash = None
+            self._link_signature = None
+            self.boilerplate_removed += removed
+        return removed
+
+    def drop_seen_items(self, new_links: Callable[[Iterable[str]], List[str]], lines: bool = False) -> int:
+        """Drop extraction units whose links are all known, before they reach the LLM.
+
+        arXiv listings drop whole <article> blocks by their "Link:" line. With
+        lines=True, other pages are split into items at every line holding a
+        markdown link (the lines up to the next such line belong to it), and an
+        item is dropped when all of its links are known. new_links returns the
+        unseen subset of a batch of links. Hashes and signatures are not
+        touched: the page version is the same, only the extraction input shrinks.
+        Returns the number of dropped units.
+        """
+        if self.is_arxiv_listing:
+            blocks = self.blocks
+            block_links = [_ARXIV_LINK_RE.findall(block) for block in blocks]
+        elif lines and self.cleaned_text:
+            blocks = []
+            for line in self.cleaned_text.split("\n"):
+                if not blocks or _MARKDOWN_LINK_RE.search(line):
+                    blocks.append(line)
+                else:
+                    blocks[-1] += "\n" + line
+            block_links = [_MARKDOWN_LINK_RE.findall(block.split("\n", 1)[0]) for block in blocks]
+        else:
+            return 0
+
+        unseen = set(new_links(link for links in block_links for link in links))
+        kept = [block for block, links in zip(blocks, block_links) if not links or unseen.intersection(links)]
+        dropped = len(blocks) - len(kept)
+        if dropped:
+            if self.is_arxiv_listing:
+                self._blocks = kept
+            else:
+                self._cleaned_text = "\n".join(kept)
+                self._blocks = None
+        return dropped
+
+    @property
+    def content_hash(self) -> str:
+        if self._content_hash is None:
+            self._content_hash = hashlib.md5(self.cleaned_text.encode("utf-8")).hexdigest()
+        return self._content_hash
+
+    @property
+    def simhash(self) -> int:
+        if self._simhash is None:
+            self._simhash = simhash(self.cleaned_text.split("\n"))
+        return self._simhash
+
+    @property
+    def link_signature(self) -> str:
+        if self._link_signature is None:
+            self._link_signature = link_signature(self.cleaned_text)
+        return self._link_signature
+
+
+def as_page(page: Union[str, PageDocument], url: str) -> PageDocument:
+    return page if isinstance(page, PageDocument) else PageDocument(url, page)
+
+
+def clean_page(url: str, html: str, boilerplate: Optional[Set[str]] = None, signatures: bool = True) -> Dict[str, Any]:
+    """Parse, clean, strip boilerplate and hash a page.
+
+    Runs in the parse executor, so only plain data goes back (see export_state).
+    """
+    page = PageDocument(url, html)
+    if page.cleaned_text:
+        # Touch the lazy properties so they are computed here, in the worker.
+        page.block_fingerprints()
+        page.strip_boilerplate(boilerplate or set())
+        page.content_hash
+        if signatures:
+            page.simhash
+            page.link_signature
+    return page.export_state()
+
+
+async def load_page(url: str, html: str, boilerplate: Optional[Set[str]] = None, signatures: bool = True) -> PageDocument:
+    """PageDocument whose CPU-heavy derived values were computed off the event loop."""
+    from .workers import run_cpu
+
+    state = await run_cpu(clean_page, url, html, boilerplate, signatures)
+    return PageDocument.from_state(url, html, state)
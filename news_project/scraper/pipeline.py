@@ -0,0 +1,104 @@
+"""Stage pipeline for a scraper run.
+
+Each stage has its own worker count and reads from a bounded asyncio.Queue,
+so network, CPU, LLM and database work overlap across sources while a slow
+stage pushes back on the ones before it. Shutdown is driven by sentinels: a
+stage finishes once all of its workers have drained their queue, then hands one
+sentinel per worker to the next stage.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from .observability import get_logger
+
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: ``handler(job)`` returns the job for the next stage, or None to drop it."""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int = 1):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.processed = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+
+
+async def run_pipeline(
+    jobs: Iterable[Any],
+    stages: List[Stage],
+    queue_size: int = 4,
+    on_error: Optional[Callable[[Any, str, Exception], None]] = None,
+) -> List[Any]:
+    """Push jobs through stages and return the jobs that came out of the last stage.
+
+    A handler that raises drops its job (after on_error) without stopping the run.
+    """
+    if not stages:
+        return list(jobs)
+
+    queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    results: List[Any] = []
+
+    async def feed() -> None:
+        for job in jobs:
+            await queues[0].put(job)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    async def worker(index: int, stage: Stage) -> None:
+        inbox = queues[index]
+        while True:
+            job = await inbox.get()
+            if job is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                job = await stage.handler(job)
+            except Exception as e:
+                logger.exception("pipeline_job_failed stage=%s", stage.name)
+                if on_error:
+                    on_error(job, stage.name, e)
+                job = None
+            finally:
+                stage.busy_seconds += time.perf_counter() - started
+            if job is None:
+                stage.dropped += 1
+                continue
+            stage.processed += 1
+            if index + 1 < len(stages):
+                await queues[index + 1].put(job)
+            else:
+                results.append(job)
+
+    async def run_stage(index: int, stage: Stage) -> None:
+        await asyncio.gather(*(worker(index, stage) for _ in range(stage.workers)))
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].workers):
+                await queues[index + 1].put(_DONE)
+        logger.info(
+            "pipeline_stage_done stage=%s workers=%s passed=%s dropped=%s busy_s=%.2f",
+            stage.name,
+            stage.workers,
+            stage.processed,
+            stage.dropped,
+            stage.busy_seconds,
+        )
+
+    tasks = [asyncio.create_task(feed())]
+    tasks.extend(asyncio.create_task(run_stage(index, stage)) for index, stage in enumerate(stages))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Cancelled or failed run: stop every stage instead of leaving workers blocked on get().
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
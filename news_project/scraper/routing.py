@@ -0,0 +1,153 @@
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import MODEL_ROUTES, RESCORE_BAND, get_llm_api_key
+from .observability import get_logger, timed
+
+
+logger = get_logger(__name__)
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+
+def get_route(stage: str) -> Dict[str, Any]:
+    route = MODEL_ROUTES.get(stage)
+    if route is None:
+        raise KeyError(f"unknown model route: {stage}")
+    return route
+
+
+def route_enabled(stage: str) -> bool:
+    return bool(get_route(stage).get("model"))
+
+
+def _client_for(route: Dict[str, Any]):
+    from openai import OpenAI
+
+    api_key = get_llm_api_key()
+    key = (route["base_url"], api_key)
+    client = _clients.get(key)
+    if client is None:
+        client = OpenAI(api_key=api_key, base_url=route["base_url"])
+        _clients[key] = client
+    return client
+
+
+def _semaphore_for(stage: str, route: Dict[str, Any]) -> asyncio.Semaphore:
+    """One limiter per route, rebuilt if the caller moved to a new event loop.
+
+    Keyed by route, not model: routes sharing a model keep their own concurrency.
+    """
+    loop = asyncio.get_running_loop()
+    cached = _semaphores.get(stage)
+    if cached is None or cached[0] is not loop:
+        cached = (loop, asyncio.Semaphore(max(1, int(route.get("concurrency", 1)))))
+        _semaphores[stage] = cached
+    return cached[1]
+
+
+def parse_json_response(text: str) -> Any:
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```(json)?|```$", "", text, flags=re.MULTILINE).strip()
+    return json.loads(text)
+
+
+async def complete(stage: str, messages: List[Dict[str, str]], temperature: float = 0.1) -> str:
+    """Run one chat completion on the model routed for ``stage``.
+
+    The blocking OpenAI client call runs in a worker thread so other sources keep
+    fetching while we wait on the model.
+    """
+    route = get_route(stage)
+    client = _client_for(route)
+    async with _semaphore_for(stage, route):
+        with timed(f"llm_{stage}"):
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
+                model=route["model"],
+                messages=messages,
+                stream=False,
+                temperature=temperature,
+            )
+    return (response.choices[0].message.content or "").strip()
+
+
+def in_rescore_band(article: Dict[str, Any], band: Tuple[int, int] = RESCORE_BAND) -> bool:
+    try:
+        score = int(article.get("ai_score", 0))
+    except (TypeError, ValueError):
+        return False
+    return band[0] <= score <= band[1]
+
+
+def _rescore_prompt(article: Dict[str, Any], mode: str, user_interests: Optional[List[str]]) -> str:
+    interests = ", ".join((user_interests or [])[:20]) or "无"
+    kind = "论文" if mode == "paper" else "新闻"
+    return f"""请对下面这条{kind}重新进行语义相关性评分。第一轮评分处于不确定区间，需要你仔细判断。
+用户兴趣点：**AI, Agent, HCI, XR/Spatial, Generation, Diffusion, 3D, VR, AR, MR, Spatial Computing, Brain, Recognition, Cognitive, Health, Sense, Control, Emotion, Affective, Eye Tracking, Gesture, Face**.
+用户历史收藏关键词：{interests}
+
+标题: {article.get("title", "")}
+来源: {article.get("venue", "")}
+链接: {article.get("link", "")}
+摘要: {article.get("summary", "")}
+第一轮 ai_score: {article.get("ai_score", 0)}
+
+只返回 JSON 对象：
+{{"ai_score": 0-100, "personal_score": 0-100, "score_reason": "一句话解释打分理由"}}
+"""
+
+
+async def _rescore_one(article: Dict[str, Any], mode: str, user_interests: Optional[List[str]], url: str) -> bool:
+    model = get_route("rescore")["model"]
+    try:
+        result_text = await complete(
+            "rescore",
+            [
+                {"role": "system", "content": "你是一个严谨的科技内容评审。只返回纯净的 JSON 对象。"},
+                {"role": "user", "content": _rescore_prompt(article, mode, user_interests)},
+            ],
+        )
+        data = parse_json_response(result_text)
+        if not isinstance(data, dict) or "ai_score" not in data:
+            raise ValueError("rescore response missing ai_score")
+        old_score = article.get("ai_score")
+        # Parse everything first, so a bad field leaves the first-pass scores untouched.
+        scores = {"ai_score": int(data["ai_score"])}
+        if "personal_score" in data:
+            scores["personal_score"] = int(data["personal_score"])
+        article.update(scores)
+        if data.get("score_reason"):
+            article["score_reason"] = f"{data['score_reason']} [Rescored by {model}]"
+        logger.info("ai_rescored url=%s title=%s old=%s new=%s model=%s", url, article.get("title"), old_score, article["ai_score"], model)
+        return True
+    except Exception as e:
+        logger.warning("ai_rescore_failed url=%s title=%s model=%s error=%s", url, article.get("title"), model, e)
+        return False
+
+
+async def rescore_borderline(
+    articles: List[Dict[str, Any]],
+    url: str,
+    mode: str = "news",
+    user_interests: Optional[List[str]] = None,
+) -> int:
+    """Re-score articles inside the uncertain ai_score band with the stronger model.
+
+    Failures keep the first-pass score, so this never loses an article.
+    Returns the number of articles that were re-scored.
+    """
+    if not articles or not route_enabled("rescore"):
+        return 0
+
+    borderline = [article for article in articles if in_rescore_band(article)]
+    if not borderline:
+        return 0
+
+    logger.info("ai_rescore_start url=%s borderline=%s total=%s band=%s", url, len(borderline), len(articles), RESCORE_BAND)
+    results = await asyncio.gather(*(_rescore_one(article, mode, user_interests, url) for article in borderline))
+    return sum(1 for ok in results if ok)
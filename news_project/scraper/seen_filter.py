@@ -0,0 +1,241 @@
+"""On-disk Bloom filter over every known link (seen_links + articles.link).
+
+With a large history, loading all seen links into a Python set costs memory and
+startup time for a membership test that almost always answers "no". The
+filter is a memory-mapped bit array: a negative is definitive, a positive is
+confirmed against SQLite. It is built incrementally: the header keeps the last
+seen_links rowid and articles id that were added, and opening the filter only
+adds the rows written since. Rowids alone do not identify a database (a pulled,
+merged or restored one can have higher ones), so the header also keeps a hash
+of the links stored at the two watermarks; a filter whose hash no longer
+matches is rebuilt.
+
+File layout: a 64-byte header (magic, bit count, hash count, capacity, item
+count, seen_links watermark, articles watermark, database identity) followed
+by the bits.
+"""
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single writer is assumed.
+    fcntl = None
+
+from .observability import get_logger
+
+
+logger = get_logger(__name__)
+
+MAGIC = b"NEWSBLM2"
+_HEADER = struct.Struct("<8sQIQQqqQ")
+HEADER_SIZE = 64
+# Rows added per catch-up query.
+CATCH_UP_BATCH = 5000
+
+
+def filter_shape(capacity: int, error_rate: float) -> Tuple[int, int]:
+    """Bit count (rounded up to whole bytes) and hash count for capacity items at error_rate."""
+    capacity = max(1, capacity)
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class SeenLinkFilter:
+    def __init__(self, path: str, capacity: int, error_rate: float):
+        self.path = path
+        # A filter that already grew past the configured capacity keeps its size.
+        self.capacity = max(capacity, self._stored_capacity())
+        self.error_rate = error_rate
+        self.bits, self.hashes = filter_shape(self.capacity, error_rate)
+        self._file = None
+        self._mm = None
+        self._open()
+
+    # -- file handling -----------------------------------------------------
+
+    def _open(self) -> None:
+        expected_size = HEADER_SIZE + self.bits // 8
+        if not self._header_matches() or os.path.getsize(self.path) != expected_size:
+            self._create(expected_size)
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), expected_size)
+
+    def _stored_header(self) -> Optional[Tuple]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size or raw[:len(MAGIC)] != MAGIC:
+            return None
+        return _HEADER.unpack(raw)
+
+    def _stored_capacity(self) -> int:
+        header = self._stored_header()
+        return header[3] if header else 0
+
+    def _header_matches(self) -> bool:
+        header = self._stored_header()
+        return header is not None and header[1:4] == (self.bits, self.hashes, self.capacity)
+
+    def _create(self, size: int) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, self.bits, self.hashes, self.capacity, 0, 0, 0, 0).ljust(HEADER_SIZE, b"\0"))
+            f.truncate(size)
+        os.replace(tmp_path, self.path)
+        logger.info("seen_filter_created path=%s capacity=%s bytes=%s hashes=%s", self.path, self.capacity, size, self.hashes)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Bits are set with read-modify-write on bytes; writers from several processes take turns.
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _read_header(self) -> Tuple[int, int, int, int]:
+        _, _, _, _, count, seen_rowid, article_id, identity = _HEADER.unpack_from(self._mm, 0)
+        return count, seen_rowid, article_id, identity
+
+    def _write_header(self, count: int, seen_rowid: int, article_id: int, identity: int) -> None:
+        _HEADER.pack_into(
+            self._mm, 0, MAGIC, self.bits, self.hashes, self.capacity, count, seen_rowid, article_id, identity
+        )
+
+    # -- bits ----------------------------------------------------------------
+
+    def _positions(self, link: str) -> Iterator[int]:
+        digest = hashlib.blake2b(link.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield HEADER_SIZE * 8 + (first + i * second) % self.bits
+
+    def __contains__(self, link: str) -> bool:
+        mm = self._mm
+        return all(mm[position >> 3] & (1 << (position & 7)) for position in self._positions(link))
+
+    def _add(self, links: Iterable[str]) -> int:
+        """Set the links' bits; returns how many links were not in the filter yet.
+
+        A link is added from seen_links, from articles and by write-through;
+        only the first time sets a bit, so only that one counts.
+        """
+        mm = self._mm
+        added = 0
+        for link in links:
+            if not link:
+                continue
+            new = False
+            for position in self._positions(link):
+                byte, mask = position >> 3, 1 << (position & 7)
+                if not mm[byte] & mask:
+                    mm[byte] |= mask
+                    new = True
+            added += new
+        return added
+
+    def add(self, links: Iterable[str]) -> None:
+        """Write-through for links this process just stored."""
+        links = [link for link in links if link]
+        if not links:
+            return
+        with self._locked():
+            count, seen_rowid, article_id, identity = self._read_header()
+            self._write_header(count + self._add(links), seen_rowid, article_id, identity)
+
+    # -- sync with SQLite --------------------------------------------------------
+
+    @property
+    def count(self) -> int:
+        return self._read_header()[0]
+
+    def over_capacity(self) -> bool:
+        return self.count > self.capacity
+
+    def belongs_to(self, conn: sqlite3.Connection) -> bool:
+        """True when the links at the watermarks are the ones the filter was built from."""
+        _, seen_rowid, article_id, identity = self._read_header()
+        return _identity(conn, seen_rowid, article_id) == identity
+
+    def catch_up(self, conn: sqlite3.Connection) -> int:
+        """Add every seen_links / articles row written after the stored watermarks."""
+        total = 0
+        with self._locked():
+            count, seen_rowid, article_id, _ = self._read_header()
+            for table, column in (("seen_links", "rowid"), ("articles", "id")):
+                watermark = seen_rowid if table == "seen_links" else article_id
+                while True:
+                    rows = conn.execute(
+                        f"SELECT {column}, link FROM {table} WHERE {column} > ? ORDER BY {column} LIMIT ?",
+                        (watermark, CATCH_UP_BATCH),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    added = self._add(row[1] for row in rows)
+                    count += added
+                    total += added
+                    watermark = rows[-1][0]
+                if table == "seen_links":
+                    seen_rowid = watermark
+                else:
+                    article_id = watermark
+            self._write_header(count, seen_rowid, article_id, _identity(conn, seen_rowid, article_id))
+        if total:
+            logger.info("seen_filter_caught_up path=%s added=%s count=%s", self.path, total, count)
+        return total
+
+
+def _identity(conn: sqlite3.Connection, seen_rowid: int, article_id: int) -> int:
+    """Hash of the links at the two watermarks; 0 for an empty filter."""
+    if not seen_rowid and not article_id:
+        return 0
+    seen = conn.execute("SELECT link FROM seen_links WHERE rowid = ?", (seen_rowid,)).fetchone()
+    article = conn.execute("SELECT link FROM articles WHERE id = ?", (article_id,)).fetchone()
+    key = f"{seen[0] if seen else ''}\0{article[0] if article else ''}"
+    # Never 0, so a watermark row that is gone reads as a different database.
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") | 1
+
+
+def open_seen_filter(path: str, capacity: int, error_rate: float, conn: sqlite3.Connection) -> SeenLinkFilter:
+    """Open (or build) the filter and bring it up to date with the database.
+
+    A filter whose watermark links differ from the database's belongs to
+    another database (or an older copy of it) and is rebuilt. One that outgrew its capacity is rebuilt at twice
+    the size, since its false-positive rate would otherwise keep climbing.
+    """
+    seen_filter = SeenLinkFilter(path, capacity, error_rate)
+    if not seen_filter.belongs_to(conn):
+        logger.warning("seen_filter_stale path=%s", path)
+        seen_filter.close()
+        os.remove(path)
+        seen_filter = SeenLinkFilter(path, capacity, error_rate)
+    seen_filter.catch_up(conn)
+    while seen_filter.over_capacity():
+        logger.warning("seen_filter_over_capacity path=%s count=%s capacity=%s", path, seen_filter.count, seen_filter.capacity)
+        seen_filter.close()
+        os.remove(path)
+        seen_filter = SeenLinkFilter(path, seen_filter.capacity * 2, error_rate)
+        seen_filter.catch_up(conn)
+    return seen_filter
@@ -0,0 +1,71 @@
+"""Near-duplicate signatures for cleaned pages.
+
+simhash() is a 64-bit SimHash over word 3-shingles with digits folded, so
+relative timestamps ("3 hours ago") and counters do not move it, and a rotating
+promo line moves only a few bits. link_signature() hashes the set of URLs on
+the page: a new article always brings a new link, however small the text change.
+"""
+import hashlib
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+_DIGITS_RE = re.compile(r"\d+")
+_URL_RE = re.compile(r"https?://[^\s()\[\]<>\"']+")
+
+
+SHINGLE_WORDS = 3
+
+
+def shingles(lines: Iterable[str]) -> Counter:
+    features: Counter = Counter()
+    for line in lines:
+        words = _DIGITS_RE.sub("0", line.lower()).split()
+        if len(words) < SHINGLE_WORDS:
+            if words:
+                features[" ".join(words)] += 1
+            continue
+        for start in range(len(words) - SHINGLE_WORDS + 1):
+            features[" ".join(words[start:start + SHINGLE_WORDS])] += 1
+    return features
+
+
+def simhash(lines: Iterable[str]) -> int:
+    # Count byte values per byte position first; expanding 8 x 256 buckets into
+    # bit weights is far cheaper than touching 64 bits for every shingle.
+    byte_counts = [[0] * 256 for _ in range(8)]
+    total = 0
+    for feature, weight in shingles(lines).items():
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        for position, value in enumerate(digest):
+            byte_counts[position][value] += weight
+        total += weight
+
+    signature = 0
+    for position, counts in enumerate(byte_counts):
+        for bit in range(8):
+            mask = 1 << bit
+            ones = sum(count for value, count in enumerate(counts) if value & mask)
+            if ones * 2 > total:
+                signature |= 1 << (63 - position * 8 - (7 - bit))
+    return signature
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return bin(left ^ right).count("1")
+
+
+def link_signature(text: str) -> str:
+    links = sorted(set(_URL_RE.findall(text)))
+    return hashlib.md5("\n".join(links).encode("utf-8")).hexdigest()
+
+
+def format_simhash(value: int) -> str:
+    return f"{value:016x}"
+
+
+def parse_simhash(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value, 16) if value else None
+    except ValueError:
+        return None
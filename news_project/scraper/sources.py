@@ -0,0 +1,172 @@
+"""Source registry: which pages to scrape and how.
+
+Each source has a mode (news/paper), a fetch adapter, a cadence, and per-source
+concurrency, request delay and LLM token budget. The registry lives in the
+``sources`` table; a JSON file (SOURCES_FILE) or, without one, the built-in
+TARGET_URLS list is synced into it on load, so sources can be added and tuned
+without a code change. The loaded registry is cached in memory and indexed by
+due time.
+"""
+import bisect
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import SOURCE_CADENCE_SECONDS, SOURCES_FILE, TARGET_URLS
+from .observability import get_logger
+from .utils import MAX_CLEAN_CHARS
+
+
+logger = get_logger(__name__)
+
+MODES = ("news", "paper")
+# html: plain page; arxiv: paged export.arxiv.org API; tiktok: JSON data endpoint.
+ADAPTERS = ("html", "arxiv", "tiktok")
+# Rough characters per token for the prompt budget.
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = MAX_CLEAN_CHARS // CHARS_PER_TOKEN
+
+
+def infer_mode(url: str) -> str:
+    mode = "news"
+    if any(key in url for key in ["arxiv.org", ".edu", "publication", "research", "deepmind"]):
+        mode = "paper"
+    if "openai.com/index" in url:
+        mode = "news"
+    return mode
+
+
+def infer_adapter(url: str) -> str:
+    if "arxiv.org/list/" in url:
+        return "arxiv"
+    if "newsroom.tiktok.com" in url:
+        return "tiktok"
+    return "html"
+
+
+class SourceSpec:
+    """Settings of one source; unset fields fall back to defaults derived from the url."""
+
+    FIELDS = ("mode", "adapter", "cadence_seconds", "concurrency", "delay_seconds", "token_budget", "enabled")
+
+    def __init__(
+        self,
+        url: str,
+        mode: Optional[str] = None,
+        adapter: Optional[str] = None,
+        cadence_seconds: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        delay_seconds: Optional[float] = None,
+        token_budget: Optional[int] = None,
+        enabled: Any = True,
+    ):
+        self.url = url
+        self.mode = mode or infer_mode(url)
+        self.adapter = adapter or infer_adapter(url)
+        self.cadence_seconds = SOURCE_CADENCE_SECONDS if cadence_seconds is None else max(0.0, float(cadence_seconds))
+        self.concurrency = max(1, int(concurrency or 1))
+        # None keeps the global SCRAPER_PER_HOST_DELAY_SECONDS.
+        self.delay_seconds = None if delay_seconds is None else max(0.0, float(delay_seconds))
+        self.token_budget = max(1, int(token_budget or DEFAULT_TOKEN_BUDGET))
+        self.enabled = enabled is None or bool(enabled)
+        if self.mode not in MODES:
+            raise ValueError(f"{url}: unknown mode {self.mode!r}, expected one of {MODES}")
+        if self.adapter not in ADAPTERS:
+            raise ValueError(f"{url}: unknown adapter {self.adapter!r}, expected one of {ADAPTERS}")
+
+    @property
+    def max_chars(self) -> int:
+        """Cleaned-text characters sent to the LLM per request."""
+        return self.token_budget * CHARS_PER_TOKEN
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SourceSpec":
+        unknown = set(data) - set(cls.FIELDS) - {"url", "last_checked_at", "origin"}
+        if not data.get("url") or unknown:
+            raise ValueError(f"invalid source entry {data!r}" + (f": unknown fields {sorted(unknown)}" if unknown else ""))
+        return cls(data["url"], **{name: data.get(name) for name in cls.FIELDS if name in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"url": self.url, **{name: getattr(self, name) for name in self.FIELDS}}
+
+
+def load_source_file(path: str = SOURCES_FILE) -> Optional[List[SourceSpec]]:
+    """Specs declared in the sources file, or None when there is no file."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a JSON list of sources")
+    specs = [SourceSpec(entry) if isinstance(entry, str) else SourceSpec.from_dict(entry) for entry in entries]
+    logger.info("sources_file_loaded path=%s sources=%s", path, len(specs))
+    return specs
+
+
+def declared_sources(path: str = SOURCES_FILE) -> List[SourceSpec]:
+    """Sources declared by configuration: the sources file, else TARGET_URLS."""
+    specs = load_source_file(path)
+    return specs if specs is not None else [SourceSpec(url) for url in TARGET_URLS]
+
+
+def _timestamp(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class SourceRegistry:
+    """Enabled sources in registration order, plus a due-time index.
+
+    The schedule is a sorted list of (due_at, url); a source is due once
+    cadence_seconds have passed since its last check.
+    """
+
+    def __init__(self, specs: Iterable[SourceSpec], last_checked: Optional[Dict[str, float]] = None):
+        self.specs: Dict[str, SourceSpec] = {spec.url: spec for spec in specs if spec.enabled}
+        self._due_at: Dict[str, float] = {}
+        self._schedule: List[Tuple[float, str]] = []
+        for url, spec in self.specs.items():
+            self._schedule_at(url, (last_checked or {}).get(url, 0.0) + spec.cadence_seconds)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "SourceRegistry":
+        rows = list(rows)
+        specs = [SourceSpec.from_dict(row) for row in rows]
+        return cls(specs, {row["url"]: _timestamp(row.get("last_checked_at")) for row in rows})
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self.specs)
+
+    def get(self, url: str) -> SourceSpec:
+        """Spec of url; unregistered urls (ad-hoc runs) get the inferred defaults."""
+        return self.specs.get(url) or SourceSpec(url)
+
+    def _schedule_at(self, url: str, due_at: float) -> None:
+        previous = self._due_at.get(url)
+        if previous is not None:
+            index = bisect.bisect_left(self._schedule, (previous, url))
+            if index < len(self._schedule) and self._schedule[index] == (previous, url):
+                self._schedule.pop(index)
+        self._due_at[url] = due_at
+        bisect.insort(self._schedule, (due_at, url))
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Sources due at now, in registration order."""
+        now = time.time() if now is None else now
+        due = {url for _, url in self._schedule[:bisect.bisect_right(self._schedule, now, key=lambda item: item[0])]}
+        return [url for url in self.specs if url in due]
+
+    def next_due(self) -> Optional[float]:
+        return self._schedule[0][0] if self._schedule else None
+
+    def mark_checked(self, url: str, at: Optional[float] = None) -> None:
+        spec = self.specs.get(url)
+        if spec is not None:
+            self._schedule_at(url, (time.time() if at is None else at) + spec.cadence_seconds)
@@ -1,9 +1,9 @@
 import json
 import os
 import sqlite3
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 try:
@@ -14,9 +14,69 @@ except ImportError:
 
 DB_PATH = Path(os.getenv("NEWS_DB_PATH", os.path.join(DATA_DIR, "news_monitor.db")))
 
-SCHEMA_SQL = """
-PRAGMA foreign_keys = ON;
+# Several worker processes may write at once; wait for the lock instead of failing.
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("NEWS_DB_BUSY_TIMEOUT", "30"))
+# WAL lets the dashboard read while the scraper writes. Use DELETE on file
+# systems without shared-memory support (e.g. network mounts).
+DB_JOURNAL_MODE = os.getenv("NEWS_DB_JOURNAL_MODE", "WAL").upper()
+
+# Connection profiles, chosen by the caller of connect(). In WAL mode
+# synchronous=NORMAL cannot corrupt the database; a power loss may drop the
+# last commits. The bulk profile skips fsync altogether: only for imports that
+# can simply be rerun. cache_size is negative KiB, mmap_size bytes.
+CONNECTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Scraper and dashboard edits.
+    "writer": {"synchronous": "NORMAL", "cache_size": -16000, "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY"},
+    # Dashboard and RAG reads; query_only guards against accidental writes.
+    "reader": {"cache_size": -32000, "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY", "query_only": "ON"},
+    # migrate_json_to_sqlite.py and merge_shards.py.
+    "bulk": {"synchronous": "OFF", "cache_size": -131072, "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY"},
+}
+
+# Registry settings stored on each source row. enabled is NULL for rows that
+# only hold stats of a url that is no longer (or never was) registered.
+SOURCE_REGISTRY_COLUMNS = {
+    "mode": "TEXT",
+    "adapter": "TEXT",
+    "cadence_seconds": "REAL",
+    "concurrency": "INTEGER",
+    "delay_seconds": "REAL",
+    "token_budget": "INTEGER",
+    "enabled": "INTEGER",
+    "origin": "TEXT",
+}
+
+# Full-text search (articles_fts, see _migrate_article_search). Higher weights
+# rank matches in that column higher; the user's own comment and tags count
+# more than the generated summary.
+FTS_COLUMNS = ("title", "summary", "score_reason", "comment", "tags")
+FTS_WEIGHTS = {"title": 5.0, "summary": 1.0, "score_reason": 0.5, "comment": 2.0, "tags": 3.0}
+_FTS_TAGS_SQL = "(SELECT group_concat(tag, ' ') FROM article_tags WHERE article_id = {article_id})"
+# Articles inserted after id ? have no index row yet.
+_FTS_INDEX_NEW_SQL = f"""
+INSERT INTO articles_fts(rowid, {", ".join(FTS_COLUMNS)})
+SELECT id, title, summary, score_reason, comment, {_FTS_TAGS_SQL.format(article_id="articles.id")}
+FROM articles WHERE id > ?
+"""
+# Older articles whose links are in the JSON array: re-index those whose tags
+# changed (the update trigger keeps their text current).
+_FTS_INDEX_TAGS_SQL = f"""
+INSERT OR REPLACE INTO articles_fts(rowid, {", ".join(FTS_COLUMNS)})
+SELECT id, title, summary, score_reason, comment, tags FROM (
+    SELECT articles.id, title, summary, score_reason, comment, {_FTS_TAGS_SQL.format(article_id="articles.id")} AS tags
+    FROM json_each(?) AS batch JOIN articles ON articles.link = batch.value
+    WHERE articles.id <= ?
+) AS fresh
+WHERE NOT EXISTS (
+    SELECT 1 FROM articles_fts WHERE articles_fts.rowid = fresh.id AND articles_fts.tags IS fresh.tags
+)
+"""
+# The trigram index only answers terms of at least this many characters.
+FTS_MIN_TERM_CHARS = 3
 
+# Schema of version 1. Later versions are the steps in MIGRATIONS; shipped steps
+# are never edited, a schema change is a new step appended to the list.
+BASE_SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS articles (
     id INTEGER PRIMARY KEY,
     title TEXT,
@@ -85,6 +145,8 @@ CREATE TABLE IF NOT EXISTS sources (
     unchanged_count INTEGER DEFAULT 0,
     last_article_count INTEGER DEFAULT 0,
     last_new_article_count INTEGER DEFAULT 0,
+    simhash TEXT,
+    link_signature TEXT,
     raw_json TEXT
 );
 
@@ -100,6 +162,16 @@ CREATE TABLE IF NOT EXISTS source_failures (
     FOREIGN KEY (source_id) REFERENCES sources(id) ON DELETE CASCADE
 );
 
+CREATE TABLE IF NOT EXISTS boilerplate_blocks (
+    domain TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 1,
+    sample TEXT,
+    first_seen_at TEXT,
+    last_seen_at TEXT,
+    PRIMARY KEY (domain, fingerprint)
+);
+
 CREATE INDEX IF NOT EXISTS idx_articles_status_score ON articles(inbox_status, score DESC);
 CREATE INDEX IF NOT EXISTS idx_articles_favorite_score ON articles(is_favorite, score DESC);
 CREATE INDEX IF NOT EXISTS idx_articles_date ON articles(date);
@@ -129,29 +201,224 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 
-def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+def run_script(conn: sqlite3.Connection, script: str) -> None:
+    """Execute a multi-statement script inside the current transaction.
+
+    executescript() would commit first, which breaks an all-or-nothing migration.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def add_missing_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def _migrate_base_schema(conn: sqlite3.Connection) -> None:
+    run_script(conn, BASE_SCHEMA_SQL)
+    # Databases created before versioning may predate these columns.
+    add_missing_columns(
+        conn,
+        "sources",
+        {
+            "last_retryable": "INTEGER DEFAULT 0",
+            "last_attempts": "INTEGER DEFAULT 0",
+            "simhash": "TEXT",
+            "link_signature": "TEXT",
+        },
+    )
+    add_missing_columns(conn, "article_origins", {"occurrence_count": "INTEGER NOT NULL DEFAULT 1"})
+
+
+def _migrate_source_leases(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS source_leases (
+            url TEXT PRIMARY KEY,
+            run_id TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'leased',
+            claimed_at TEXT,
+            heartbeat_at TEXT,
+            expires_at TEXT
+        )
+        """
+    )
+
+
+def _migrate_source_registry(conn: sqlite3.Connection) -> None:
+    add_missing_columns(conn, "sources", SOURCE_REGISTRY_COLUMNS)
+
+
+def _migrate_is_arxiv(conn: sqlite3.Connection) -> None:
+    # A virtual generated column: always in sync with link, no write-path
+    # changes, and CREATE INDEX computes it once for the existing rows.
+    conn.execute(
+        "ALTER TABLE articles ADD COLUMN is_arxiv INTEGER "
+        "GENERATED ALWAYS AS (instr(lower(link), 'arxiv.org') > 0) VIRTUAL"
+    )
+    run_script(
+        conn,
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_status_arxiv_score ON articles(inbox_status, is_arxiv, score DESC, date DESC);
+        CREATE INDEX IF NOT EXISTS idx_articles_favorite_arxiv_score ON articles(is_favorite, is_arxiv, score DESC, date DESC);
+        -- Status lookups use the prefix of idx_articles_status_arxiv_score. All
+        -- favorites (RAG, favorites page) keep their own index, now with the
+        -- date tie-break so ORDER BY score DESC, date DESC needs no sort.
+        DROP INDEX IF EXISTS idx_articles_status_score;
+        DROP INDEX IF EXISTS idx_articles_favorite_score;
+        CREATE INDEX idx_articles_favorite_score ON articles(is_favorite, score DESC, date DESC);
+
+        DROP VIEW IF EXISTS v_latest_news;
+        DROP VIEW IF EXISTS v_latest_arxiv;
+        DROP VIEW IF EXISTS v_history_news;
+        DROP VIEW IF EXISTS v_history_arxiv;
+
+        CREATE VIEW v_latest_news AS
+            SELECT * FROM articles WHERE inbox_status = 'latest' AND is_arxiv = 0;
+        CREATE VIEW v_latest_arxiv AS
+            SELECT * FROM articles WHERE inbox_status = 'latest' AND is_arxiv = 1;
+        CREATE VIEW v_history_news AS
+            SELECT * FROM articles WHERE inbox_status = 'history' AND is_arxiv = 0;
+        CREATE VIEW v_history_arxiv AS
+            SELECT * FROM articles WHERE inbox_status = 'history' AND is_arxiv = 1;
+        """,
+    )
+
+
+def _migrate_article_search(conn: sqlite3.Connection) -> None:
+    # trigram: case-insensitive substring matching that also works for the
+    # Chinese summaries, which unicode61 would keep as one token per phrase.
+    # The table keeps its own copy of the text so snippet() can read it; rowid
+    # is articles.id. Triggers keep it in sync with every writer, including
+    # merge_shards.py and plain SQL edits.
+    run_script(
+        conn,
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5({", ".join(FTS_COLUMNS)}, tokenize = 'trigram');
+
+        INSERT INTO articles_fts(rowid, {", ".join(FTS_COLUMNS)})
+        SELECT id, title, summary, score_reason, comment, {_FTS_TAGS_SQL.format(article_id="articles.id")}
+        FROM articles;
+
+        -- A new article has no article_tags rows yet: take its tags from
+        -- raw_json, so the tag trigger below has nothing left to re-index.
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, {", ".join(FTS_COLUMNS)})
+            VALUES (
+                new.id, new.title, new.summary, new.score_reason, new.comment,
+                (SELECT group_concat(value, ' ') FROM json_each(CASE WHEN json_valid(new.raw_json) THEN new.raw_json END, '$.tags'))
+            );
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, summary, score_reason, comment ON articles
+        WHEN old.title IS NOT new.title OR old.summary IS NOT new.summary
+            OR old.score_reason IS NOT new.score_reason OR old.comment IS NOT new.comment
+        BEGIN
+            UPDATE articles_fts
+            SET title = new.title, summary = new.summary, score_reason = new.score_reason, comment = new.comment
+            WHERE rowid = new.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            DELETE FROM articles_fts WHERE rowid = old.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS articles_fts_tag_insert AFTER INSERT ON article_tags
+        WHEN NOT EXISTS (
+            SELECT 1 FROM articles_fts
+            WHERE rowid = new.article_id AND instr(' ' || COALESCE(tags, '') || ' ', ' ' || new.tag || ' ') > 0
+        )
+        BEGIN
+            UPDATE articles_fts SET tags = {_FTS_TAGS_SQL.format(article_id="new.article_id")} WHERE rowid = new.article_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS articles_fts_tag_delete AFTER DELETE ON article_tags BEGIN
+            UPDATE articles_fts SET tags = {_FTS_TAGS_SQL.format(article_id="old.article_id")} WHERE rowid = old.article_id;
+        END;
+        """,
+    )
+
+
+def _migrate_article_search_batched(conn: sqlite3.Connection) -> None:
+    # FTS5 inserts from row triggers cut bulk upserts to a third. New articles
+    # and tags are now indexed once per batch by index_articles(); text updates
+    # and deletes keep their triggers.
+    run_script(
+        conn,
+        """
+        DROP TRIGGER IF EXISTS articles_fts_insert;
+        DROP TRIGGER IF EXISTS articles_fts_tag_insert;
+        """,
+    )
+
+
+# Step N brings a database from PRAGMA user_version N-1 to N. Steps must also
+# cope with databases created before versioning (user_version 0), hence the
+# IF NOT EXISTS / missing-column checks in the early ones.
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _migrate_base_schema,
+    _migrate_source_leases,
+    _migrate_source_registry,
+    _migrate_is_arxiv,
+    _migrate_article_search,
+    _migrate_article_search_batched,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply the pending migrations in one transaction; returns the schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return version
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"database schema version {version} is newer than this code ({SCHEMA_VERSION})")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have migrated while this one waited for the lock.
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return SCHEMA_VERSION
+
+
+def connect(db_path: Path = DB_PATH, profile: str = "writer") -> sqlite3.Connection:
+    """Open the database with a CONNECTION_PROFILES profile.
+
+    An up-to-date schema costs one PRAGMA read, no DDL.
+    """
+    settings = CONNECTION_PROFILES[profile]
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_SECONDS)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
-    conn.executescript(SCHEMA_SQL)
-    ensure_runtime_columns(conn)
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_SECONDS * 1000)}")
+    # Persistent: a no-op once the database is in this mode.
+    conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    for name, value in settings.items():
+        if name != "query_only":
+            conn.execute(f"PRAGMA {name} = {value}")
+    migrate(conn)
+    if "query_only" in settings:
+        conn.execute(f"PRAGMA query_only = {settings['query_only']}")
     return conn
 
 
-def ensure_runtime_columns(conn: sqlite3.Connection) -> None:
-    existing_source_cols = {row["name"] for row in conn.execute("PRAGMA table_info(sources)")}
-    if "last_retryable" not in existing_source_cols:
-        conn.execute("ALTER TABLE sources ADD COLUMN last_retryable INTEGER DEFAULT 0")
-    if "last_attempts" not in existing_source_cols:
-        conn.execute("ALTER TABLE sources ADD COLUMN last_attempts INTEGER DEFAULT 0")
-
-    existing_origin_cols = {row["name"] for row in conn.execute("PRAGMA table_info(article_origins)")}
-    if "occurrence_count" not in existing_origin_cols:
-        conn.execute("ALTER TABLE article_origins ADD COLUMN occurrence_count INTEGER NOT NULL DEFAULT 1")
-    conn.commit()
-
-
 def as_int(value: Any, default: int = 0) -> int:
     try:
         if value is None or value == "":
@@ -189,11 +456,6 @@ def infer_type(article: Dict[str, Any], fallback_type: Optional[str] = None) ->
     return "paper" if "arxiv.org" in article.get("link", "").lower() else "news"
 
 
-def merge_status(existing: str, incoming: str) -> str:
-    priority = {"latest": 3, "history": 2, "library": 1, None: 0, "": 0}
-    return incoming if priority.get(incoming, 0) > priority.get(existing, 0) else existing
-
-
 def article_payload(article: Dict[str, Any], inbox_status: str = "library", fallback_type: Optional[str] = None, is_favorite: bool = False) -> Dict[str, Any]:
     negative_score = article.get("negative_score", article.get("negtive_score", 0))
     link = str(article.get("link", ""))
@@ -224,6 +486,7 @@ def _article_from_row(row: sqlite3.Row, tags: List[str]) -> Dict[str, Any]:
     article = dict(row)
     article["is_tech_release"] = bool(article.get("is_tech_release"))
     article["is_favorite"] = bool(article.get("is_favorite"))
+    article["is_arxiv"] = bool(article.get("is_arxiv"))
     article["tags"] = tags
     return article
 
@@ -243,118 +506,112 @@ def _tags_for_articles(conn: sqlite3.Connection, article_ids: Iterable[int]) ->
     return tags
 
 
-def upsert_article(
+# Column order of article_payload() rows.
+ARTICLE_COLUMNS = (
+    "title", "link", "summary", "date", "venue", "source_domain", "type",
+    "ai_score", "impact_score", "personal_score", "negative_score", "score",
+    "is_tech_release", "code_url", "score_reason", "inbox_status", "is_favorite",
+    "comment", "raw_json",
+)
+# Fields every upsert overwrites unless the incoming value is NULL or ''.
+_ARTICLE_OVERWRITE_COLUMNS = [name for name in ARTICLE_COLUMNS if name not in {"link", "inbox_status", "is_favorite", "comment"}]
+_ARTICLE_OVERWRITE_SQL = ",\n    ".join(f"{name} = COALESCE(NULLIF(excluded.{name}, ''), articles.{name})" for name in _ARTICLE_OVERWRITE_COLUMNS)
+# An article moves up to a higher inbox status, never down; unknown statuses rank 0.
+INBOX_STATUS_PRIORITY = {"latest": 3, "history": 2, "library": 1}
+
+
+def _status_priority_sql(column: str) -> str:
+    cases = " ".join(f"WHEN '{status}' THEN {rank}" for status, rank in INBOX_STATUS_PRIORITY.items())
+    return f"CASE {column} {cases} ELSE 0 END"
+
+
+# Merge rules for an existing link, evaluated inside SQLite: the higher-priority
+# status wins, a favorite stays a favorite, and a comment is replaced only by a
+# non-empty one.
+UPSERT_ARTICLE_SQL = f"""
+INSERT INTO articles ({", ".join(ARTICLE_COLUMNS)}, created_at, updated_at)
+VALUES ({", ".join("?" for _ in ARTICLE_COLUMNS)}, ?, ?)
+ON CONFLICT(link) DO UPDATE SET
+    {_ARTICLE_OVERWRITE_SQL},
+    inbox_status = CASE WHEN {_status_priority_sql("excluded.inbox_status")} > {_status_priority_sql("articles.inbox_status")}
+        THEN excluded.inbox_status ELSE articles.inbox_status END,
+    is_favorite = MAX(COALESCE(articles.is_favorite, 0), excluded.is_favorite),
+    comment = COALESCE(NULLIF(excluded.comment, ''), articles.comment),
+    updated_at = excluded.updated_at
+"""
+
+
+def upsert_articles(
     conn: sqlite3.Connection,
-    article: Dict[str, Any],
+    articles: Iterable[Dict[str, Any]],
     inbox_status: str = "library",
     fallback_type: Optional[str] = None,
     is_favorite: bool = False,
     origin_file: Optional[str] = None,
-) -> Optional[int]:
-    payload = article_payload(article, inbox_status, fallback_type, is_favorite)
-    if not payload["link"]:
-        return None
+) -> int:
+    """Insert or merge articles with one executemany per table; returns the number stored.
 
-    existing = conn.execute("SELECT * FROM articles WHERE link = ?", (payload["link"],)).fetchone()
+    Articles without a link are skipped. Tags and origins are attached by link,
+    so no article id has to be read back.
+    """
     timestamp = now_iso()
-    if existing:
-        merged = dict(existing)
-        for key, value in payload.items():
-            if key == "link":
-                continue
-            if key == "inbox_status":
-                merged[key] = merge_status(merged.get(key), value)
-            elif key == "is_favorite":
-                merged[key] = max(as_int(merged.get(key)), as_int(value))
-            elif key == "comment":
-                merged[key] = value or merged.get(key, "")
-            elif value not in (None, ""):
-                merged[key] = value
-        merged["updated_at"] = timestamp
-        conn.execute(
-            """
-            UPDATE articles
-            SET title = ?, summary = ?, date = ?, venue = ?, source_domain = ?, type = ?,
-                ai_score = ?, impact_score = ?, personal_score = ?, negative_score = ?, score = ?,
-                is_tech_release = ?, code_url = ?, score_reason = ?, inbox_status = ?,
-                is_favorite = ?, comment = ?, raw_json = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (
-                merged["title"],
-                merged["summary"],
-                merged["date"],
-                merged["venue"],
-                merged["source_domain"],
-                merged["type"],
-                merged["ai_score"],
-                merged["impact_score"],
-                merged["personal_score"],
-                merged["negative_score"],
-                merged["score"],
-                merged["is_tech_release"],
-                merged["code_url"],
-                merged["score_reason"],
-                merged["inbox_status"],
-                merged["is_favorite"],
-                merged["comment"],
-                merged["raw_json"],
-                merged["updated_at"],
-                merged["id"],
-            ),
-        )
-        article_id = int(merged["id"])
-    else:
-        conn.execute(
-            """
-            INSERT INTO articles (
-                title, link, summary, date, venue, source_domain, type,
-                ai_score, impact_score, personal_score, negative_score, score,
-                is_tech_release, code_url, score_reason, inbox_status, is_favorite,
-                comment, raw_json, created_at, updated_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                payload["title"],
-                payload["link"],
-                payload["summary"],
-                payload["date"],
-                payload["venue"],
-                payload["source_domain"],
-                payload["type"],
-                payload["ai_score"],
-                payload["impact_score"],
-                payload["personal_score"],
-                payload["negative_score"],
-                payload["score"],
-                payload["is_tech_release"],
-                payload["code_url"],
-                payload["score_reason"],
-                payload["inbox_status"],
-                payload["is_favorite"],
-                payload["comment"],
-                payload["raw_json"],
-                timestamp,
-                timestamp,
-            ),
-        )
-        article_id = int(conn.execute("SELECT last_insert_rowid()").fetchone()[0])
-
+    rows = []
+    tags = []
+    last_id = max_article_id(conn)
+    for article in articles:
+        payload = article_payload(article, inbox_status, fallback_type, is_favorite)
+        if not payload["link"]:
+            continue
+        rows.append(tuple(payload[name] for name in ARTICLE_COLUMNS) + (timestamp, timestamp))
+        tags.extend((tag, payload["link"]) for tag in clean_tags(article.get("tags")))
+    if not rows:
+        return 0
+    link_index = ARTICLE_COLUMNS.index("link")
+    conn.executemany(UPSERT_ARTICLE_SQL, rows)
     if origin_file:
-        conn.execute(
+        conn.executemany(
             """
             INSERT INTO article_origins(article_id, file_name, dataset_status, occurrence_count)
-            VALUES (?, ?, ?, 1)
+            SELECT id, ?, ?, 1 FROM articles WHERE link = ?
             ON CONFLICT(article_id, file_name) DO UPDATE SET occurrence_count = occurrence_count + 1
             """,
-            (article_id, origin_file, inbox_status),
+            [(origin_file, inbox_status, row[link_index]) for row in rows],
         )
+    conn.executemany("INSERT OR IGNORE INTO article_tags(article_id, tag) SELECT id, ? FROM articles WHERE link = ?", tags)
+    index_articles(conn, last_id, [row[link_index] for row in rows])
+    return len(rows)
+
+
+def max_article_id(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()[0]
+
 
-    for tag in clean_tags(article.get("tags")):
-        conn.execute("INSERT OR IGNORE INTO article_tags(article_id, tag) VALUES (?, ?)", (article_id, tag))
+def index_articles(conn: sqlite3.Connection, last_id: int, links: Iterable[str] = ()) -> None:
+    """Bring the search index up to date after a batch write, one statement per kind.
 
-    return article_id
+    Indexes every article inserted after last_id (max_article_id() before the
+    batch) and re-indexes the tags of older articles among links. Writers that
+    insert articles or tags outside upsert_articles (merge_shards.py) call this
+    once afterwards; a per-row trigger would cost a third of the insert rate.
+    """
+    conn.execute(_FTS_INDEX_NEW_SQL, (last_id,))
+    links = list(links)
+    if links:
+        conn.execute(_FTS_INDEX_TAGS_SQL, (json.dumps(links), last_id))
+
+
+def upsert_article(
+    conn: sqlite3.Connection,
+    article: Dict[str, Any],
+    inbox_status: str = "library",
+    fallback_type: Optional[str] = None,
+    is_favorite: bool = False,
+    origin_file: Optional[str] = None,
+) -> Optional[int]:
+    """Single-article upsert_articles(); returns the article id."""
+    if not upsert_articles(conn, [article], inbox_status, fallback_type, is_favorite, origin_file):
+        return None
+    return int(conn.execute("SELECT id FROM articles WHERE link = ?", (str(article["link"]),)).fetchone()[0])
 
 
 def load_articles(conn: sqlite3.Connection, *, inbox_status: Optional[str] = None, arxiv: Optional[bool] = None, favorites: bool = False) -> List[Dict[str, Any]]:
@@ -364,9 +621,9 @@ def load_articles(conn: sqlite3.Connection, *, inbox_status: Optional[str] = Non
         where.append("inbox_status = ?")
         params.append(inbox_status)
     if arxiv is True:
-        where.append("link LIKE '%arxiv.org%'")
+        where.append("is_arxiv = 1")
     elif arxiv is False:
-        where.append("link NOT LIKE '%arxiv.org%'")
+        where.append("is_arxiv = 0")
     if favorites:
         where.append("is_favorite = 1")
 
@@ -380,6 +637,76 @@ def load_articles(conn: sqlite3.Connection, *, inbox_status: Optional[str] = Non
     return [_article_from_row(row, tag_map.get(int(row["id"]), [])) for row in rows]
 
 
+def search_articles(
+    conn: sqlite3.Connection,
+    query: str,
+    *,
+    any_term: bool = False,
+    inbox_status: Optional[str] = None,
+    arxiv: Optional[bool] = None,
+    favorites: bool = False,
+    limit: Optional[int] = 50,
+    highlight: Tuple[str, str] = ("[", "]"),
+) -> List[Dict[str, Any]]:
+    """Articles whose title, summary, score_reason, comment or tags contain the query terms.
+
+    Terms are case-insensitive substrings; all must match, or at least one with
+    any_term. Results are ranked by bm25 (FTS_WEIGHTS) and carry "rank" (lower
+    is better) and "snippet", the best-matching fragment with the terms wrapped
+    in highlight. Terms shorter than FTS_MIN_TERM_CHARS are matched by scanning
+    the indexed text; with any_term they are ignored when longer terms exist,
+    and a query of only short terms is ordered by score instead of bm25.
+    """
+    terms = list(dict.fromkeys(query.split()))
+    long_terms = [term for term in terms if len(term) >= FTS_MIN_TERM_CHARS]
+    short_terms = [term for term in terms if len(term) < FTS_MIN_TERM_CHARS]
+    if any_term and long_terms:
+        short_terms = []
+
+    where: List[str] = []
+    params: List[Any] = []
+    if long_terms:
+        phrases = ['"' + term.replace('"', '""') + '"' for term in long_terms]
+        where.append("articles_fts MATCH ?")
+        params.append((" OR " if any_term else " AND ").join(phrases))
+    if short_terms:
+        text = " || ' ' || ".join(f"COALESCE(articles_fts.{name}, '')" for name in FTS_COLUMNS)
+        clauses = [f"instr(lower({text}), ?) > 0" for _ in short_terms]
+        where.append("(" + (" OR " if any_term else " AND ").join(clauses) + ")")
+        params.extend(term.lower() for term in short_terms)
+    if not where:
+        return []
+    if inbox_status:
+        where.append("a.inbox_status = ?")
+        params.append(inbox_status)
+    if arxiv is not None:
+        where.append("a.is_arxiv = ?")
+        params.append(1 if arxiv else 0)
+    if favorites:
+        where.append("a.is_favorite = 1")
+
+    if long_terms:
+        weights = ", ".join(str(FTS_WEIGHTS[name]) for name in FTS_COLUMNS)
+        ranked = f"snippet(articles_fts, -1, ?, ?, '…', 24) AS snippet, bm25(articles_fts, {weights}) AS rank"
+        params[:0] = list(highlight)
+        order = "rank"
+    else:
+        ranked = "NULL AS snippet, 0.0 AS rank"
+        order = "a.score DESC, a.date DESC"
+    rows = conn.execute(
+        f"""
+        SELECT a.*, {ranked}
+        FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+        WHERE {" AND ".join(where)}
+        ORDER BY {order}
+        LIMIT ?
+        """,
+        [*params, -1 if limit is None else limit],
+    ).fetchall()
+    tag_map = _tags_for_articles(conn, [row["id"] for row in rows])
+    return [_article_from_row(row, tag_map.get(int(row["id"]), [])) for row in rows]
+
+
 def mark_seen(conn: sqlite3.Connection, link: str) -> None:
     if link:
         conn.execute("INSERT OR IGNORE INTO seen_links(link) VALUES (?)", (link,))
@@ -393,18 +720,39 @@ def is_seen(conn: sqlite3.Connection, link: str) -> bool:
     return conn.execute("SELECT 1 FROM articles WHERE link = ?", (link,)).fetchone() is not None
 
 
+def filter_unseen_links(conn: sqlite3.Connection, links: Iterable[str], chunk_size: int = 400) -> Set[str]:
+    """The links found in neither seen_links nor articles.
+
+    One query per chunk of links (both tables in a single UNION), instead of
+    two lookups per link; chunks keep the bound parameters under SQLite's limit.
+    """
+    pending = list(dict.fromkeys(link for link in links if link))
+    known: Set[str] = set()
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        placeholders = ",".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"SELECT link FROM seen_links WHERE link IN ({placeholders}) "
+            f"UNION SELECT link FROM articles WHERE link IN ({placeholders})",
+            chunk + chunk,
+        )
+        known.update(row[0] for row in rows)
+    return set(pending) - known
+
+
 def latest_origin_for_article(article: Dict[str, Any]) -> str:
     return "latest_arxiv.json" if "arxiv.org" in article.get("link", "").lower() else "latest_news.json"
 
 
 def add_latest_articles(conn: sqlite3.Connection, articles: Iterable[Dict[str, Any]]) -> int:
-    count = 0
+    by_origin: Dict[str, List[Dict[str, Any]]] = {}
     for article in articles:
-        if not article.get("link"):
-            continue
-        upsert_article(conn, article, inbox_status="latest", fallback_type=article.get("type"), origin_file=latest_origin_for_article(article))
-        mark_seen(conn, article["link"])
-        count += 1
+        if article.get("link"):
+            by_origin.setdefault(latest_origin_for_article(article), []).append(article)
+    count = 0
+    for origin_file, group in by_origin.items():
+        count += upsert_articles(conn, group, inbox_status="latest", origin_file=origin_file)
+        conn.executemany("INSERT OR IGNORE INTO seen_links(link) VALUES (?)", [(article["link"],) for article in group])
     return count
 
 
@@ -412,9 +760,9 @@ def archive_links(conn: sqlite3.Connection, *, arxiv: Optional[bool], links: Opt
     params: List[Any] = []
     where = ["inbox_status = 'latest'"]
     if arxiv is True:
-        where.append("link LIKE '%arxiv.org%'")
+        where.append("is_arxiv = 1")
     elif arxiv is False:
-        where.append("link NOT LIKE '%arxiv.org%'")
+        where.append("is_arxiv = 0")
     selected_links = list(links or [])
     if selected_links:
         where.append(f"link IN ({','.join('?' for _ in selected_links)})")
@@ -465,6 +813,50 @@ def save_page_hash(conn: sqlite3.Connection, url: str, content_hash: str) -> Non
     conn.execute("UPDATE sources SET last_hash = ?, raw_json = raw_json WHERE url = ?", (content_hash, url))
 
 
+def get_page_signature(conn: sqlite3.Connection, url: str) -> Dict[str, Optional[str]]:
+    row = conn.execute("SELECT simhash, link_signature FROM sources WHERE url = ?", (url,)).fetchone()
+    if not row:
+        return {"simhash": None, "link_signature": None}
+    return {"simhash": row["simhash"], "link_signature": row["link_signature"]}
+
+
+def save_page_signature(conn: sqlite3.Connection, url: str, simhash: str, link_signature: str) -> None:
+    ensure_source(conn, url)
+    conn.execute("UPDATE sources SET simhash = ?, link_signature = ? WHERE url = ?", (simhash, link_signature, url))
+
+
+def sync_source_registry(conn: sqlite3.Connection, specs: List[Dict[str, Any]], origin: str = "config") -> None:
+    """Make the registry rows of the given origin match specs.
+
+    Declared sources are inserted or updated; sources this origin declared
+    earlier but no longer lists are disabled. Rows managed in the table itself
+    (any other origin) are left alone, even when a spec names the same url.
+    """
+    columns = [name for name in SOURCE_REGISTRY_COLUMNS if name != "origin"]
+    declared = {spec["url"] for spec in specs}
+    managed = {
+        row["url"]: row["origin"]
+        for row in conn.execute("SELECT url, origin FROM sources WHERE enabled IS NOT NULL")
+    }
+    for spec in specs:
+        if managed.get(spec["url"], origin) != origin:
+            continue
+        ensure_source(conn, spec["url"])
+        conn.execute(
+            f"UPDATE sources SET {', '.join(f'{name} = ?' for name in columns)}, origin = ? WHERE url = ?",
+            [spec.get(name) for name in columns] + [origin, spec["url"]],
+        )
+    stale = [url for url, row_origin in managed.items() if row_origin == origin and url not in declared]
+    conn.executemany("UPDATE sources SET enabled = 0 WHERE url = ?", [(url,) for url in stale])
+
+
+def load_source_registry(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Enabled registry rows in registration order, with their last check time."""
+    columns = ", ".join(SOURCE_REGISTRY_COLUMNS)
+    rows = conn.execute(f"SELECT url, {columns}, last_checked_at FROM sources WHERE enabled = 1 ORDER BY id")
+    return [dict(row) for row in rows]
+
+
 def compute_health_score(entry: Dict[str, Any]) -> int:
     score = 100
     score -= as_int(entry.get("consecutive_failures")) * 20
@@ -553,21 +945,147 @@ def record_failure(conn: sqlite3.Connection, url: str, stage: str, error_type: s
     )
 
 
+# Most recent failures kept per source in the in-memory health view.
+FAILURE_QUEUE_LIMIT = 25
+
+_FAILURE_COLUMNS = "time, stage, error_type, message, retryable, attempts"
+
+
 def load_source_health(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
-    rows = conn.execute("SELECT * FROM sources ORDER BY url").fetchall()
     result: Dict[str, Dict[str, Any]] = {}
-    for row in rows:
+    by_id: Dict[int, Dict[str, Any]] = {}
+    for row in conn.execute("SELECT * FROM sources ORDER BY url"):
         entry = dict(row)
-        failures = conn.execute(
-            """
-            SELECT time, stage, error_type, message, retryable, attempts
-            FROM source_failures
-            WHERE source_id = ?
-            ORDER BY id DESC
-            LIMIT 25
-            """,
-            (entry["id"],),
-        ).fetchall()
-        entry["failure_queue"] = [dict(failure) for failure in failures]
+        entry["failure_queue"] = []
         result[entry["url"]] = entry
+        by_id[entry["id"]] = entry
+    # One pass over the recent failures of every source instead of a query per source.
+    failures = conn.execute(
+        f"""
+        SELECT source_id, {_FAILURE_COLUMNS}
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY source_id ORDER BY id DESC) AS recency
+            FROM source_failures
+        )
+        WHERE recency <= ?
+        ORDER BY source_id, recency
+        """,
+        (FAILURE_QUEUE_LIMIT,),
+    )
+    for failure in failures:
+        entry = by_id.get(failure["source_id"])
+        if entry is not None:
+            item = dict(failure)
+            del item["source_id"]
+            entry["failure_queue"].append(item)
     return result
+
+
+def source_failure_queue(conn: sqlite3.Connection, source_id: int) -> List[Dict[str, Any]]:
+    failures = conn.execute(
+        f"SELECT {_FAILURE_COLUMNS} FROM source_failures WHERE source_id = ? ORDER BY id DESC LIMIT ?",
+        (source_id, FAILURE_QUEUE_LIMIT),
+    )
+    return [dict(failure) for failure in failures]
+
+
+def load_boilerplate(conn: sqlite3.Connection, domain: str, min_hits: int) -> Set[str]:
+    rows = conn.execute(
+        "SELECT fingerprint FROM boilerplate_blocks WHERE domain = ? AND hits >= ?",
+        (domain, min_hits),
+    )
+    return {row["fingerprint"] for row in rows}
+
+
+def record_boilerplate(conn: sqlite3.Connection, domain: str, blocks: Dict[str, str]) -> None:
+    """Count one more page version for every fingerprint -> sample text in blocks."""
+    timestamp = now_iso()
+    conn.executemany(
+        """
+        INSERT INTO boilerplate_blocks(domain, fingerprint, hits, sample, first_seen_at, last_seen_at)
+        VALUES (?, ?, 1, ?, ?, ?)
+        ON CONFLICT(domain, fingerprint) DO UPDATE SET hits = hits + 1, last_seen_at = excluded.last_seen_at
+        """,
+        [(domain, fingerprint, sample[:200], timestamp, timestamp) for fingerprint, sample in blocks.items()],
+    )
+
+
+def prune_boilerplate(conn: sqlite3.Connection, max_age_days: int) -> int:
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+    conn.execute("DELETE FROM boilerplate_blocks WHERE last_seen_at < ?", (cutoff,))
+    return int(conn.execute("SELECT changes()").fetchone()[0])
+
+
+def _lease_expiry(ttl_seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat(timespec="seconds")
+
+
+def claim_sources(conn: sqlite3.Connection, urls: Iterable[str], run_id: str, owner: str, ttl_seconds: float, limit: int) -> List[str]:
+    """Lease up to limit of urls (in the given order) to owner for this run.
+
+    A url is free when it has no lease for run_id, or its lease expired without
+    being finished. The whole claim is one IMMEDIATE transaction, so concurrent
+    workers serialize on it and never lease the same url twice.
+    """
+    now = now_iso()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        leases = {row["url"]: row for row in conn.execute("SELECT url, run_id, state, expires_at FROM source_leases")}
+        claimed = []
+        for url in urls:
+            if len(claimed) >= limit:
+                break
+            lease = leases.get(url)
+            if lease and lease["run_id"] == run_id and (lease["state"] == "done" or lease["expires_at"] > now):
+                continue
+            claimed.append(url)
+        expires_at = _lease_expiry(ttl_seconds)
+        conn.executemany(
+            """
+            INSERT INTO source_leases(url, run_id, owner, state, claimed_at, heartbeat_at, expires_at)
+            VALUES (?, ?, ?, 'leased', ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                run_id = excluded.run_id, owner = excluded.owner, state = 'leased',
+                claimed_at = excluded.claimed_at, heartbeat_at = excluded.heartbeat_at, expires_at = excluded.expires_at
+            """,
+            [(url, run_id, owner, now, now, expires_at) for url in claimed],
+        )
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return claimed
+
+
+def heartbeat_leases(conn: sqlite3.Connection, run_id: str, owner: str, ttl_seconds: float) -> int:
+    """Extend every unfinished lease owner holds in this run."""
+    conn.execute(
+        """
+        UPDATE source_leases SET heartbeat_at = ?, expires_at = ?
+        WHERE run_id = ? AND owner = ? AND state = 'leased'
+        """,
+        (now_iso(), _lease_expiry(ttl_seconds), run_id, owner),
+    )
+    return int(conn.execute("SELECT changes()").fetchone()[0])
+
+
+def finish_leases(conn: sqlite3.Connection, run_id: str, owner: str, urls: Iterable[str]) -> None:
+    """Mark urls processed for this run so no other worker picks them up again."""
+    conn.executemany(
+        "UPDATE source_leases SET state = 'done', heartbeat_at = ? WHERE url = ? AND run_id = ? AND owner = ?",
+        [(now_iso(), url, run_id, owner) for url in urls],
+    )
+
+
+def release_leases(conn: sqlite3.Connection, run_id: str, owner: str, urls: Optional[Iterable[str]] = None) -> None:
+    """Give back unfinished leases (all of owner's when urls is None) for another worker to claim."""
+    if urls is None:
+        conn.execute(
+            "DELETE FROM source_leases WHERE run_id = ? AND owner = ? AND state = 'leased'",
+            (run_id, owner),
+        )
+        return
+    conn.executemany(
+        "DELETE FROM source_leases WHERE url = ? AND run_id = ? AND owner = ? AND state = 'leased'",
+        [(url, run_id, owner) for url in urls],
+    )
@@ -1,27 +1,112 @@
-from typing import Any, Dict, List, Set
+import asyncio
+import sqlite3
+import time
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 
 try:
     from . import sqlite_store as db
+    from .config import (
+        GROUP_COMMIT_SECONDS,
+        GROUP_COMMIT_SOURCES,
+        SEEN_FILTER,
+        SEEN_FILTER_CAPACITY,
+        SEEN_FILTER_ERROR_RATE,
+    )
+    from .db_writer import DBWriter
     from .observability import get_logger
+    from .seen_filter import SeenLinkFilter, open_seen_filter
+    from .sources import SourceRegistry, declared_sources
 except ImportError:
     import scraper.sqlite_store as db
+    from scraper.config import (
+        GROUP_COMMIT_SECONDS,
+        GROUP_COMMIT_SOURCES,
+        SEEN_FILTER,
+        SEEN_FILTER_CAPACITY,
+        SEEN_FILTER_ERROR_RATE,
+    )
+    from scraper.db_writer import DBWriter
     from scraper.observability import get_logger
+    from scraper.seen_filter import SeenLinkFilter, open_seen_filter
+    from scraper.sources import SourceRegistry, declared_sources
 
 
 logger = get_logger(__name__)
 
+# A write: (op(conn), urls whose row it changes, whether it changed their failures, links it stored).
+Write = Tuple[Callable[[sqlite3.Connection], Any], Tuple[str, ...], bool, List[str]]
+
+
+def _apply_writes(conn: sqlite3.Connection, writes: List[Write]) -> List[Any]:
+    return [op(conn) for op, _, _, _ in writes]
+
 
 class Storage:
-    def __init__(self, file_path: str = "news_state.json"):
+    """SQLite-backed scraper state plus an in-memory view of it.
+
+    seen_links, page_hashes and source_health are loaded once and then kept up
+    to date by every write this instance makes (write-through), so a write only
+    re-reads the source row it touched. Call refresh() to pick up changes made
+    by other processes.
+
+    With SCRAPER_SEEN_FILTER set, seen_links only holds the links this instance
+    stored since the last refresh; the full history is answered by the on-disk
+    Bloom filter (scraper/seen_filter.py) and SQLite.
+
+    Writes happen in units of work (transaction()): everything one source
+    produces commits at once, or not at all. With group commit
+    (group_commit_sources > 1) finished units are committed together, after
+    group_commit_sources units or group_commit_seconds, whichever comes first;
+    a crash then loses at most that many whole units, never part of one.
+
+    With writer=True the writes run on a background DBWriter thread that owns
+    the write connection, and self.conn only serves reads (plus the lease and
+    registry bookkeeping, which commits right away). A unit then becomes one
+    writer command: ``async with storage.unit()`` waits for its commit,
+    transaction() and single writes outside a unit do not wait. The in-memory
+    view takes a write once it is committed.
+    """
+
+    def __init__(
+        self,
+        file_path: str = "news_state.json",
+        group_commit_sources: int = GROUP_COMMIT_SOURCES,
+        group_commit_seconds: float = GROUP_COMMIT_SECONDS,
+        writer: bool = False,
+    ):
         self.file_name = file_path
         self.conn = db.connect()
+        self.writer: Optional[DBWriter] = DBWriter() if writer else None
+        # The writer batches on its own; local transactions must not hold the lock it needs.
+        self.group_commit_sources = 1 if writer else max(1, group_commit_sources)
+        self.group_commit_seconds = group_commit_seconds
+        # One frame per open savepoint: sources refreshed and links stored inside it.
+        self._frames: List[Dict[str, Any]] = []
+        self._pending_units = 0
+        self._pending_since = 0.0
+        # Writes collected by the open unit in writer mode.
+        self._collected: Optional[List[Write]] = None
+        self._closed = False
         self.seen_links: Set[str] = set()
         self.page_hashes: Dict[str, str] = {}
         self.source_health: Dict[str, Dict[str, Any]] = {}
-        self.load()
+        self._registry: Optional[SourceRegistry] = None
+        self.seen_filter: Optional[SeenLinkFilter] = None
+        if SEEN_FILTER:
+            path = f"{db.DB_PATH}.seen.bloom" if SEEN_FILTER == "1" else SEEN_FILTER
+            self.seen_filter = open_seen_filter(path, SEEN_FILTER_CAPACITY, SEEN_FILTER_ERROR_RATE, self.conn)
+        self.refresh()
 
-    def load(self) -> None:
-        self.seen_links = {row["link"] for row in self.conn.execute("SELECT link FROM seen_links")}
+    def refresh(self) -> None:
+        """Re-read the whole in-memory view from the database."""
+        if self.seen_filter is not None:
+            self.seen_filter.catch_up(self.conn)
+            self.seen_links = set()
+        else:
+            self.seen_links = {row["link"] for row in self.conn.execute("SELECT link FROM seen_links")}
         self.page_hashes = {
             row["url"]: row["last_hash"]
             for row in self.conn.execute("SELECT url, last_hash FROM sources WHERE last_hash IS NOT NULL")
@@ -35,49 +120,328 @@ class Storage:
         )
 
     def save(self) -> None:
-        self.conn.commit()
-        self.load()
+        self.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+        self._closed = True
+        if self.seen_filter is not None:
+            self.seen_filter.close()
+        self.conn.close()
+
+    @contextmanager
+    def _savepoint(self) -> Iterator[None]:
+        if not self.conn.in_transaction:
+            # IMMEDIATE: a deferred transaction that reads before writing can deadlock
+            # against another connection's commit and fail without waiting.
+            self.conn.execute("BEGIN IMMEDIATE")
+        name = f"unit_{len(self._frames)}"
+        self.conn.execute(f"SAVEPOINT {name}")
+        frame: Dict[str, Any] = {"sources": set(), "links": []}
+        self._frames.append(frame)
+        try:
+            yield
+        except BaseException:
+            self._frames.pop()
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            # Undo the write-through of the sources this unit touched.
+            for url in frame["sources"]:
+                self._refresh_source(url, failures=True)
+            if not self._frames and not self._pending_units:
+                self.conn.rollback()
+            raise
+        self._frames.pop()
+        self.conn.execute(f"RELEASE {name}")
+        if self._frames:
+            self._frames[-1]["sources"] |= frame["sources"]
+            self._frames[-1]["links"].extend(frame["links"])
+            return
+        self._apply_links(frame["links"])
+        if not self._pending_units:
+            self._pending_since = time.monotonic()
+        self._pending_units += 1
+        if self._pending_units >= self.group_commit_sources or self.commit_due():
+            self._commit_local()
+
+    @contextmanager
+    def _collect(self) -> Iterator[List[Write]]:
+        if self._collected is not None:
+            # Nested unit: a failure drops only the writes it added.
+            mark = len(self._collected)
+            try:
+                yield self._collected
+            except BaseException:
+                del self._collected[mark:]
+                raise
+            return
+        self._collected = writes = []
+        try:
+            yield writes
+        finally:
+            self._collected = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Unit of work: the writes inside commit together or roll back together.
+
+        Units nest (savepoints); the in-memory view only takes a unit's changes
+        once it succeeds, and the outermost unit commits (or joins the group commit).
+        With a writer the unit is queued as one command and not waited for.
+        """
+        if self.writer is None:
+            with self._savepoint():
+                yield
+            return
+        outermost = self._collected is None
+        with self._collect() as writes:
+            yield
+        if outermost and writes:
+            self._submit(writes)
+
+    @asynccontextmanager
+    async def unit(self) -> AsyncIterator[None]:
+        """transaction() for coroutines: with a writer, waits for the unit's commit off the loop.
+
+        The body must not await; its writes are collected and sent as one command.
+        """
+        if self.writer is None or self._collected is not None:
+            with self.transaction():
+                yield
+            return
+        with self._collect() as writes:
+            yield
+        if writes:
+            await asyncio.wrap_future(self.writer.submit(_apply_writes, writes))
+            self._write_through(writes)
+
+    def commit_due(self) -> bool:
+        """True when grouped units have waited group_commit_seconds."""
+        return bool(self._pending_units) and time.monotonic() - self._pending_since >= self.group_commit_seconds
+
+    def flush(self) -> None:
+        """Commit every finished unit now (outside of a unit)."""
+        if self._frames:
+            return
+        self._commit_local()
+        # After the local commit: the writer may be waiting for the lock it held.
+        if self.writer is not None:
+            self.writer.flush()
+
+    def _commit_local(self) -> None:
+        try:
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            self.refresh()
+            raise
+        if self._pending_units > 1:
+            logger.info("sqlite_group_committed units=%s", self._pending_units)
+        self._pending_units = 0
+
+    def _write(
+        self,
+        op: Callable[[sqlite3.Connection], Any],
+        sources: Iterable[str] = (),
+        failures: bool = False,
+        links: Iterable[Optional[str]] = (),
+    ) -> Any:
+        """Run op(conn) as (part of) a unit, then update the in-memory view.
+
+        Returns op's result; None when the write went to the writer thread.
+        """
+        write: Write = (op, tuple(sources), failures, [link for link in links if link])
+        if self.writer is None:
+            with self._savepoint():
+                result = op(self.conn)
+                self._write_through([write])
+            return result
+        if self._collected is not None:
+            self._collected.append(write)
+        else:
+            self._submit([write])
+        return None
+
+    def _submit(self, writes: List[Write]) -> None:
+        future = self.writer.submit(_apply_writes, writes)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            future.result()
+            self._write_through(writes)
+            return
+
+        def committed(done: Future) -> None:
+            # Failures are logged by the writer; the view keeps the committed state.
+            if done.exception() is None and not loop.is_closed():
+                loop.call_soon_threadsafe(self._write_through, writes)
+
+        future.add_done_callback(committed)
+
+    def _write_through(self, writes: List[Write]) -> None:
+        if self._closed:
+            return
+        for _, sources, failures, links in writes:
+            for url in sources:
+                self._refresh_source(url, failures)
+            self._remember_links(links)
+
+    def _remember_links(self, links: Iterable[str]) -> None:
+        links = [link for link in links if link]
+        if self._frames:
+            self._frames[-1]["links"].extend(links)
+        else:
+            self._apply_links(links)
+
+    def _apply_links(self, links: List[str]) -> None:
+        self.seen_links.update(links)
+        if self.seen_filter is not None:
+            self.seen_filter.add(links)
+
+    def _refresh_source(self, url: str, failures: bool = False) -> None:
+        """Write-through for one source: re-read its row (and failures if they changed)."""
+        if self._frames:
+            self._frames[-1]["sources"].add(url)
+        row = self.conn.execute("SELECT * FROM sources WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        entry = dict(row)
+        previous = self.source_health.get(url)
+        if failures or previous is None:
+            entry["failure_queue"] = db.source_failure_queue(self.conn, entry["id"])
+        else:
+            entry["failure_queue"] = previous.get("failure_queue", [])
+        self.source_health[url] = entry
+        if entry.get("last_hash"):
+            self.page_hashes[url] = entry["last_hash"]
+        else:
+            self.page_hashes.pop(url, None)
+
+    @property
+    def registry(self) -> SourceRegistry:
+        """Source registry, loaded once and then kept in memory (see reload_registry)."""
+        if self._registry is None:
+            self.reload_registry()
+        return self._registry
+
+    def reload_registry(self) -> SourceRegistry:
+        with self._savepoint():
+            db.sync_source_registry(self.conn, [spec.to_dict() for spec in declared_sources()])
+        self._registry = SourceRegistry.from_rows(db.load_source_registry(self.conn))
+        logger.info("source_registry_loaded sources=%s due=%s", len(self._registry.urls), len(self._registry.due()))
+        return self._registry
 
     def is_new(self, link: str) -> bool:
+        if link in self.seen_links:
+            return False
+        if self.seen_filter is not None and link not in self.seen_filter:
+            return True
         return not db.is_seen(self.conn, link)
 
+    def filter_new_links(self, links: Iterable[str]) -> List[str]:
+        """Links never seen before, in order and without duplicates.
+
+        The in-memory seen set (or the Bloom filter) answers most of them; the
+        rest are checked in one bulk query instead of two lookups per link.
+        """
+        candidates = [link for link in dict.fromkeys(links) if link and link not in self.seen_links]
+        if not candidates:
+            return []
+        if self.seen_filter is None:
+            unseen = db.filter_unseen_links(self.conn, candidates)
+        else:
+            maybe_seen = [link for link in candidates if link in self.seen_filter]
+            unseen = set(candidates) - set(maybe_seen)
+            unseen |= db.filter_unseen_links(self.conn, maybe_seen) if maybe_seen else set()
+        return [link for link in candidates if link in unseen]
+
     def add_seen(self, link: str) -> None:
-        db.mark_seen(self.conn, link)
-        self.seen_links.add(link)
+        self._write(lambda conn: db.mark_seen(conn, link), links=[link])
 
     def get_page_hash(self, url: str) -> str:
         return db.get_page_hash(self.conn, url)
 
     def save_page_hash(self, url: str, content_hash: str) -> None:
-        db.save_page_hash(self.conn, url, content_hash)
-        self.page_hashes[url] = content_hash
+        self._write(lambda conn: db.save_page_hash(conn, url, content_hash), sources=[url])
+
+    def get_page_signature(self, url: str) -> Dict[str, Any]:
+        return db.get_page_signature(self.conn, url)
+
+    def save_page_signature(self, url: str, simhash: str, link_signature: str) -> None:
+        self._write(lambda conn: db.save_page_signature(conn, url, simhash, link_signature))
+
+    def load_boilerplate(self, url: str, min_hits: int) -> Set[str]:
+        return db.load_boilerplate(self.conn, urlparse(url).netloc, min_hits)
+
+    def record_boilerplate(self, url: str, blocks: Dict[str, str]) -> None:
+        if blocks:
+            self._write(lambda conn: db.record_boilerplate(conn, urlparse(url).netloc, blocks))
+
+    def prune_boilerplate(self, max_age_days: int) -> None:
+        self._write(lambda conn: _prune_boilerplate(conn, max_age_days))
+
+    # Leases coordinate processes: they run on self.conn and commit right away,
+    # together with any grouped units (and, with a writer, after its queue).
+
+    def claim_sources(self, urls: List[str], run_id: str, owner: str, ttl_seconds: float, limit: int) -> List[str]:
+        # The claim opens its own IMMEDIATE transaction; flush anything pending first.
+        self.flush()
+        claimed = db.claim_sources(self.conn, urls, run_id, owner, ttl_seconds, limit)
+        if claimed:
+            logger.info("sources_claimed run_id=%s owner=%s count=%s", run_id, owner, len(claimed))
+        return claimed
+
+    def heartbeat_leases(self, run_id: str, owner: str, ttl_seconds: float) -> int:
+        with self._savepoint():
+            renewed = db.heartbeat_leases(self.conn, run_id, owner, ttl_seconds)
+        self.flush()
+        return renewed
+
+    def finish_leases(self, run_id: str, owner: str, urls: List[str]) -> None:
+        self.flush()
+        with self._savepoint():
+            db.finish_leases(self.conn, run_id, owner, urls)
+        self.flush()
+
+    def release_leases(self, run_id: str, owner: str, urls: Optional[List[str]] = None) -> None:
+        self.flush()
+        with self._savepoint():
+            db.release_leases(self.conn, run_id, owner, urls)
+        self.flush()
 
     def filter_new_articles(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        return [article for article in articles if article.get("link") and self.is_new(article["link"])]
+        new_links = set(self.filter_new_links(article.get("link") for article in articles))
+        return [article for article in articles if article.get("link") in new_links]
 
-    def save_latest_articles(self, articles: List[Dict[str, Any]]) -> int:
-        count = db.add_latest_articles(self.conn, articles)
-        self.conn.commit()
-        self.load()
-        logger.info("sqlite_latest_articles_saved count=%s", count)
+    def save_latest_articles(self, articles: List[Dict[str, Any]]) -> Optional[int]:
+        count = self._write(
+            lambda conn: db.add_latest_articles(conn, articles),
+            links=[article.get("link") for article in articles],
+        )
+        logger.info("sqlite_latest_articles_saved count=%s", len(articles) if count is None else count)
         return count
 
     def load_favorites(self) -> List[Dict[str, Any]]:
         return db.load_articles(self.conn, favorites=True)
 
     def save_to_favorites(self, article: Dict[str, Any]) -> None:
-        with self.conn:
-            article_id = db.upsert_article(
-                self.conn,
+        self._write(
+            lambda conn: db.upsert_article(
+                conn,
                 article,
                 inbox_status=article.get("inbox_status", "library"),
                 fallback_type=article.get("type"),
                 is_favorite=True,
                 origin_file="favorites.json",
-            )
-        if article_id:
+            ),
+            links=[article.get("link")],
+        )
+        # A bookmark is a user action: do not leave it waiting for the group.
+        self.flush()
+        if article.get("link"):
             logger.info("favorite_saved title=%s", article.get("title", ""))
-        self.load()
 
     def record_source_failure(
         self,
@@ -88,76 +452,120 @@ class Storage:
         retryable: bool = True,
         attempts: int = 1,
     ) -> None:
-        db.record_failure(self.conn, url, stage, error_type, message, retryable, attempts)
-        self.conn.commit()
-        self.load()
+        self._write(
+            lambda conn: db.record_failure(conn, url, stage, error_type, message, retryable, attempts),
+            sources=[url],
+            failures=True,
+        )
 
     def record_source_success(self, url: str, stage: str = "run") -> None:
-        entry = db.source_entry(self.conn, url)
-        db.update_source(
-            self.conn,
-            url,
-            {
-                "last_checked_at": db.now_iso(),
-                "last_success_at": db.now_iso(),
-                "last_success_stage": stage,
-                "total_successes": db.as_int(entry.get("total_successes")) + 1,
-                "consecutive_failures": 0,
-                "last_error": None,
-                "last_error_type": None,
-                "last_error_stage": None,
-            },
-        )
-        self.conn.commit()
-        self.load()
+        self._write(lambda conn: _update_source_success(conn, url, stage), sources=[url])
 
     def record_content_unchanged(self, url: str, content_hash: str) -> None:
-        entry = db.source_entry(self.conn, url)
-        db.update_source(
-            self.conn,
-            url,
-            {
-                "last_checked_at": db.now_iso(),
-                "last_success_at": db.now_iso(),
-                "last_hash": content_hash,
-                "unchanged_count": db.as_int(entry.get("unchanged_count")) + 1,
-                "consecutive_failures": 0,
-            },
-        )
-        self.conn.commit()
-        self.load()
+        self._write(lambda conn: _update_content_unchanged(conn, url, content_hash), sources=[url])
 
     def record_content_changed(self, url: str, content_hash: str) -> None:
-        db.update_source(
-            self.conn,
-            url,
-            {
-                "last_checked_at": db.now_iso(),
-                "last_changed_at": db.now_iso(),
-                "unchanged_count": 0,
-                "consecutive_failures": 0,
-            },
+        self._write(
+            lambda conn: db.update_source(
+                conn,
+                url,
+                {
+                    "last_checked_at": db.now_iso(),
+                    "last_changed_at": db.now_iso(),
+                    "unchanged_count": 0,
+                    "consecutive_failures": 0,
+                },
+            ),
+            sources=[url],
         )
-        self.conn.commit()
-        self.load()
 
     def record_extraction_result(self, url: str, article_count: int, new_article_count: int) -> None:
-        entry = db.source_entry(self.conn, url)
-        article_count = int(article_count)
-        db.update_source(
-            self.conn,
-            url,
-            {
-                "last_checked_at": db.now_iso(),
-                "last_success_at": db.now_iso(),
-                "last_article_count": article_count,
-                "last_new_article_count": int(new_article_count),
-                "consecutive_failures": 0,
-                "empty_extract_count": db.as_int(entry.get("empty_extract_count")) + (1 if article_count <= 0 else 0),
-                "consecutive_empty_extracts": (
-                    db.as_int(entry.get("consecutive_empty_extracts")) + 1 if article_count <= 0 else 0
-                ),
-            },
-        )
-        self.conn.commit()
-        self.load()
+        self._write(lambda conn: _update_extraction_result(conn, url, article_count, new_article_count), sources=[url])
+
+    def save_source_result(
+        self,
+        url: str,
+        content_hash: str,
+        article_count: int,
+        new_articles: List[Dict[str, Any]],
+        signature: Optional[Dict[str, str]] = None,
+    ) -> Optional[int]:
+        """Persist everything one successful extraction produced, in a single unit of work.
+
+        The new articles (as latest), their seen marks, the page hash and the
+        source stats commit together: a crash either keeps all of them or none,
+        and in the latter case the unchanged hash makes the next run extract the
+        source again.
+        """
+
+        def save(conn: sqlite3.Connection) -> int:
+            db.save_page_hash(conn, url, content_hash)
+            if signature:
+                db.save_page_signature(conn, url, signature["simhash"], signature["link_signature"])
+            count = db.add_latest_articles(conn, new_articles)
+            _update_extraction_result(conn, url, article_count, len(new_articles))
+            _update_source_success(conn, url, "extract")
+            logger.info("sqlite_source_saved url=%s articles=%s", url, count)
+            return count
+
+        return self._write(save, sources=[url], links=[article.get("link") for article in new_articles])
+
+
+def _prune_boilerplate(conn: sqlite3.Connection, max_age_days: int) -> int:
+    removed = db.prune_boilerplate(conn, max_age_days)
+    if removed:
+        logger.info("boilerplate_pruned count=%s", removed)
+    return removed
+
+
+def _update_source_success(conn: sqlite3.Connection, url: str, stage: str) -> None:
+    entry = db.source_entry(conn, url)
+    db.update_source(
+        conn,
+        url,
+        {
+            "last_checked_at": db.now_iso(),
+            "last_success_at": db.now_iso(),
+            "last_success_stage": stage,
+            "total_successes": db.as_int(entry.get("total_successes")) + 1,
+            "consecutive_failures": 0,
+            "last_error": None,
+            "last_error_type": None,
+            "last_error_stage": None,
+        },
+    )
+
+
+def _update_content_unchanged(conn: sqlite3.Connection, url: str, content_hash: str) -> None:
+    entry = db.source_entry(conn, url)
+    db.update_source(
+        conn,
+        url,
+        {
+            "last_checked_at": db.now_iso(),
+            "last_success_at": db.now_iso(),
+            "last_hash": content_hash,
+            "unchanged_count": db.as_int(entry.get("unchanged_count")) + 1,
+            "consecutive_failures": 0,
+        },
+    )
+
+
+def _update_extraction_result(conn: sqlite3.Connection, url: str, article_count: int, new_article_count: int) -> None:
+    entry = db.source_entry(conn, url)
+    article_count = int(article_count)
+    db.update_source(
+        conn,
+        url,
+        {
+            "last_checked_at": db.now_iso(),
+            "last_success_at": db.now_iso(),
+            "last_article_count": article_count,
+            "last_new_article_count": int(new_article_count),
+            "consecutive_failures": 0,
+            "empty_extract_count": db.as_int(entry.get("empty_extract_count")) + (1 if article_count <= 0 else 0),
+            "consecutive_empty_extracts": (
+                db.as_int(entry.get("consecutive_empty_extracts")) + 1 if article_count <= 0 else 0
+            ),
+        },
+    )
@@ -1,76 +1,121 @@
-from bs4 import BeautifulSoup, NavigableString, Tag
-from urllib.parse import urljoin
+import os
+from types import ModuleType
+from typing import Dict, List, Optional
 
-def clean_html_for_ai(html: str, url: str) -> str:
+MAX_CLEAN_CHARS = 60000
+NOISE_TAGS = ['script', 'style', 'svg', 'iframe', 'noscript', 'textarea', 'headers', 'footer']
+NOISE_SELECTORS = ['nav', '.nav', '.header', '.menu']
+AMAZON_NOISE_SELECTORS = ['header', 'footer', '.Navigation', '.Footer', '.SocialShare']
+BLOCK_TAGS = ['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'article', 'section']
+
+# "auto" uses the compiled lxml backend when it is installed, else BeautifulSoup.
+HTML_BACKEND = os.getenv("SCRAPER_HTML_BACKEND", "auto").lower()
+
+_backends: Dict[str, ModuleType] = {}
+
+
+class DocumentTooDeep(ValueError):
+    """Raised by a backend whose parser cannot represent the page's nesting depth."""
+
+
+class TextBuffer:
+    """Single output buffer for the iterative DOM-to-text walkers.
+
+    Walkers call enter()/exit() around every element they descend into and
+    text()/atom() for strings and links. The buffer reproduces the old recursive
+    output (children joined with spaces, block elements wrapped in newlines,
+    every level stripped, blank lines dropped) without building per-level
+    strings, and reports ``full`` once the length budget is reached.
+
+    Two neighbouring atoms end up on separate lines only when the outermost
+    element closed after the first one, or the outermost element opened before
+    the second one, is a block. Inner block boundaries are swallowed by the
+    strip() of an enclosing inline element.
+    """
+
+    def __init__(self, limit: int = MAX_CLEAN_CHARS):
+        self.limit = limit
+        self.length = 0
+        self._parts: List[str] = []
+        self._open_blocks: List[bool] = []
+        self._min_depth = 0
+        self._closed_block = False
+        self._started = False
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.limit
+
+    def enter(self, is_block: bool) -> None:
+        self._open_blocks.append(is_block)
+
+    def exit(self) -> None:
+        is_block = self._open_blocks.pop()
+        if len(self._open_blocks) < self._min_depth:
+            self._min_depth = len(self._open_blocks)
+            self._closed_block = is_block
+
+    def text(self, raw: Optional[str]) -> None:
+        if raw:
+            stripped = raw.strip()
+            if stripped:
+                self.atom(stripped)
+
+    def atom(self, atom: str) -> None:
+        if "\n" in atom:
+            atom = "\n".join(line.strip() for line in atom.split("\n") if line.strip())
+        if self._started:
+            depth = self._min_depth
+            opened_block = len(self._open_blocks) > depth and self._open_blocks[depth]
+            self._write("\n" if self._closed_block or opened_block else " ")
+        self._write(atom)
+        self._started = True
+        self._min_depth = len(self._open_blocks)
+        self._closed_block = False
+
+    def _write(self, value: str) -> None:
+        self._parts.append(value)
+        self.length += len(value)
+
+    def getvalue(self) -> str:
+        return "".join(self._parts)[:self.limit]
+
+
+def get_html_backend(name: Optional[str] = None) -> ModuleType:
+    """Return the cleaning backend module (parse_html, strip_noise, clean_parsed, article_texts)."""
+    name = (name or HTML_BACKEND).lower()
+    if name in _backends:
+        return _backends[name]
+
+    if name == "auto":
+        try:
+            backend = get_html_backend("lxml")
+        except ImportError:
+            backend = get_html_backend("bs4")
+    elif name == "lxml":
+        from . import html_lxml as backend
+    elif name == "bs4":
+        from . import html_bs4 as backend
+    else:
+        raise ValueError(f"unknown HTML backend: {name}")
+
+    _backends[name] = backend
+    return backend
+
+
+def clean_html_for_ai(html: str, url: str, backend: Optional[str] = None) -> str:
     """
     清理 HTML 并保留链接信息
     将 <a href="...">text</a> 转换为 [text](href) 格式，以便 AI 识别链接
     """
     if not html:
         return ""
-        
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # 移除噪音
-    for tag in soup(['script', 'style', 'svg', 'iframe', 'noscript', 'headers', 'footer']):
-        tag.decompose()
-        
-    # 尝试定位主要内容区域（可选，如果太严格可能会漏掉新闻列表）
-    for selector in ['nav', '.nav', '.header', '.menu']:
-        for tag in soup.select(selector):
-            tag.decompose()
-
-    # 针对 Amazon News 的特殊清洗
-    if "aboutamazon.com" in url:
-        # 移除明显的导航和页脚部分
-        for selector in ['header', 'footer', '.Navigation', '.Footer', '.SocialShare']:
-            for tag in soup.select(selector):
-                tag.decompose()
-        
-        # 移除 "More news" 这种区块
-        for tag in soup.find_all(['div', 'section']):
-            text = tag.get_text().strip().lower()
-            if text.startswith("more news") or text == "see all news":
-                tag.decompose()
-
-    # 递归处理文本和链接
-    def process_element(element):
-        text_parts = []
-        for child in element.children:
-            if isinstance(child, NavigableString):
-                text = str(child).strip()
-                if text:
-                    text_parts.append(text)
-            elif isinstance(child, Tag):
-                if child.name == 'a' and child.has_attr('href'):
-                    # 处理链接
-                    link_text = child.get_text(separator=' ', strip=True)
-                    href = child['href']
-                    # 转换为绝对路径
-                    full_url = urljoin(url, href) # Use actual URL for base
-                    if link_text and len(link_text) > 2: # 忽略太短的链接文本
-                        text_parts.append(f"[{link_text}]({full_url})")
-                elif child.name in ['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'article', 'section']:
-                    # 块级元素，处理子元素并添加换行
-                    child_text = process_element(child)
-                    if child_text:
-                        text_parts.append(f"\n{child_text}\n")
-                else:
-                    # 其他内联元素或容器
-                    child_text = process_element(child)
-                    if child_text:
-                        text_parts.append(child_text)
-        return " ".join(text_parts).strip()
-
-    # 从 body 开始处理
-    body = soup.find('body')
-    if not body:
-        return ""
-        
-    cleaned_text = process_element(body)
-    
-    # 清理多余空行
-    lines = [line.strip() for line in cleaned_text.split('\n') if line.strip()]
-    final_text = '\n'.join(lines)
-    
-    return final_text[:60000] # 限制长度
+
+    impl = get_html_backend(backend)
+    try:
+        document = impl.parse_html(html)
+    except DocumentTooDeep:
+        impl = get_html_backend("bs4")
+        document = impl.parse_html(html)
+    impl.strip_noise(document, url)
+    return impl.clean_parsed(document, url)
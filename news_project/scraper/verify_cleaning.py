@@ -0,0 +1,162 @@
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+
+# Ensure path is correct
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from news_project.scraper.page import PageDocument
+from news_project.scraper.utils import clean_html_for_ai, get_html_backend
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "clean_html")
+REFERENCE_BACKEND = "bs4"
+
+
+def available_backends():
+    backends = []
+    for name in ("bs4", "lxml"):
+        try:
+            get_html_backend(name)
+            backends.append(name)
+        except ImportError:
+            print(f"⚠️  backend {name} not installed, skipped")
+    return backends
+
+
+def golden_backends(case):
+    """Backends with their own golden file: on this malformed markup their parser builds a different tree."""
+    return [REFERENCE_BACKEND] + case.get("parser_differs", [])
+
+
+def golden_path(case, backend):
+    suffix = "" if backend == REFERENCE_BACKEND else f".{backend}"
+    return os.path.join(CORPUS_DIR, f"{case['name']}{suffix}.txt")
+
+
+def load_cases():
+    with open(os.path.join(CORPUS_DIR, "cases.json"), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        with open(os.path.join(CORPUS_DIR, f"{case['name']}.html"), "r", encoding="utf-8") as f:
+            case["html"] = f.read()
+        case["golden"] = {}
+        for backend in golden_backends(case):
+            path = golden_path(case, backend)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    case["golden"][backend] = f.read()
+    return cases
+
+
+def update_golden(cases, backends):
+    for case in cases:
+        for backend in golden_backends(case):
+            if backend not in backends:
+                continue
+            text = clean_html_for_ai(case["html"], case["url"], backend=backend)
+            with open(golden_path(case, backend), "w", encoding="utf-8", newline="\n") as f:
+                f.write(text)
+            print(f"💾 {case['name']} [{backend}]: {len(text)} chars")
+
+
+def check_corpus(cases, backends) -> int:
+    failures = 0
+    for case in cases:
+        if REFERENCE_BACKEND not in case["golden"]:
+            print(f"❌ {case['name']}: missing golden output, run with --update")
+            failures += 1
+            continue
+        reference_blocks = PageDocument(case["url"], case["html"], backend=REFERENCE_BACKEND).blocks
+        for backend in backends:
+            page = PageDocument(case["url"], case["html"], backend=backend)
+            own_golden = backend in case.get("parser_differs", [])
+            golden = case["golden"].get(backend) if own_golden else case["golden"][REFERENCE_BACKEND]
+            problems = []
+            if golden is None:
+                problems.append(f"missing golden output {os.path.basename(golden_path(case, backend))}, run with --update")
+            elif page.cleaned_text != golden:
+                diff = difflib.unified_diff(golden.splitlines(), page.cleaned_text.splitlines(), "golden", backend, lineterm="")
+                problems.append("\n".join(list(diff)[:40]))
+            if not own_golden and page.blocks != reference_blocks:
+                problems.append(f"block split differs: {len(page.blocks)} vs {len(reference_blocks)} blocks")
+            if problems:
+                failures += 1
+                print(f"❌ {case['name']} [{backend}]")
+                for problem in problems:
+                    print(problem)
+            else:
+                print(f"✅ {case['name']} [{backend}]")
+    return failures
+
+
+def synthesize_newsroom(target_bytes: int) -> str:
+    """Large, deeply nested listing page similar to a modern newsroom."""
+    parts = ["<html><head><script>" + "var a = 1;" * 2000 + "</script></head><body>"]
+    parts.append("<nav>" + "".join(f"<a href='/section/{i}'>Section {i}</a>" for i in range(200)) + "</nav><main>")
+    i = 0
+    while sum(len(part) for part in parts) < target_bytes:
+        parts.append(
+            "<div class='grid'><div class='col'><div class='card'><div class='card-inner'>"
+            f"<a href='/news/{i}'><span><span>Story {i}: spatial computing and agents</span></span></a>"
+            f"<div class='meta'><span>By Staff</span> <time>Dec {1 + i % 28}, 2025</time></div>"
+            "<p>" + "Lorem ipsum dolor sit amet, <em>consectetur</em> adipiscing elit. " * 3 + "</p>"
+            "<svg><path d='M0 0L10 10'/></svg></div></div></div></div>"
+        )
+        i += 1
+    parts.append("</main><footer>footer</footer></body></html>")
+    return "".join(parts)
+
+
+def benchmark(backends, html: str, url: str, repeat: int) -> None:
+    print(f"\n⏱️  Cleaning {len(html) / 1024 / 1024:.2f} MB, best of {repeat}")
+    reference = None
+    for backend in backends:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            text = clean_html_for_ai(html, url, backend=backend)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        reference = text if reference is None else reference
+        same = "same output" if text == reference else "OUTPUT DIFFERS"
+        print(f"  {backend:<6} {best * 1000:9.1f} ms  ({len(text)} chars, {same})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check HTML cleaning backends against the golden corpus.")
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help=f"Rewrite golden outputs with the {REFERENCE_BACKEND} backend (and parser_differs backends for their cases).",
+    )
+    parser.add_argument("--bench", action="store_true", help="Run the cleaning microbenchmark.")
+    parser.add_argument("--bench-file", help="HTML file to benchmark instead of a synthesized page.")
+    parser.add_argument("--bench-mb", type=float, default=1.5, help="Size of the synthesized benchmark page.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    cases = load_cases()
+    if args.update:
+        update_golden(cases, backends)
+        cases = load_cases()
+
+    failures = check_corpus(cases, backends)
+
+    if args.bench:
+        if args.bench_file:
+            with open(args.bench_file, "r", encoding="utf-8", errors="replace") as f:
+                html = f.read()
+        else:
+            html = synthesize_newsroom(int(args.bench_mb * 1024 * 1024))
+        benchmark(backends, html, "https://www.example.com/newsroom/", args.repeat)
+
+    print(f"\n{'❌' if failures else '✅'} {failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Check that the background DB writer survives a locked database.
+
+A second connection holds the write lock longer than the busy timeout: the
+writer's batch must fail (and every command queued behind it) instead of
+killing the thread, and writes must go through again once the lock is gone.
+
+Usage: python scraper/verify_db_writer.py
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_TMP = tempfile.TemporaryDirectory()
+# Read at import time by sqlite_store: set before importing the scraper.
+os.environ["NEWS_DB_PATH"] = os.path.join(_TMP.name, "news_monitor.db")
+os.environ["NEWS_DB_BUSY_TIMEOUT"] = "1"
+os.environ.pop("SCRAPER_SEEN_FILTER", None)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from news_project.scraper import sqlite_store as db
+from news_project.scraper.db_writer import DBWriter
+from news_project.scraper.storage import Storage
+
+
+def _mark(conn, link):
+    db.mark_seen(conn, link)
+    return link
+
+
+def _locked(check):
+    """Run check() while another connection holds the write lock."""
+    blocker = sqlite3.connect(db.DB_PATH, timeout=0)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        return check()
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+
+def _seen(link):
+    conn = db.connect(profile="reader")
+    try:
+        return not db.filter_unseen_links(conn, [link])
+    finally:
+        conn.close()
+
+
+def check_writer():
+    writer = DBWriter(Path(db.DB_PATH), flush_seconds=0)
+    failures = 0
+
+    def check():
+        first = writer.submit(_mark, "https://example.com/locked-1")
+        queued = writer.submit(_mark, "https://example.com/locked-2")
+        errors = []
+        for future in (first, queued):
+            try:
+                future.result(timeout=10)
+                errors.append(None)
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+        return errors
+
+    started = time.monotonic()
+    errors = _locked(check)
+    elapsed = time.monotonic() - started
+    ok = all(errors)
+    print(f"{'✅' if ok else '❌'} locked batch fails its futures ({elapsed:.1f}s): {errors}")
+    failures += not ok
+
+    alive = writer._thread.is_alive()
+    print(f"{'✅' if alive else '❌'} writer thread alive after lock timeout")
+    failures += not alive
+
+    try:
+        result = writer.submit(_mark, "https://example.com/after-lock").result(timeout=10)
+        writer.flush()
+        ok = result == "https://example.com/after-lock" and _seen(result)
+    except Exception as e:
+        print(f"   {e!r}")
+        ok = False
+    print(f"{'✅' if ok else '❌'} writes commit once the lock is released")
+    failures += not ok
+
+    writer.close()
+    try:
+        writer.submit(_mark, "https://example.com/closed")
+        ok = False
+    except RuntimeError:
+        ok = True
+    print(f"{'✅' if ok else '❌'} submit raises after close")
+    failures += not ok
+    return failures
+
+
+def check_storage_unit():
+    storage = Storage(writer=True)
+
+    async def unit(link):
+        async with storage.unit():
+            storage.add_seen(link)
+
+    def locked_unit():
+        try:
+            asyncio.run(asyncio.wait_for(unit("https://example.com/unit-locked"), timeout=15))
+        except sqlite3.OperationalError:
+            return True
+        except asyncio.TimeoutError:
+            return False
+        return False
+
+    failures = 0
+    ok = _locked(locked_unit)
+    print(f"{'✅' if ok else '❌'} Storage.unit() raises instead of hanging on a locked database")
+    failures += not ok
+
+    try:
+        asyncio.run(asyncio.wait_for(unit("https://example.com/unit-after"), timeout=15))
+        storage.flush()
+        ok = _seen("https://example.com/unit-after") and not _seen("https://example.com/unit-locked")
+    except Exception as e:
+        print(f"   {e!r}")
+        ok = False
+    print(f"{'✅' if ok else '❌'} Storage.unit() commits again after the lock is released")
+    failures += not ok
+    storage.close()
+    return failures
+
+
+def main():
+    failures = check_writer() + check_storage_unit()
+    print(f"\n{'❌' if failures else '✅'} {failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
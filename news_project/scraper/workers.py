@@ -0,0 +1,86 @@
+"""Executor for CPU-bound stages.
+
+Parsing a large page or a long model reply blocks the event loop for hundreds of
+milliseconds; run_cpu() moves that work to a process pool (or a thread pool /
+inline, see PARSE_EXECUTOR) and caps the number of jobs in flight. A crashed
+worker breaks the whole process pool: the jobs running in it fail, and the
+next job starts a fresh pool.
+
+Functions passed to run_cpu() must be module-level and take/return picklable
+values so they work with every executor kind.
+"""
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
+
+from .config import PARSE_EXECUTOR, PARSE_QUEUE_SIZE, PARSE_WORKERS
+from .observability import get_logger
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+logger = get_logger(__name__)
+
+_executor: Optional["Executor"] = None
+_executor_kind = PARSE_EXECUTOR
+_limiter: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _get_executor() -> Optional["Executor"]:
+    global _executor
+    if _executor_kind == "inline":
+        return None
+    if _executor is None:
+        # Imported here: multiprocessing is only needed once a job is actually submitted.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        if _executor_kind == "thread":
+            _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="parse")
+        else:
+            # spawn: forking a process that already runs curl/OpenAI threads can deadlock.
+            _executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        logger.info("parse_executor_started kind=%s workers=%s queue=%s", _executor_kind, PARSE_WORKERS, PARSE_QUEUE_SIZE)
+    return _executor
+
+
+def _semaphore() -> asyncio.Semaphore:
+    """Bounded in-flight queue, rebuilt if the caller moved to a new event loop."""
+    global _limiter
+    loop = asyncio.get_running_loop()
+    if _limiter is None or _limiter[0] is not loop:
+        _limiter = (loop, asyncio.Semaphore(PARSE_QUEUE_SIZE))
+    return _limiter[1]
+
+
+async def run_cpu(func: Callable[..., Any], *args: Any) -> Any:
+    """Run func(*args) off the event loop, waiting while PARSE_QUEUE_SIZE jobs are in flight."""
+    async with _semaphore():
+        executor = _get_executor()
+        if executor is None:
+            return func(*args)
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool as e:
+            # Not retried inline: if this job crashed the worker, it would take
+            # down the main process. Its page fails; the next job gets a new pool.
+            logger.warning("parse_executor_broken func=%s error=%s", getattr(func, "__name__", func), e)
+            _discard(executor)
+            raise
+
+
+def _discard(executor: "Executor") -> None:
+    """Drop a broken pool, unless a concurrent job already replaced it."""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
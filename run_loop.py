@@ -1,35 +1,21 @@
-import time
-import subprocess
+import os
 import sys
-import datetime
 
-def run_scraper():
-    print(f"\n⏰ Starting Scraper Job at {datetime.datetime.now()}")
-    try:
-        # Run main.py using the same python interpreter
-        result = subprocess.run([sys.executable, "news_project/main.py"], capture_output=False)
-        if result.returncode == 0:
-            print("✅ Job Finished Successfully.")
-        else:
-            print(f"❌ Job Failed with code {result.returncode}")
-    except Exception as e:
-        print(f"❌ Execution Error: {e}")
+# Run the scraper as one long-lived process instead of a new `python main.py`
+# every cycle: connections, clients and parse workers stay warm between runs.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_project"))
+
+# Each run gets a wall-clock budget so one slow source cannot eat the interval.
+os.environ.setdefault("SCRAPER_RUN_BUDGET_SECONDS", "1800")
+# Sources are re-checked every 6 hours (+/- 10% jitter) unless configured otherwise.
+os.environ.setdefault("SCRAPER_DAEMON_INTERVAL_SECONDS", str(6 * 3600))
+
+from daemon import run_daemon
 
 if __name__ == "__main__":
     print("🚀 Auto-News-Scraper Started (Local Mode)")
+    print("   Status: curl http://127.0.0.1:%s/status" % os.getenv("SCRAPER_DAEMON_PORT", "8766"))
+    print("   Run now: curl -X POST http://127.0.0.1:%s/run" % os.getenv("SCRAPER_DAEMON_PORT", "8766"))
     print("   Press Ctrl+C to stop.")
-    
-    # Run immediately on start
-    run_scraper()
-    
-    while True:
-        # Sleep for 6 hours (6 * 60 * 60 = 21600 seconds)
-        # Or 24 hours for daily
-        hours = 6
-        print(f"💤 Sleeping for {hours} hours...")
-        try:
-            time.sleep(hours * 3600)
-            run_scraper()
-        except KeyboardInterrupt:
-            print("\n🛑 Stopped by user.")
-            break
+    run_daemon()
+    print("\n🛑 Stopped.")